@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""
+Measures a bulk load through the console, one save per command against
+group commit and an explicit batch.
+
+Usage: python3 -m benchmarks.bench_batch [number_of_places]
+"""
+
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from benchmarks.common import temporary_storage, report
+from console import HBNBCommand
+from models import storage
+
+
+def load(count):
+    """
+    Creates places and updates two attributes of each through the console.
+
+    Args:
+        count (int): The number of places.
+    """
+    console = HBNBCommand()
+    with redirect_stdout(io.StringIO()) as out:
+        for _ in range(count):
+            console.onecmd("create Place")
+            uid = out.getvalue().rsplit("\n", 2)[-2]
+            console.onecmd('Place.update("{}", {{"name": "Loft", "max_guest": 4}})'.format(uid))
+            console.onecmd('update Place {} price_by_night 120'.format(uid))
+        console.postloop()
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of places.
+    """
+    commands = count * 3
+    with temporary_storage():
+        start = time.perf_counter()
+        load(count)
+        report("one write per command", time.perf_counter() - start, commands)
+    with temporary_storage(commit_size=1000, commit_interval=1):
+        start = time.perf_counter()
+        load(count)
+        report("group commit (1000 saves or 1 s)", time.perf_counter() - start, commands)
+    with temporary_storage():
+        start = time.perf_counter()
+        with storage.batch():
+            load(count)
+        report("storage.batch()", time.perf_counter() - start, commands)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""
+Measures the paged storage with caches of several sizes: lookups by id drawn
+from a skewed distribution, a tenth of them followed by a change, so that the
+evictions write instances back. Prints the throughput, the hit rate, the number
+of write-backs and the memory the cache was estimated to take.
+
+Usage: python3 -m benchmarks.bench_cache [number_of_objects] [number_of_lookups]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+from benchmarks.common import report
+from benchmarks.generate import build, generate_records
+from models.engine.paged_storage import PagedStorage
+
+FRACTIONS = (0.01, 0.1, 0.5, 1.0)
+"""tuple: The cache sizes measured, as shares of the number of objects."""
+
+
+def main(count, lookups):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of objects in the graph, about.
+        lookups (int): The number of lookups per cache size.
+    """
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "hbnb.pages")
+    try:
+        storage = PagedStorage(path)
+        storage.reload()
+        objects = build(generate_records(count, 0))
+        for obj in objects:
+            storage.new(obj)
+        start = time.perf_counter()
+        storage.save()
+        storage.close()
+        report("save", time.perf_counter() - start, len(objects))
+        keys = [(type(obj).__name__, obj.id) for obj in objects]
+        rng = random.Random(0)
+        rng.shuffle(keys)
+        hot = max(len(keys) // 5, 1)
+        # 80% of the lookups go to 20% of the objects
+        workload = [rng.choice(keys[:hot]) if rng.random() < 0.8 else rng.choice(keys)
+                    for _ in range(lookups)]
+        rows = []
+        for fraction in FRACTIONS:
+            size = max(int(len(keys) * fraction), 1)
+            storage = PagedStorage(path)
+            storage.configure(cache_size=size, cache_memory="1g")
+            start = time.perf_counter()
+            storage.reload()
+            report("reload, cache of {}".format(size), time.perf_counter() - start, len(keys))
+            with patch("models.base_model.storage", storage):
+                start = time.perf_counter()
+                for i, (name, id) in enumerate(workload):
+                    obj = storage.get(name, id)
+                    if not i % 10:
+                        obj.updated_at = obj.updated_at
+                report("get(), cache of {}".format(size), time.perf_counter() - start, lookups)
+                stats = storage.cache_stats()
+                storage.save()
+                storage.close()
+            rows.append((size, stats["hit_rate"], stats["evictions"], stats["write_backs"],
+                         stats["bytes"] / 1024))
+        print("{:<10} {:>10} {:>10} {:>12} {:>12}".format(
+            "cache", "hit rate", "evictions", "write-backs", "cache KiB"))
+        for row in rows:
+            print("{:<10} {:>10.1%} {:>10} {:>12} {:>12.0f}".format(*row))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200000)
@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+"""
+Measures the latency of a save at each durability level, for a full snapshot
+and for a journal append of one changed object.
+
+Usage: python3 -m benchmarks.bench_durability [number_of_objects] [saves]
+"""
+
+import sys
+import time
+from benchmarks.common import temporary_storage
+from models import storage
+from models.place import Place
+
+
+def main(count, saves):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of objects in the storage.
+        saves (int): The number of saves measured per level and mode.
+    """
+    print("{:<10} {:<10} {:>14}".format("mode", "durability", "ms per save"))
+    for mode in ("snapshot", "journal"):
+        for durability in ("none", "flush", "fsync"):
+            with temporary_storage(mode=mode, durability=durability,
+                                   compact_threshold=saves + 1):
+                places = [Place() for _ in range(count)]
+                storage.save()
+                start = time.perf_counter()
+                for i in range(saves):
+                    places[i % count].max_guest = i
+                    storage.save()
+                elapsed = time.perf_counter() - start
+            print("{:<10} {:<10} {:>14.3f}".format(mode, durability, elapsed / saves * 1000))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 50)
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Compares the file formats of FileStorage: save and load throughput and file
+size, for each model class.
+
+Usage: python3 -m benchmarks.bench_formats [objects_per_class]
+"""
+
+import os
+import sys
+import time
+from benchmarks.common import temporary_storage
+from models import storage
+from models.engine.serializers import SERIALIZERS
+
+SAMPLE_VALUES = {str: "sample text", int: 3, float: 12.5, list: ["a", "b"]}
+
+
+def populate(name, count):
+    """
+    Creates objects of a class with every declared attribute set.
+
+    Args:
+        name (str): The class name.
+        count (int): The number of objects.
+    """
+    attributes = storage.attributes().get(name, {})
+    for _ in range(count):
+        obj = storage.classes()[name]()
+        for attribute, kind in attributes.items():
+            obj.__dict__[attribute] = SAMPLE_VALUES[kind]
+
+
+def measure(name, count, format):
+    """
+    Saves and loads objects of a class in one format.
+
+    Args:
+        name (str): The class name.
+        count (int): The number of objects.
+        format (str): The name of the format.
+
+    Returns:
+        tuple: The save and load times in seconds and the file size in bytes.
+    """
+    with temporary_storage(format=format) as path:
+        populate(name, count)
+        start = time.perf_counter()
+        storage.save()
+        saved = time.perf_counter() - start
+        storage.reload()
+        start = time.perf_counter()
+        storage.all(name)
+        loaded = time.perf_counter() - start
+        return saved, loaded, os.path.getsize(path)
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of objects per class.
+    """
+    print("{:<10} {:<7} {:>12} {:>12} {:>12}".format(
+        "class", "format", "save obj/s", "load obj/s", "bytes/obj"))
+    for name in storage.classes():
+        if name == "BaseModel":
+            continue
+        for format in SERIALIZERS:
+            saved, loaded, size = measure(name, count, format)
+            print("{:<10} {:<7} {:>12,.0f} {:>12,.0f} {:>12.1f}".format(
+                name, format, count / saved, count / loaded, size / count))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""
+Measures the radius, nearest-neighbour and bounding-box searches of the spatial
+index (GridIndex) against a linear scan of every place's coordinates.
+
+Usage: python3 -m benchmarks.bench_geo [number_of_places]
+"""
+
+import heapq
+import random
+import sys
+import time
+from benchmarks.common import timed, report
+from models.engine import geo
+from models.engine.indexes import GridIndex
+
+QUERIES = 100
+
+
+def scan_radius(points, latitude, longitude, radius):
+    """
+    Returns the keys of the points within a distance, computing every distance.
+    """
+    return [key for key, lat, lon in points if geo.distance(latitude, longitude, lat, lon) <= radius]
+
+
+def scan_nearest(points, latitude, longitude, count):
+    """
+    Returns the keys of the nearest points, computing every distance.
+    """
+    return heapq.nsmallest(count, points, key=lambda p: geo.distance(latitude, longitude, p[1], p[2]))
+
+
+def scan_box(points, south, west, north, east):
+    """
+    Returns the keys of the points in a box, testing every point.
+    """
+    return [key for key, lat, lon in points if geo.in_box(lat, lon, south, west, north, east)]
+
+
+def run(name, search, centers, count):
+    """
+    Times a search over every center and prints the time per query.
+    """
+    start = time.perf_counter()
+    for center in centers:
+        search(*center)
+    report("{} ({} places)".format(name, count), (time.perf_counter() - start) / len(centers))
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of places.
+    """
+    rng = random.Random(0)
+    points = [("Place.{}".format(i), rng.uniform(-60, 70), rng.uniform(-180, 180)) for i in range(count)]
+    index = GridIndex("Place")
+
+    def build():
+        for key, lat, lon in points:
+            index.update(key, lat, lon)
+
+    report("build the grid index", timed(build), count)
+    centers = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(QUERIES)]
+    # A scan visits every place, so it is timed over fewer queries on large counts
+    scanned = centers[:max(1, QUERIES * 10000 // count)]
+    run("radius 25 km, index", lambda lat, lon: index.within_radius(lat, lon, 25), centers, count)
+    run("radius 25 km, scan", lambda lat, lon: scan_radius(points, lat, lon, 25), scanned, count)
+    run("10 nearest, index", lambda lat, lon: index.nearest(lat, lon, 10), centers, count)
+    run("10 nearest, scan", lambda lat, lon: scan_nearest(points, lat, lon, 10), scanned, count)
+    run("1x1 degree box, index", lambda lat, lon: index.within(lat, lon, lat + 1, lon + 1), centers, count)
+    run("1x1 degree box, scan", lambda lat, lon: scan_box(points, lat, lon, lat + 1, lon + 1), scanned, count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
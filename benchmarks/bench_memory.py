@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+"""
+Measures the memory taken by each model class, with the regular and the
+compact representation, for objects rebuilt from their stored dictionaries.
+
+Usage: python3 -m benchmarks.bench_memory [objects_per_class]
+"""
+
+import sys
+import tracemalloc
+import uuid
+from benchmarks.common import temporary_storage
+from models import storage
+
+SAMPLE_VALUES = {str: "sample text", int: 3, float: 12.5, list: []}
+
+
+def sample_record(name, attributes, foreign_keys):
+    """
+    Returns the stored dictionary of an object with every declared attribute set.
+
+    Args:
+        name (str): The class name.
+        attributes (dict): The declared attributes of the class and their types.
+        foreign_keys (list): Ids the foreign keys are drawn from.
+
+    Returns:
+        dict: The dictionary representation of the object.
+    """
+    record = {"id": str(uuid.uuid4()), "created_at": "2024-01-02T03:04:05.000006",
+              "updated_at": "2024-01-02T03:04:05.000006", "__class__": name}
+    for attribute, kind in attributes.items():
+        if attribute in record:
+            continue
+        if attribute.endswith("_id"):
+            # Decoded JSON never shares strings between records
+            record[attribute] = "".join(foreign_keys[len(record) % len(foreign_keys)])
+        else:
+            record[attribute] = SAMPLE_VALUES[kind]
+    return record
+
+
+def measure(cls, records):
+    """
+    Returns the memory taken by the instances built from records.
+
+    Args:
+        cls (type): The class to instantiate.
+        records (list): The stored dictionaries.
+
+    Returns:
+        float: The number of bytes per instance.
+    """
+    tracemalloc.start()
+    objects = [cls(**dict(r)) for r in records]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / len(records)
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of objects built per class.
+    """
+    with temporary_storage():
+        attributes = storage.attributes()
+        foreign_keys = [str(uuid.uuid4()) for _ in range(max(count // 20, 1))]
+        print("{:<10} {:>14} {:>14} {:>8}".format("class", "regular B/obj", "compact B/obj", "saved"))
+        for name in storage.classes():
+            records = [sample_record(name, attributes.get(name, {}), foreign_keys)
+                       for _ in range(count)]
+            storage.configure(compact=False)
+            regular = measure(storage.classes()[name], records)
+            storage.configure(compact=True)
+            compact = measure(storage.classes()[name], records)
+            print("{:<10} {:>14.1f} {:>14.1f} {:>7.1%}".format(
+                name, regular, compact, 1 - compact / regular))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+"""
+Measures the console parser on a script of show, count and update commands in
+both syntaxes: the regular expressions the console used to run on each line
+against the single-pass tokenizer, then whole commands through run_batch().
+
+Usage: python3 -m benchmarks.bench_parser [number_of_lines]
+"""
+
+import io
+import json
+import random
+import re
+import sys
+import time
+from contextlib import redirect_stdout
+from benchmarks.common import temporary_storage, report
+from console import DOT_COMMAND, HBNBCommand, tokenize
+from models import storage
+from models.place import Place
+
+TEMPLATES = ('Place.update("{}", "name", "Loft {}")',
+             'Place.update("{}", {{"max_guest": {}, "name": "Cabin"}})',
+             'update Place {} number_rooms {}',
+             'show Place {}',
+             'Place.show("{}")',
+             'Place.count()')
+"""tuple: The commands of the script, filled with an id and a number."""
+
+
+def script(count, ids, seed=0):
+    """
+    Generates a script of commands.
+
+    Args:
+        count (int): The number of lines.
+        ids (list): The ids of the places the commands refer to.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        list: The lines.
+    """
+    rng = random.Random(seed)
+    return [rng.choice(TEMPLATES).format(rng.choice(ids), i) for i in range(count)]
+
+
+def legacy(line):
+    """
+    Parses a command line with the regular expressions the console used before the
+    tokenizer: the dot syntax was rewritten to a command line, which was split again.
+
+    Args:
+        line (str): The command line.
+
+    Returns:
+        tuple: The command and its arguments.
+    """
+    match = re.search(r"^(\w*)\.(\w+)(?:\(([^)]*)\))$", line)
+    if match:
+        classname, method, args = match.groups()
+        match_uid_and_args = re.search(r'^"([^"]*)"(?:, (.*))?$', args)
+        if match_uid_and_args:
+            uid, attr_or_dict = match_uid_and_args.groups()
+        else:
+            uid, attr_or_dict = args, None
+        attr_and_value = ""
+        if method == "update" and attr_or_dict:
+            match_dict = re.search(r'^({.*})$', attr_or_dict)
+            if match_dict:
+                return method, classname, uid, json.loads(match_dict.group(1).replace("'", '"'))
+            match_attr_and_value = re.search(r'^(?:"([^"]*)")?(?:, (.*))?$', attr_or_dict)
+            if match_attr_and_value:
+                attr_and_value = (match_attr_and_value.group(1) or "") + " " + \
+                    (match_attr_and_value.group(2) or "")
+        line = f"{method} {classname} {uid} {attr_and_value}"
+    command, _, args = line.partition(" ")
+    if command == "update":
+        rex = r'^(\S+)(?:\s(\S+)(?:\s(\S+)(?:\s((?:"[^"]*")|(?:(\S)+)))?)?)?'
+        return (command,) + re.search(rex, args).groups()[:4]
+    return (command,) + tuple(args.split(" "))
+
+
+def tokenized(line):
+    """
+    Parses a command line with the tokenizer of the console.
+
+    Args:
+        line (str): The command line.
+
+    Returns:
+        tuple: The command, the class name and the tokens.
+    """
+    match = DOT_COMMAND.match(line)
+    if match:
+        classname, method, args = match.groups()
+        return method, classname, tokenize(args)
+    command, _, args = line.partition(" ")
+    tokens = tokenize(args)
+    return command, tokens[0][0] if tokens else "", tokens[1:]
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of lines parsed; a tenth of them are run.
+    """
+    with temporary_storage():
+        places = [Place() for _ in range(100)]
+        for place in places:
+            storage.new(place)
+        lines = script(count, [place.id for place in places])
+        for name, parse in (("regular expressions", legacy), ("tokenizer", tokenized)):
+            start = time.perf_counter()
+            for line in lines:
+                parse(line)
+            report("parse, " + name, time.perf_counter() - start, count)
+        console = HBNBCommand()
+        commands = io.StringIO("\n".join(lines[:max(count // 10, 1)]) + "\n")
+        with redirect_stdout(io.StringIO()):
+            with storage.batch():
+                executed, seconds = console.run_batch(commands)
+        report("run_batch()", seconds, executed)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""
+Measures FileStorage.reload() and the cost of the first lookups afterwards,
+against loading and instantiating the whole file up front.
+
+Usage: python3 -m benchmarks.bench_reload [number_of_places]
+"""
+
+import json
+import sys
+from benchmarks.common import temporary_storage, timed, report
+from models import storage
+from models.place import Place
+
+
+def eager_load(path):
+    """
+    Loads the file the way FileStorage did before the deferred reload: the whole
+    document is parsed and every object is instantiated.
+
+    Args:
+        path (str): The file path to read.
+    """
+    classes = storage.classes()
+    with open(path, "r", encoding="utf-8") as f:
+        {k: classes[v["__class__"]](**v) for k, v in json.load(f).items()}
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of Place objects in the file.
+    """
+    with temporary_storage() as path:
+        places = [Place() for _ in range(count)]
+        storage.save()
+        report("eager load of every object", timed(eager_load, path), count)
+        report("reload()", timed(storage.reload))
+        report("first count(Place) (reads the file)", timed(storage.count, Place), count)
+        report("get() of one object", timed(storage.get, Place, places[count // 2].id))
+        report("all() (instantiates everything)", timed(storage.all), count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+"""
+Measures FileStorage.save() after a single update, with and without the
+per-object serialization cache.
+
+Usage: python3 -m benchmarks.bench_save [number_of_places]
+"""
+
+import json
+import sys
+from benchmarks.common import temporary_storage, timed, report
+from models import storage
+from models.place import Place
+
+
+def full_encode(path):
+    """
+    Saves the way FileStorage did before the serialization cache: every object
+    is converted with to_dict() and encoded again.
+
+    Args:
+        path (str): The file path to write.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({k: v.to_dict() for k, v in storage.all().items()}, f)
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of Place objects in the storage.
+    """
+    with temporary_storage() as path:
+        places = [Place() for _ in range(count)]
+        for i, place in enumerate(places):
+            place.name = "Place {}".format(i)
+            place.price_by_night = i % 500
+        report("first save (encodes everything)", timed(storage.save), count)
+        places[count // 2].price_by_night = 42
+        report("full re-encode after one update", timed(full_encode, path), count)
+        places[count // 2].price_by_night = 43
+        report("cached save after one update", timed(storage.save), count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""
+Measures FileStorage.search() against a substring scan over storage.all(), and
+loading the saved full-text index against building it again after a reload.
+
+Usage: python3 -m benchmarks.bench_search [number_of_places]
+"""
+
+import os
+import random
+import sys
+from benchmarks.common import temporary_storage, timed, report
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+WORDS = ["lake", "cabin", "quiet", "beach", "loft", "city", "garden", "view", "cozy",
+         "modern", "studio", "river", "mountain", "pool", "station", "downtown"]
+
+
+def scan(word):
+    """
+    Finds the places whose name or description contains a word, with a loop over
+    every place.
+    """
+    return [obj for obj in storage.all(Place).values()
+            if word in obj.name.lower() or word in obj.description.lower()]
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of places.
+    """
+    rng = random.Random(0)
+    vocabulary = WORDS + ["word{}".format(i) for i in range(5000)]
+    with temporary_storage() as path:
+        for _ in range(count):
+            place = Place()
+            place.name = " ".join(rng.sample(WORDS, 2))
+            place.description = " ".join(rng.choice(vocabulary) for _ in range(20))
+        storage.save()
+        report("build the index (first search)", timed(storage.search, "lake"), count)
+        storage.save()
+        report("substring scan over storage.all()", timed(scan, "word42"), count)
+        report("search()", timed(storage.search, "word42"), count)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        report("reload, load the saved index", timed(storage.search, "word42"), count)
+        os.remove(path + ".search")
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        report("reload, rebuild the index", timed(storage.search, "word42"), count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
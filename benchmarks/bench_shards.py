@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+"""
+Measures FileStorage with a single snapshot file against a snapshot sharded per
+class and by id hash: the save after a single update, and the first lookup by
+id after a reload.
+
+Usage: python3 -m benchmarks.bench_shards [number_of_places]
+"""
+
+import sys
+from benchmarks.common import temporary_storage, timed, report
+from models import storage
+from models.amenity import Amenity
+from models.place import Place
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of Place objects in the storage.
+    """
+    for shards in ("none", "class", "16"):
+        with temporary_storage(shards=shards):
+            places = [Place() for _ in range(count)]
+            for i, place in enumerate(places):
+                place.name = "Place {}".format(i)
+                place.price_by_night = i % 500
+            amenity = Amenity()
+            storage.save()
+            amenity.name = "Wifi"
+            report("save one Amenity, shards={}".format(shards), timed(storage.save), 1)
+            places[count // 2].price_by_night = 42
+            report("save one Place, shards={}".format(shards), timed(storage.save), 1)
+            storage.reload()
+            report("get after reload, shards={}".format(shards),
+                   timed(storage.get, Place, places[0].id), 1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""
+Measures the mean price_by_night of the places of each city, computed by
+FileStorage.aggregate() over its columns against a loop over storage.all().
+
+Usage: python3 -m benchmarks.bench_stats [number_of_places]
+"""
+
+import random
+import sys
+from unittest.mock import patch
+from benchmarks.common import temporary_storage, timed, report
+from models import storage
+from models.engine import analytics
+from models.place import Place
+
+
+def loop(cities):
+    """
+    Computes the mean price per city with a loop over every place.
+    """
+    sums, counts = {}, {}
+    for obj in storage.all(Place).values():
+        sums[obj.city_id] = sums.get(obj.city_id, 0) + obj.price_by_night
+        counts[obj.city_id] = counts.get(obj.city_id, 0) + 1
+    return {city: sums[city] / counts[city] for city in sums}
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of places.
+    """
+    rng = random.Random(0)
+    cities = ["city-{}".format(i) for i in range(1000)]
+    with temporary_storage():
+        for _ in range(count):
+            place = Place()
+            place.city_id = rng.choice(cities)
+            place.price_by_night = rng.randint(20, 500)
+        report("build the columns (first aggregate)", timed(storage.aggregate, Place), count)
+        report("loop over storage.all()", timed(loop, cities), count)
+        report("aggregate(), NumPy" if analytics.numpy else "aggregate(), NumPy not installed",
+               timed(storage.aggregate, Place, "price_by_night", by="city_id"), count)
+        with patch.object(analytics, "numpy", None):
+            report("aggregate(), pure Python",
+                   timed(storage.aggregate, Place, "price_by_night", by="city_id"), count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+Measures the timestamp handling of BaseModel when objects are rebuilt from
+the file and when they are saved, against the strptime-based parsing used
+before.
+
+Usage: python3 -m benchmarks.bench_timestamps [number_of_places]
+"""
+
+import json
+import sys
+from datetime import datetime
+from benchmarks.common import temporary_storage, timed, report
+from models import storage
+from models.engine import timestamps
+from models.place import Place
+
+
+def strptime_load(records):
+    """
+    Rebuilds objects the way BaseModel.__init__ did before: each attribute is
+    assigned with setattr() and the timestamps are parsed with strptime().
+
+    Args:
+        records (list): The dictionary representations of the objects.
+    """
+    for record in records:
+        obj = Place.__new__(Place)
+        for key, value in record.items():
+            if key == "created_at" or key == "updated_at":
+                setattr(obj, key, datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f"))
+            elif key != "__class__":
+                setattr(obj, key, value)
+
+
+def fast_load(records):
+    """
+    Rebuilds objects through BaseModel.__init__.
+
+    Args:
+        records (list): The dictionary representations of the objects.
+    """
+    for record in records:
+        Place(**record)
+
+
+def main(count):
+    """
+    Runs the benchmark.
+
+    Args:
+        count (int): The number of objects.
+    """
+    with temporary_storage():
+        places = [Place() for _ in range(count)]
+        records = [p.to_dict() for p in places]
+        for record, place in zip(records, places):
+            # isoformat() drops ".%f" when microsecond is 0, which strptime() rejects
+            record["created_at"] = place.created_at.strftime("%Y-%m-%dT%H:%M:%S.%f")
+            record["updated_at"] = place.updated_at.strftime("%Y-%m-%dT%H:%M:%S.%f")
+        values = [r["created_at"] for r in records]
+        report("strptime() per timestamp", timed(
+            lambda: [datetime.strptime(v, "%Y-%m-%dT%H:%M:%S.%f") for v in values]), count)
+        report("timestamps.parse() per timestamp", timed(
+            lambda: [timestamps.parse(v) for v in values]), count)
+        report("reload: strptime + setattr", timed(strptime_load, records), count)
+        report("reload: BaseModel.__init__", timed(fast_load, records), count)
+        report("save: to_dict() + json.dumps()", timed(
+            lambda: [json.dumps(p.to_dict()) for p in places]), count)
+        report("save: storage.save() from scratch", timed(storage.save), count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""Helpers shared by the benchmarks."""
+
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+from models import storage
+from models.engine.file_storage import FileStorage
+
+
+@contextlib.contextmanager
+def temporary_storage(**options):
+    """
+    Points the storage to an empty file in a temporary directory for the duration
+    of a benchmark, then restores the default configuration.
+
+    Args:
+        **options: Extra options passed to FileStorage.configure().
+
+    Yields:
+        str: The file path of the temporary snapshot.
+    """
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "file.json")
+    storage.configure(file_path=path, **options)
+    FileStorage._FileStorage__objects = {}
+    try:
+        yield path
+    finally:
+        storage.configure(file_path="file.json", mode="snapshot", compact=False,
+                          format="json", durability="flush", commit_size=0,
+                          commit_interval=0, shards=0)
+        FileStorage._FileStorage__objects = {}
+        shutil.rmtree(tmpdir)
+
+
+def timed(func, *args, **kwargs):
+    """
+    Calls a function and measures how long it takes.
+
+    Args:
+        func (callable): The function to call.
+        *args: Positional arguments for func.
+        **kwargs: Keyword arguments for func.
+
+    Returns:
+        float: The elapsed wall-clock time in seconds.
+    """
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def report(name, seconds, count=None):
+    """
+    Prints one benchmark result.
+
+    Args:
+        name (str): The name of the measured operation.
+        seconds (float): The elapsed time in seconds.
+        count (int): The number of items processed, to print a throughput.
+    """
+    line = "{:<40} {:>10.4f} s".format(name, seconds)
+    if count:
+        line += " {:>14,.0f} /s".format(count / seconds if seconds else float("inf"))
+    print(line)
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+"""
+Generates synthetic object graphs for the benchmarks: states and their cities,
+users, amenities, places in the cities owned by users, and reviews of the
+places. The same seed always produces the same objects, ids included.
+
+Usage: python3 -m benchmarks.generate number_of_objects [file_path]
+"""
+
+import random
+import sys
+import uuid
+from models import storage
+
+SHARES = (("State", 0.01), ("City", 0.05), ("User", 0.20), ("Amenity", 0.01),
+          ("Place", 0.30), ("Review", 0.43))
+"""tuple: The classes of a graph, in creation order, and their share of its objects."""
+
+WORDS = ("cozy", "loft", "river", "view", "quiet", "garden", "central", "bright",
+         "station", "beach", "old", "town", "modern", "studio", "family", "pool")
+"""tuple: The words names, descriptions and reviews are drawn from."""
+
+
+def counts(total):
+    """
+    Returns how many objects of each class a graph of a given size holds.
+
+    Args:
+        total (int): The number of objects in the graph.
+
+    Returns:
+        dict: The number of objects of each class, at least 1, in creation order.
+    """
+    return {name: max(int(total * share), 1) for name, share in SHARES}
+
+
+def generate_records(total, seed=0):
+    """
+    Returns the stored dictionaries of a graph of objects.
+
+    Args:
+        total (int): The number of objects in the graph, about.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        list: The dictionary representation of each object, in creation order.
+    """
+    rng = random.Random(seed)
+    ids = {}
+    records = []
+
+    def text(words):
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    for name, count in counts(total).items():
+        ids[name] = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(count)]
+        for id in ids[name]:
+            stamp = "2024-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}.{:06d}".format(
+                rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23),
+                rng.randint(0, 59), rng.randint(0, 59), rng.randint(0, 999999))
+            record = {"id": id, "created_at": stamp, "updated_at": stamp, "__class__": name}
+            if name in ("State", "Amenity"):
+                record["name"] = text(1).title()
+            elif name == "City":
+                record.update(name=text(2).title(), state_id=rng.choice(ids["State"]))
+            elif name == "User":
+                record.update(email="user{}@example.com".format(len(records)),
+                              password=text(1), first_name=text(1).title(),
+                              last_name=text(1).title())
+            elif name == "Place":
+                record.update(city_id=rng.choice(ids["City"]), user_id=rng.choice(ids["User"]),
+                              name=text(2).title(), description=text(12),
+                              number_rooms=rng.randint(1, 6), number_bathrooms=rng.randint(1, 3),
+                              max_guest=rng.randint(1, 10), price_by_night=rng.randint(20, 500),
+                              latitude=rng.uniform(-60.0, 70.0), longitude=rng.uniform(-180.0, 180.0),
+                              amenity_ids=rng.sample(ids["Amenity"], min(3, len(ids["Amenity"]))))
+            else:
+                record.update(place_id=rng.choice(ids["Place"]), user_id=rng.choice(ids["User"]),
+                              text=text(20))
+            records.append(record)
+    return records
+
+
+def build(records):
+    """
+    Instantiates objects from their stored dictionaries, without adding them to the
+    storage.
+
+    Args:
+        records (list): The dictionary representation of each object.
+
+    Returns:
+        list: The objects.
+    """
+    classes = storage.classes()
+    return [classes[record["__class__"]](**dict(record)) for record in records]
+
+
+def populate(total, seed=0):
+    """
+    Adds a graph of objects to the storage.
+
+    Args:
+        total (int): The number of objects in the graph, about.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        list: The objects.
+    """
+    objects = build(generate_records(total, seed))
+    for obj in objects:
+        storage.new(obj)
+    return objects
+
+
+def main(total, path=None):
+    """
+    Writes a graph of objects to a storage file.
+
+    Args:
+        total (int): The number of objects in the graph, about.
+        path (str): The file path, the configured storage file by default.
+    """
+    if path:
+        storage.configure(file_path=path)
+    storage.reload()
+    populate(total)
+    storage.save()
+    storage.flush()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]), sys.argv[2] if len(sys.argv) > 2 else None)
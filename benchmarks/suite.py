@@ -0,0 +1,231 @@
+#!/usr/bin/python3
+"""
+Runs the storage benchmark suite on synthetic object graphs of several sizes,
+and writes the results as JSON so that runs can be compared.
+
+Each size runs in its own Python process, so that its peak memory is measured
+alone. The storage options set through the HBNB_* environment variables, such
+as HBNB_STORAGE_MODE or HBNB_STORAGE_SHARDS, apply to every run.
+
+Usage: python3 -m benchmarks.suite [--sizes 1000,10000] [--repeat 3]
+                                   [--output results.json]
+                                   [--baseline previous.json] [--tolerance 0.2]
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from benchmarks.common import temporary_storage
+from benchmarks.generate import build, generate_records
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LOOKUPS = 10000
+"""int: The number of objects looked up by id."""
+
+UPDATES = 10
+"""int: The number of update commands run through the console."""
+
+
+def peak_rss():
+    """
+    Returns the peak resident memory of the process.
+
+    Returns:
+        int: The peak resident set size in kilobytes, or None where it is unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure(size, seed=0):
+    """
+    Runs every benchmark on one graph, in the current process.
+
+    Args:
+        size (int): The number of objects in the graph, about.
+        seed (int): The seed of the graph generator.
+
+    Returns:
+        dict: The "seconds" and the number of "operations" of each benchmark, by
+        name, and the "peak_rss_kb" of the process.
+    """
+    from console import HBNBCommand
+    from models import storage
+
+    results = {}
+
+    def timed(name, operations, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        results[name] = {"seconds": time.perf_counter() - start, "operations": operations}
+        return value
+
+    with temporary_storage():
+        storage.reload()
+        records = timed("generate", size, generate_records, size, seed)
+        objects = timed("instantiate", len(records), build, records)
+        timed("new", len(objects), lambda: [storage.new(obj) for obj in objects])
+        timed("save", len(objects), lambda: storage.save() or storage.flush())
+        timed("save_unchanged", len(objects), lambda: storage.save() or storage.flush())
+        objects[len(objects) // 2].name = "Renamed"
+        timed("save_one_change", 1, lambda: storage.save() or storage.flush())
+        rng = random.Random(seed)
+        keys = [(type(obj).__name__, obj.id) for obj in rng.choices(objects, k=LOOKUPS)]
+        place = next(obj for obj in objects if type(obj).__name__ == "Place")
+        del records, objects
+        timed("reload", 1, storage.reload)
+        timed("count_after_reload", 1, storage.count)
+        timed("get_after_reload", len(keys), lambda: [storage.get(*key) for key in keys])
+        timed("get", len(keys), lambda: [storage.get(*key) for key in keys])
+        console = HBNBCommand()
+        with contextlib.redirect_stdout(io.StringIO()):
+            timed("console_count", 1, console.onecmd, "count Place")
+            timed("console_all", 1, console.onecmd, "all Place")
+            timed("console_update", UPDATES, lambda: [
+                console.onecmd('update Place {} name "Loft {}"'.format(place.id, i))
+                for i in range(UPDATES)])
+            storage.flush()
+    results["peak_rss_kb"] = peak_rss()
+    return results
+
+
+def run(size, seed=0):
+    """
+    Runs every benchmark on one graph, in a new Python process.
+
+    Args:
+        size (int): The number of objects in the graph, about.
+        seed (int): The seed of the graph generator.
+
+    Returns:
+        dict: The results, see measure().
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env.pop("HBNB_TYPE_STORAGE", None)
+    output = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--child", str(size),
+                             "--seed", str(seed)], cwd=root, env=env, check=True,
+                            stdout=subprocess.PIPE).stdout
+    return json.loads(output)
+
+
+def fastest(runs):
+    """
+    Merges the results of several runs of the same graph, keeping the fastest time
+    of each benchmark and the highest peak memory.
+
+    Args:
+        runs (list): The results of each run, see measure().
+
+    Returns:
+        dict: The merged results.
+    """
+    merged = dict(runs[0])
+    for results in runs[1:]:
+        for name, result in results.items():
+            if name == "peak_rss_kb":
+                merged[name] = max(merged[name] or 0, result or 0) or None
+            elif result["seconds"] < merged[name]["seconds"]:
+                merged[name] = result
+    return merged
+
+
+def compare(baseline, current, tolerance):
+    """
+    Prints how much slower or faster each benchmark ran than in a previous run.
+
+    Args:
+        baseline (dict): The document written by a previous run.
+        current (dict): The document of this run.
+        tolerance (float): The slowdown, as a fraction, above which a benchmark is
+            reported as a regression.
+
+    Returns:
+        int: The number of regressions.
+    """
+    regressions = 0
+    for size, results in current["results"].items():
+        previous = baseline.get("results", {}).get(size, {})
+        for name, result in results.items():
+            if name == "peak_rss_kb" or name not in previous:
+                continue
+            before = previous[name]["seconds"]
+            ratio = result["seconds"] / before if before else float("inf")
+            flag = ""
+            if ratio > 1 + tolerance:
+                flag = " REGRESSION"
+                regressions += 1
+            print("{:>9} {:<20} {:>10.4f} s -> {:>10.4f} s {:>7.2f}x{}".format(
+                size, name, before, result["seconds"], ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the suite.
+
+    Args:
+        argv (list): The command-line arguments, sys.argv[1:] by default.
+
+    Returns:
+        int: The exit status, 1 if a regression was found against the baseline.
+    """
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.suite",
+                                     description="Storage benchmark suite.")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma-separated graph sizes (default 1000,10000,100000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the graph generator")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="runs of each size, keeping the fastest time (default 1)")
+    parser.add_argument("--output", help="file to write the JSON results to (default stdout)")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="slowdown reported as a regression (default 0.2, 20%%)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child is not None:
+        json.dump(measure(args.child, args.seed), sys.stdout)
+        return 0
+    document = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "environment": {k: v for k, v in sorted(os.environ.items()) if k.startswith("HBNB_")},
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for size in args.sizes.split(","):
+        print("running {} objects".format(size), file=sys.stderr)
+        document["results"][size] = fastest([run(int(size), args.seed)
+                                             for _ in range(max(args.repeat, 1))])
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, document, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
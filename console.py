@@ -7,10 +7,119 @@ interface for interacting with the HBNB application.
 """
 
 import cmd
+import csv
+import os
+import sys
+import time
+import argparse
+import uuid
+from datetime import datetime
 from models.base_model import BaseModel
 from models import storage
+from models.engine import bulk
+from models.engine import metrics
+from models.engine import query
 import re
 import json
+import ast
+
+DOT_COMMAND = re.compile(r"(\w*)\.(\w+)\((.*)\)$")
+"""re.Pattern: A command of the form <class name>.<method>(<arguments>)."""
+
+TOKEN = re.compile(r"""\s*(?:"([^"\\]*(?:\\.[^"\\]*)*)"|'([^'\\]*(?:\\.[^'\\]*)*)'|"""
+                   r"""([{\[].*)|([^\s,"'{}\[\]]+)|(\S))\s*,?""", re.DOTALL)
+"""re.Pattern: One token of command arguments and its separator: a double or single
+quoted string, a dictionary or list literal running to the end, a bare word, or a
+character that starts none of them."""
+
+SPECIAL = re.compile(r"""["'{}\[\]]""")
+"""re.Pattern: A character of command arguments that bare words do not hold."""
+
+ESCAPE = re.compile(r"\\(.)")
+"""re.Pattern: A backslash escape in a quoted string."""
+
+WORD = "word"
+"""str: The kind of the bare word tokens."""
+
+STRING = "string"
+"""str: The kind of the quoted string tokens."""
+
+LITERAL = "literal"
+"""str: The kind of the dictionary and list tokens."""
+
+
+def literal(text):
+    """
+    Evaluates a dictionary or list literal, written in JSON or in Python.
+
+    Args:
+        text (str): The literal.
+
+    Returns:
+        dict or list: Its value.
+
+    Raises:
+        ValueError: If the text is not a valid literal.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        raise ValueError("invalid literal: {}".format(text)) from None
+
+
+def tokenize(text):
+    """
+    Splits command arguments into tokens, in a single pass: quoted strings, with
+    backslash escapes, and bare words, separated by spaces or commas. A dictionary
+    or list literal, which must come last, is one token, read as JSON or as a Python
+    literal. Arguments made of bare words only are split with str.split().
+
+    For example, '"1234", {"name": "Loft"}' gives [("1234", STRING),
+    ({"name": "Loft"}, LITERAL)].
+
+    Args:
+        text (str): The arguments.
+
+    Returns:
+        list: Pairs of (value, kind), kind being WORD, STRING or LITERAL.
+
+    Raises:
+        ValueError: If a literal or a quoted string is malformed.
+    """
+    if not SPECIAL.search(text):
+        return [(word, WORD) for word in text.replace(",", " ").split()]
+    tokens = []
+    for double, single, value, word, other in TOKEN.findall(text):
+        if word:
+            tokens.append((word, WORD))
+        elif value:
+            tokens.append((literal(value.rstrip()), LITERAL))
+        elif other:
+            raise ValueError("unexpected {}: {}".format(other, text))
+        else:
+            value = double or single
+            tokens.append((ESCAPE.sub(r"\1", value) if "\\" in value else value, STRING))
+    return tokens
+
+
+def number(word):
+    """
+    Converts a bare word to a number when it is one.
+
+    Args:
+        word (str): The word.
+
+    Returns:
+        int or float or str: The number, or the word itself.
+    """
+    try:
+        return float(word) if "." in word else int(word)
+    except ValueError:
+        return word
 
 
 class HBNBCommand(cmd.Cmd):
@@ -24,90 +133,203 @@ class HBNBCommand(cmd.Cmd):
     # Uncomment the following line for a different prompt
     #prompt = "Type >> "
 
+    def __init__(self, *args, **kwargs):
+        """
+        Initializes the console and its dispatch tables.
+
+        Args:
+            *args: Positional arguments for cmd.Cmd.
+            **kwargs: Keyword arguments for cmd.Cmd.
+        """
+        super().__init__(*args, **kwargs)
+        self.__commands = {name[3:]: getattr(self, name)
+                           for name in self.get_names() if name.startswith("do_")}
+        self.__calls = {"all": self._all, "count": self._count, "show": self._show,
+                        "destroy": self._destroy, "update": self._update}
+
+    def onecmd(self, line):
+        """
+        Runs one command. The command name is looked up in a table of the do_*
+        methods built once; other lines, such as help, empty lines and the
+        class.method(arguments) syntax, go through cmd.Cmd. The latency of each
+        command is recorded as "console.<command>".
+
+        Args:
+            line (str): The command line input.
+
+        Returns:
+            bool: Whether the console must exit.
+        """
+        words = line.split(None, 1)
+        handler = self.__commands.get(words[0]) if words else None
+        if handler is None:
+            return super().onecmd(line)
+        self.lastcmd = line if words[0] != "EOF" else ""
+        return self._run(words[0], handler, words[1].strip() if len(words) > 1 else "")
+
+    @staticmethod
+    def _run(name, func, *args):
+        """
+        Calls a command handler, recording its latency as "console.<name>".
+
+        Args:
+            name (str): The command name.
+            func (callable): The handler.
+            *args: Arguments for func.
+
+        Returns:
+            The result of func.
+        """
+        if not metrics.METRICS.enabled:
+            return func(*args)
+        start = time.perf_counter_ns()
+        try:
+            return func(*args)
+        finally:
+            metrics.METRICS.record("console." + name, time.perf_counter_ns() - start)
+
     def default(self, line):
         """
         Default handler for commands that are not explicitly defined.
         This method is called for any command that does not match a specific method
-        and passes the command line to _precmd() for further processing.
-        
+        and runs the commands of the form class.method(arguments). The arguments are
+        tokenized in a single pass, and all, count, show, destroy and update are called
+        with them directly; the other commands get them as a line of words.
+
         Args:
             line (str): The command line input.
         """
-        # print("DEF:::", line)
-        self._precmd(line)
+        match = DOT_COMMAND.match(line.strip())
+        if not match:
+            return
+        classname, method, args = match.groups()
+        tokens = self._tokens(args)
+        if tokens is None:
+            return
+        call = self.__calls.get(method)
+        if call is not None:
+            return self._run(method, call, classname, tokens)
+        handler = self.__commands.get(method)
+        if handler is not None:
+            return self._run(method, handler, " ".join([classname] + [t[0] for t in tokens]))
 
-    def _precmd(self, line):
+    @staticmethod
+    def _tokens(text):
         """
-        Intercepts and processes commands to determine if they match the format
-        class.method(arguments). If a match is found, the method is called with the
-        provided arguments.
-        
+        Tokenizes command arguments, printing an error if they are malformed.
+
         Args:
-            line (str): The command line input.
-        
+            text (str): The arguments.
+
         Returns:
-            str: The reformatted command if it matches the pattern; otherwise, returns the original line.
+            list: The tokens, see tokenize(), or None.
         """
-        # print("PRECMD:::", line)
-        match = re.search(r"^(\w*)\.(\w+)(?:\(([^)]*)\))$", line)
-        if not match:
-            return line
-        
-        classname = match.group(1)
-        method = match.group(2)
-        args = match.group(3)
-        
-        match_uid_and_args = re.search(r'^"([^"]*)"(?:, (.*))?$', args)
-        if match_uid_and_args:
-            uid = match_uid_and_args.group(1)
-            attr_or_dict = match_uid_and_args.group(2)
-        else:
-            uid = args
-            attr_or_dict = None
-
-        attr_and_value = ""
-        if method == "update" and attr_or_dict:
-            match_dict = re.search(r'^({.*})$', attr_or_dict)
-            if match_dict:
-                self.update_dict(classname, uid, match_dict.group(1))
-                return ""
-            match_attr_and_value = re.search(r'^(?:"([^"]*)")?(?:, (.*))?$', attr_or_dict)
-            if match_attr_and_value:
-                attr_and_value = (match_attr_and_value.group(1) or "") + " " + (match_attr_and_value.group(2) or "")
-        
-        command = f"{method} {classname} {uid} {attr_and_value}"
-        self.onecmd(command)
-        return command
+        try:
+            return tokenize(text)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return None
 
-    def update_dict(self, classname, uid, s_dict):
+    def _arguments(self, line):
         """
-        Updates an instance using a dictionary of attributes.
+        Tokenizes the arguments of a command of the form "<verb> <class name> ...".
 
         Args:
-            classname (str): The class name of the instance to update.
-            uid (str): The unique identifier of the instance to update.
-            s_dict (str): A JSON string representing the attributes to update.
+            line (str): The arguments, after the command name.
+
+        Returns:
+            tuple: The class name, "" if missing, and the tokens after it; or None if
+            the arguments are malformed.
+        """
+        tokens = self._tokens(line)
+        if tokens is None:
+            return None
+        return (tokens[0][0] if tokens else ""), tokens[1:]
+
+    def _instance(self, classname, tokens):
+        """
+        Looks up the instance named by a class name and the first token, printing
+        why if there is none.
+
+        Args:
+            classname (str): The class name.
+            tokens (list): The tokens after the class name, the id first.
+
+        Returns:
+            BaseModel: The instance, or None.
         """
-        s = s_dict.replace("'", '"')
-        d = json.loads(s)
-        
         if not classname:
             print("** class name missing **")
         elif classname not in storage.classes():
             print("** class doesn't exist **")
-        elif uid is None:
+        elif not tokens:
             print("** instance id missing **")
         else:
-            key = f"{classname}.{uid}"
-            if key not in storage.all():
+            obj = storage.get(classname, str(tokens[0][0]))
+            if obj is None:
                 print("** no instance found **")
-            else:
-                attributes = storage.attributes()[classname]
-                for attribute, value in d.items():
-                    if attribute in attributes:
-                        value = attributes[attribute](value)
-                    setattr(storage.all()[key], attribute, value)
-                storage.all()[key].save()
+            return obj
+        return None
+
+    def update_dict(self, classname, uid, s_dict):
+        """
+        Updates an instance using a dictionary of attributes.
+
+        Args:
+            classname (str): The class name of the instance to update.
+            uid (str): The unique identifier of the instance to update.
+            s_dict (dict or str): The attributes to update, or a Python or JSON literal
+                of them.
+        """
+        if isinstance(s_dict, str):
+            try:
+                s_dict = literal(s_dict)
+            except ValueError as error:
+                print("** {} **".format(error))
+                return
+        if not isinstance(s_dict, dict):
+            print("** dictionary expected **")
+            return
+        obj = self._instance(classname, [(uid, STRING)] if uid is not None else [])
+        if obj is None:
+            return
+        values = {}
+        for attribute, value in s_dict.items():
+            try:
+                values[attribute] = self._typed(classname, attribute, value)
+            except ValueError as error:
+                print("** {} **".format(error))
+                return
+        for attribute, value in values.items():
+            setattr(obj, attribute, value)
+        obj.save()
+
+    @staticmethod
+    def _typed(classname, attribute, value):
+        """
+        Converts a value to the type of an attribute, if the class declares it.
+
+        Args:
+            classname (str): The class name.
+            attribute (str): The attribute name.
+            value: The value.
+
+        Returns:
+            The converted value.
+
+        Raises:
+            ValueError: If the value cannot be converted, or is not a list for a list
+                attribute.
+        """
+        kind = storage.attributes()[classname].get(attribute)
+        if kind is None:
+            return value
+        if kind is list and not isinstance(value, list):
+            raise ValueError("invalid value for {}".format(attribute))
+        try:
+            return kind(value)
+        except (TypeError, ValueError):
+            raise ValueError("invalid value for {}".format(attribute))
 
     def do_EOF(self, line):
         """
@@ -134,6 +356,41 @@ class HBNBCommand(cmd.Cmd):
         """
         return True
 
+    def postloop(self):
+        """
+        Writes the saves deferred by group commit before the console exits.
+        """
+        storage.flush()
+
+    def run_batch(self, stream, commit_every=0):
+        """
+        Runs the commands read from a stream without prompting, such as a script file
+        or a pipe. The saves made by the commands are deferred and written once at the
+        end, or every commit_every commands. Blank lines and lines starting with '#'
+        are skipped; 'quit' and 'EOF' stop the batch.
+
+        Args:
+            stream (file): The commands, one per line.
+            commit_every (int): The number of commands after which deferred saves are
+                written (0 to write them only at the end).
+
+        Returns:
+            tuple: The number of commands run and the elapsed time in seconds.
+        """
+        count = 0
+        start = time.perf_counter()
+        with storage.batch():
+            for line in stream:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                count += 1
+                if self.onecmd(self.precmd(line)):
+                    break
+                if commit_every and count % commit_every == 0:
+                    storage.flush()
+        return count, time.perf_counter() - start
+
     def emptyline(self):
         """
         Overrides the default behavior for an empty line. Does nothing on ENTER key press.
@@ -142,20 +399,53 @@ class HBNBCommand(cmd.Cmd):
 
     def do_create(self, line):
         """
-        Creates a new instance of a class.
+        Creates a new instance of a class, optionally setting attributes given as
+        key="string value" (underscores stand for spaces), key=integer or key=float.
 
         Args:
-            line (str): The class name of the instance to create.
+            line (str): The class name of the instance to create, followed by its parameters.
         """
-        if not line:
+        words = line.split()
+        if not words:
             print("** class name missing **")
-        elif line not in storage.classes():
+        elif words[0] not in storage.classes():
             print("** class doesn't exist **")
         else:
-            b = storage.classes()[line]()
+            b = storage.classes()[words[0]]()
+            attributes = storage.attributes()[words[0]]
+            for param in words[1:]:
+                attribute, _, value = param.partition("=")
+                value = self._parse_param(value)
+                if not attribute or value is None:
+                    continue
+                if attribute in attributes:
+                    try:
+                        value = attributes[attribute](value)
+                    except (TypeError, ValueError):
+                        continue
+                setattr(b, attribute, value)
             b.save()
             print(b.id)
 
+    @staticmethod
+    def _parse_param(value):
+        """
+        Converts the value of a create parameter: a double-quoted string, in which
+        underscores stand for spaces and quotes are escaped, an integer or a float.
+
+        Args:
+            value (str): The value as typed.
+
+        Returns:
+            str or int or float: The value, or None if it has none of these forms.
+        """
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            return value[1:-1].replace('\\"', '"').replace("_", " ")
+        try:
+            return float(value) if "." in value else int(value)
+        except ValueError:
+            return None
+
     def do_show(self, line):
         """
         Prints the string representation of an instance.
@@ -163,20 +453,21 @@ class HBNBCommand(cmd.Cmd):
         Args:
             line (str): The class name and ID of the instance to display.
         """
-        if not line:
-            print("** class name missing **")
-        else:
-            words = line.split(' ')
-            if words[0] not in storage.classes():
-                print("** class doesn't exist **")
-            elif len(words) < 2:
-                print("** instance id missing **")
-            else:
-                key = f"{words[0]}.{words[1]}"
-                if key not in storage.all():
-                    print("** no instance found **")
-                else:
-                    print(storage.all()[key])
+        arguments = self._arguments(line)
+        if arguments is not None:
+            self._show(*arguments)
+
+    def _show(self, classname, tokens):
+        """
+        Prints the string representation of an instance.
+
+        Args:
+            classname (str): The class name of the instance.
+            tokens (list): The tokens after the class name, the id first.
+        """
+        obj = self._instance(classname, tokens)
+        if obj is not None:
+            print(obj)
 
     def do_destroy(self, line):
         """
@@ -185,21 +476,22 @@ class HBNBCommand(cmd.Cmd):
         Args:
             line (str): The class name and ID of the instance to delete.
         """
-        if not line:
-            print("** class name missing **")
-        else:
-            words = line.split(' ')
-            if words[0] not in storage.classes():
-                print("** class doesn't exist **")
-            elif len(words) < 2:
-                print("** instance id missing **")
-            else:
-                key = f"{words[0]}.{words[1]}"
-                if key not in storage.all():
-                    print("** no instance found **")
-                else:
-                    del storage.all()[key]
-                    storage.save()
+        arguments = self._arguments(line)
+        if arguments is not None:
+            self._destroy(*arguments)
+
+    def _destroy(self, classname, tokens):
+        """
+        Deletes an instance.
+
+        Args:
+            classname (str): The class name of the instance.
+            tokens (list): The tokens after the class name, the id first.
+        """
+        obj = self._instance(classname, tokens)
+        if obj is not None:
+            storage.delete(obj)
+            storage.save()
 
     def do_all(self, line):
         """
@@ -208,17 +500,40 @@ class HBNBCommand(cmd.Cmd):
         Args:
             line (str): The class name to filter by (empty string for all instances).
         """
-        if line:
-            words = line.split(' ')
-            if words[0] not in storage.classes():
-                print("** class doesn't exist **")
-            else:
-                nl = [str(obj) for key, obj in storage.all().items()
-                      if type(obj).__name__ == words[0]]
-                print(nl)
+        self._all(line.split(" ", 1)[0], ())
+
+    def _all(self, classname, tokens):
+        """
+        Prints string representations of all instances, or all instances of a class.
+
+        Args:
+            classname (str): The class name, "" for all instances.
+            tokens (list): The tokens after the class name, ignored.
+        """
+        if not classname:
+            self._print_list(storage.all().values())
+        elif classname not in storage.classes():
+            print("** class doesn't exist **")
         else:
-            new_list = [str(obj) for key, obj in storage.all().items()]
-            print(new_list)
+            self._print_list(storage.all(classname).values())
+
+    @staticmethod
+    def _print_list(objects):
+        """
+        Prints the string representations of objects the way a list of them is printed,
+        one element at a time rather than building the list and its representation.
+
+        Args:
+            objects (iterable): The objects to print.
+        """
+        write = sys.stdout.write
+        write("[")
+        separator = ""
+        for obj in objects:
+            write(separator)
+            write(repr(str(obj)))
+            separator = ", "
+        write("]\n")
 
     def do_count(self, line):
         """
@@ -227,69 +542,380 @@ class HBNBCommand(cmd.Cmd):
         Args:
             line (str): The class name to count instances of.
         """
-        words = line.split(' ')
-        if not words[0]:
+        self._count(line.split(" ", 1)[0], ())
+
+    def _count(self, classname, tokens):
+        """
+        Prints the number of instances of a class.
+
+        Args:
+            classname (str): The class name.
+            tokens (list): The tokens after the class name, ignored.
+        """
+        if not classname:
+            print("** class name missing **")
+        elif classname not in storage.classes():
+            print("** class doesn't exist **")
+        else:
+            print(storage.count(classname))
+
+    def _bulk_args(self, line):
+        """
+        Parses and validates the '<class name> <file>' arguments of import and export.
+
+        Args:
+            line (str): The class name and file path.
+
+        Returns:
+            tuple: The class name and file path, or None after printing an error.
+        """
+        words = line.split(maxsplit=1)
+        if not words:
             print("** class name missing **")
         elif words[0] not in storage.classes():
             print("** class doesn't exist **")
+        elif len(words) < 2:
+            print("** file name missing **")
         else:
-            matches = [k for k in storage.all() if k.startswith(words[0] + '.')]
-            print(len(matches))
+            try:
+                bulk.file_format(words[1])
+            except ValueError:
+                print("** unsupported file format **")
+                return None
+            return words[0], words[1]
+        return None
 
-    def do_update(self, line):
+    def do_import(self, line):
         """
-        Updates an instance by adding or modifying an attribute.
+        Creates instances of a class from the records of a JSON Lines (.jsonl) or CSV
+        (.csv) file, then saves them all at once. Values are converted to the types of
+        the class attributes; records that cannot be converted are reported and skipped.
 
         Args:
-            line (str): The class name, instance ID, attribute name, and value to update.
+            line (str): The class name and the file path.
+        """
+        args = self._bulk_args(line)
+        if args is None:
+            return
+        classname, path = args
+        if not os.path.isfile(path):
+            print("** file doesn't exist **")
+            return
+        cls = storage.classes()[classname]
+        attributes = storage.attributes()
+        types = dict(attributes["BaseModel"], **attributes[classname])
+        count = 0
+        skipped = []
+
+        def skip(number, message):
+            print("** line {}: {} **".format(number, message))
+            skipped.append(number)
+
+        start = time.perf_counter()
+        try:
+            for number, record in bulk.read(path, skip):
+                try:
+                    fields = bulk.coerce(record, types)
+                except ValueError as error:
+                    skip(number, error)
+                    continue
+                if "id" not in fields:
+                    fields["id"] = str(uuid.uuid4())
+                now = datetime.now()
+                fields.setdefault("created_at", now)
+                fields.setdefault("updated_at", now)
+                storage.new(cls(**fields))
+                count += 1
+        except (OSError, csv.Error, UnicodeDecodeError) as error:
+            print("** {} **".format(error))
+        if count:
+            storage.save()
+        elapsed = time.perf_counter() - start
+        print("{} {} imported, {} skipped in {:.3f} s ({:,.0f} objects/s)".format(
+            count, classname, len(skipped), elapsed, count / elapsed if elapsed else 0.0))
+
+    def do_export(self, line):
+        """
+        Writes every instance of a class to a JSON Lines (.jsonl) or CSV (.csv) file.
+
+        Args:
+            line (str): The class name and the file path.
+        """
+        args = self._bulk_args(line)
+        if args is None:
+            return
+        classname, path = args
+        start = time.perf_counter()
+        try:
+            attributes = storage.attributes()
+            count = bulk.write(path, storage.all(classname).values(),
+                               set(attributes["BaseModel"]) | set(attributes[classname]))
+        except OSError as error:
+            print("** {} **".format(error.strerror or error))
+            return
+        elapsed = time.perf_counter() - start
+        print("{} {} exported in {:.3f} s ({:,.0f} objects/s)".format(
+            count, classname, elapsed, count / elapsed if elapsed else 0.0))
+
+    def do_query(self, line):
         """
-        if not line:
+        Prints the instances of a class matching attribute predicates, one per line.
+
+        Usage: query <class name> [<attribute><op><value> ...] [order_by=[-]<attribute>]
+        [limit=<n>] [offset=<n>] [fields=<attribute>,...]
+        where <op> is one of = != < <= > >=, for example:
+        query Place price_by_night<100 max_guest>=4 order_by=-max_guest limit=10
+        Double-quoted values may hold spaces, as in query Place name == "Big House".
+
+        Args:
+            line (str): The class name, predicates and options.
+        """
+        try:
+            words = query.split(line)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        if not words:
             print("** class name missing **")
             return
+        if words[0] not in storage.classes():
+            print("** class doesn't exist **")
+            return
+        classname = words[0]
+        attributes = storage.attributes()
+        types = dict(attributes["BaseModel"], **attributes[classname])
+        try:
+            options = query.parse(words[1:], types)
+            fields = options["fields"]
+            if fields and "id" not in fields:
+                options["fields"] = fields + ["id"]
+            results = storage.query(classname, **options)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        for result in results:
+            if fields is None:
+                print(result)
+                continue
+            uid = result["id"] if "id" in fields else result.pop("id")
+            print("[{}] ({}) {}".format(classname, uid, result))
 
-        rex = r'^(\S+)(?:\s(\S+)(?:\s(\S+)(?:\s((?:"[^"]*")|(?:(\S)+)))?)?)?'
-        match = re.search(rex, line)
-        if not match:
+    def do_stats(self, line):
+        """
+        Prints the count, sum, mean, minimum and maximum of a numeric attribute of the
+        instances of a class, or only their count, optionally per value of a foreign key.
+
+        Usage: stats <class name> [<numeric attribute>] [by=<foreign key>]
+        For example: stats Place price_by_night by=city_id, stats Review by=place_id
+
+        Args:
+            line (str): The class name, the attribute and the foreign key.
+        """
+        words = line.split()
+        if not words:
             print("** class name missing **")
             return
-        
-        classname = match.group(1)
-        uid = match.group(2)
-        attribute = match.group(3)
-        value = match.group(4)
-        
-        if classname not in storage.classes():
+        if words[0] not in storage.classes():
             print("** class doesn't exist **")
-        elif uid is None:
-            print("** instance id missing **")
-        else:
-            key = f"{classname}.{uid}"
-            if key not in storage.all():
-                print("** no instance found **")
-            elif not attribute:
-                print("** attribute name missing **")
-            elif not value:
-                print("** value missing **")
+            return
+        column = by = None
+        for word in words[1:]:
+            if word.startswith("by="):
+                by = word[3:]
             else:
-                cast = None
-                if not re.search(r'^".*"$', value):
-                    if '.' in value:
-                        cast = float
-                    else:
-                        cast = int
+                column = word
+        try:
+            groups = storage.aggregate(words[0], column, by)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        for group, stats in groups.items():
+            values = " ".join("{}={}".format(k, "{:.6g}".format(v) if isinstance(v, float) else v)
+                              for k, v in stats.items())
+            print(values if by is None else "{}: {}".format(group, values))
+
+    def do_profile(self, line):
+        """
+        Prints the number of calls and the latencies of the storage methods and the
+        console commands, and counters such as the bytes written and read, since the
+        console started or the last reset.
+
+        Usage: profile [<prefix>]      e.g. profile storage.
+               profile reset
+               profile cpu [<count>]   the functions that took the most time, when
+                                       cProfile was started with HBNB_PROFILE
+
+        Args:
+            line (str): The prefix of the names, or the subcommand.
+        """
+        words = line.split()
+        if words[:1] == ["reset"]:
+            metrics.METRICS.reset()
+        elif words[:1] == ["cpu"]:
+            try:
+                limit = int(words[1]) if len(words) > 1 else 20
+            except ValueError:
+                print("** invalid count **")
+                return
+            report = metrics.METRICS.profile(limit)
+            print(report if report is not None else "** profiler not running: set HBNB_PROFILE **")
+        else:
+            print("\n".join(metrics.METRICS.report(words[0] if words else "")))
+
+    def do_geo(self, line):
+        """
+        Prints the instances of a class located in an area, for classes having a latitude
+        and a longitude such as Place.
+
+        Usage: geo <class name> box <south> <west> <north> <east>
+               geo <class name> radius <latitude> <longitude> <kilometers>
+               geo <class name> nearest <latitude> <longitude> [<count>]
+        Searches by distance print the distance before each instance, nearest first.
+
+        Args:
+            line (str): The class name, the kind of search and its arguments.
+        """
+        words = line.split()
+        searches = {"box": (4, 4), "radius": (3, 3), "nearest": (2, 3)}
+        if not words:
+            print("** class name missing **")
+        elif words[0] not in storage.classes():
+            print("** class doesn't exist **")
+        elif len(words) < 2 or words[1] not in searches:
+            print("** search missing: box, radius or nearest **")
+        elif not searches[words[1]][0] <= len(words) - 2 <= searches[words[1]][1]:
+            print("** wrong number of arguments **")
+        else:
+            try:
+                args = [float(word) for word in words[2:]]
+                if words[1] == "box":
+                    for obj in storage.within(words[0], *args).values():
+                        print(obj)
+                    return
+                if words[1] == "radius":
+                    found = storage.within_radius(words[0], *args)
                 else:
-                    value = value.replace('"', '')
-                attributes = storage.attributes()[classname]
-                if attribute in attributes:
-                    value = attributes[attribute](value)
-                elif cast:
-                    try:
-                        value = cast(value)
-                    except ValueError:
-                        pass  # Keep as string if casting fails
-                setattr(storage.all()[key], attribute, value)
-                storage.all()[key].save()
+                    found = storage.nearest(words[0], args[0], args[1], int(args[2]) if args[2:] else 1)
+            except ValueError as error:
+                print("** {} **".format(error))
+                return
+            for km, obj in found:
+                print("{:.3f} km {}".format(km, obj))
+
+    def do_search(self, line):
+        """
+        Prints the instances whose text, such as the name and description of a place or
+        the text of a review, contains any of some words, the most relevant first, with
+        their relevance score.
+
+        Usage: search [<class name>] <words> [limit=<n>]
+
+        Args:
+            line (str): The optional class name, the words and the optional limit.
+        """
+        words = line.split()
+        cls = None
+        limit = None
+        if words and words[0] in storage.classes():
+            cls = words.pop(0)
+        if words and words[-1].startswith("limit="):
+            try:
+                limit = int(words.pop()[len("limit="):])
+            except ValueError:
+                print("** invalid limit **")
+                return
+        if not words:
+            print("** words missing **")
+            return
+        try:
+            found = storage.search(" ".join(words), cls, limit)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        for score, obj in found:
+            print("{:.3f} {}".format(score, obj))
+
+    def do_update(self, line):
+        """
+        Updates an instance by adding or modifying an attribute, or several at once
+        given as a dictionary.
+
+        Usage: update <class name> <id> <attribute name> "<value>"
+               update <class name> <id> {"<attribute name>": <value>, ...}
+
+        Args:
+            line (str): The class name, instance ID, attribute name, and value to update.
+        """
+        arguments = self._arguments(line)
+        if arguments is not None:
+            self._update(*arguments)
+
+    def _update(self, classname, tokens):
+        """
+        Updates an instance. A quoted value is kept as a string and a bare one is
+        converted to a number when it is one; a declared attribute is then converted
+        to its type.
+
+        Args:
+            classname (str): The class name of the instance.
+            tokens (list): The tokens after the class name: the id, then either a
+                dictionary of attributes, or an attribute name and a value.
+        """
+        if len(tokens) > 1 and tokens[1][1] is LITERAL:
+            self.update_dict(classname, str(tokens[0][0]), tokens[1][0])
+            return
+        obj = self._instance(classname, tokens)
+        if obj is None:
+            return
+        if len(tokens) < 2 or not tokens[1][0]:
+            print("** attribute name missing **")
+            return
+        if len(tokens) < 3:
+            print("** value missing **")
+            return
+        attribute = str(tokens[1][0])
+        value, kind = tokens[2]
+        if kind is WORD:
+            value = number(value)
+        try:
+            value = self._typed(classname, attribute, value)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        setattr(obj, attribute, value)
+        obj.save()
+
+
+def main(argv=None):
+    """
+    Starts the interactive console, or runs the given command files in batch mode.
+
+    Args:
+        argv (list): The command line arguments (defaults to sys.argv[1:]).
+    """
+    parser = argparse.ArgumentParser(description="HBNB command interpreter")
+    parser.add_argument("files", nargs="*",
+                        help="command files to run in batch mode, - for stdin")
+    parser.add_argument("--commit-every", type=int, default=0, metavar="N",
+                        help="in batch mode, write deferred saves every N commands")
+    args = parser.parse_args(argv)
+    console = HBNBCommand()
+    if not args.files:
+        console.cmdloop()
+        return
+    total, elapsed = 0, 0.0
+    for path in args.files:
+        if path == "-":
+            count, seconds = console.run_batch(sys.stdin, args.commit_every)
+        else:
+            with open(path, encoding="utf-8") as f:
+                count, seconds = console.run_batch(f, args.commit_every)
+        total += count
+        elapsed += seconds
+    rate = total / elapsed if elapsed else 0.0
+    print("{} commands in {:.3f} s ({:,.0f} commands/s)".format(total, elapsed, rate),
+          file=sys.stderr)
 
 
 if __name__ == '__main__':
-    HBNBCommand().cmdloop()
+    main()
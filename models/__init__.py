@@ -1,5 +1,37 @@
 #!/usr/bin/python3
 """Initializes the package"""
+import os
+from models.engine import metrics
 from models.engine.file_storage import FileStorage
-storage = FileStorage()
+from models.engine.serializers import get_serializer
+metrics.configure(enabled=os.getenv("HBNB_METRICS"), profile=os.getenv("HBNB_PROFILE"))
+if os.getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage(os.getenv("HBNB_DB_PATH", "hbnb.db"))
+    storage.configure(durability=os.getenv("HBNB_DURABILITY"),
+                      commit_size=os.getenv("HBNB_COMMIT_SIZE"),
+                      commit_interval=os.getenv("HBNB_COMMIT_INTERVAL"))
+elif os.getenv("HBNB_TYPE_STORAGE") == "paged":
+    from models.engine.paged_storage import PagedStorage
+    storage = PagedStorage(os.getenv("HBNB_PAGED_PATH", "hbnb.pages"))
+    storage.configure(format=os.getenv("HBNB_STORAGE_FORMAT"),
+                      durability=os.getenv("HBNB_DURABILITY"),
+                      commit_size=os.getenv("HBNB_COMMIT_SIZE"),
+                      commit_interval=os.getenv("HBNB_COMMIT_INTERVAL"),
+                      cache_size=os.getenv("HBNB_CACHE_SIZE"),
+                      cache_memory=os.getenv("HBNB_CACHE_MEMORY"))
+else:
+    storage = FileStorage()
+    storage_format = os.getenv("HBNB_STORAGE_FORMAT", "json")
+    storage.configure(file_path=os.getenv("HBNB_FILE_PATH",
+                                          "file" + get_serializer(storage_format).extension),
+                      format=storage_format,
+                      mode=os.getenv("HBNB_STORAGE_MODE"),
+                      compact_threshold=os.getenv("HBNB_COMPACT_THRESHOLD"),
+                      compact=os.getenv("HBNB_COMPACT_MODELS"),
+                      durability=os.getenv("HBNB_DURABILITY"),
+                      commit_size=os.getenv("HBNB_COMMIT_SIZE"),
+                      commit_interval=os.getenv("HBNB_COMMIT_INTERVAL"),
+                      shared=os.getenv("HBNB_STORAGE_SHARED"),
+                      shards=os.getenv("HBNB_STORAGE_SHARDS"))
 storage.reload()
@@ -6,8 +6,10 @@ The Amenity class inherits from the BaseModel, providing basic model functionali
 """
 
 from models.base_model import BaseModel
+from models.engine.registry import register
 
 
+@register
 class Amenity(BaseModel):
     """
     Represents an amenity.
@@ -6,8 +6,11 @@ This module defines a base class for all models in our hbnb clone.
 import uuid
 from datetime import datetime
 from models import storage
+from models.engine import timestamps
+from models.engine.registry import register
 
 
+@register(schema={"id": str, "created_at": datetime, "updated_at": datetime})
 class BaseModel:
     """
     A base class for all hbnb models.
@@ -22,17 +25,48 @@ class BaseModel:
             **kwargs (dict): Arbitrary keyword arguments to set instance attributes.
         """
         if kwargs:
-            for key, value in kwargs.items():
-                if key == "created_at" or key == "updated_at":
-                    setattr(self, key, datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f"))
-                else:
-                    setattr(self, key, value)
+            kwargs.pop("__class__", None)
+            for key in ("created_at", "updated_at"):
+                if key in kwargs:
+                    kwargs[key] = timestamps.parse(kwargs[key])
+            self._load(kwargs)
         else:
             self.id = str(uuid.uuid4())
             self.created_at = datetime.now()
             self.updated_at = datetime.now()
             storage.new(self)
 
+    def _load(self, fields):
+        """
+        Assigns the attributes of an instance rebuilt from its dictionary representation.
+
+        Args:
+            fields (dict): The attribute names and values.
+        """
+        # The instance is not stored yet, so there is nothing to mark dirty
+        self.__dict__.update(fields)
+
+    def _fields(self):
+        """
+        Returns the attributes set on the instance.
+
+        Returns:
+            dict: The attribute names and values.
+        """
+        return self.__dict__
+
+    def __setattr__(self, name, value):
+        """
+        Sets an attribute and flags the instance as dirty in the storage, so that
+        the next save serializes it again.
+
+        Args:
+            name (str): The attribute name.
+            value: The attribute value.
+        """
+        super().__setattr__(name, value)
+        storage.mark_dirty(self, name)
+
     def save(self):
         """
         Updates the public instance attribute 'updated_at' with the current datetime
@@ -43,13 +77,13 @@ class BaseModel:
 
     def to_dict(self):
         """
-        Returns a dictionary containing all keys/values of the instance's __dict__.
+        Returns a dictionary containing all keys/values of the instance's attributes.
 
         Returns:
             dict: Dictionary representation of the instance, including the class name
             and ISO-formatted datetime attributes.
         """
-        my_dict = self.__dict__.copy()
+        my_dict = dict(self._fields())
         my_dict["__class__"] = type(self).__name__
         my_dict["created_at"] = my_dict["created_at"].isoformat()
         my_dict["updated_at"] = my_dict["updated_at"].isoformat()
@@ -60,6 +94,6 @@ class BaseModel:
         Returns the string representation of the instance.
 
         Returns:
-            str: String representation in the format [<class name>] (<self.id>) <self.__dict__>.
+            str: String representation in the format [<class name>] (<self.id>) <attributes>.
         """
-        return "[{}] ({}) {}".format(type(self).__name__, self.id, self.__dict__)
+        return "[{}] ({}) {}".format(type(self).__name__, self.id, self._fields())
@@ -6,8 +6,10 @@ The City class inherits from the BaseModel, providing basic model functionality.
 """
 
 from models.base_model import BaseModel
+from models.engine.registry import register
 
 
+@register
 class City(BaseModel):
     """
     Represents a city.
@@ -0,0 +1,311 @@
+#!/usr/bin/python3
+"""
+Module for the columnar copies of the numeric attributes and foreign keys of
+stored objects, answering group-by aggregates such as the mean price_by_night
+of the places of each city.
+
+The aggregates are vectorized with NumPy when it is installed; otherwise they
+are computed by a loop over the same columns.
+"""
+
+import math
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+AGGREGATES = ("count", "sum", "mean", "min", "max")
+"""tuple: The aggregates computed for a column; only 'count' without a column."""
+
+
+def number(value):
+    """
+    Converts an attribute value to a float for the numeric columns.
+
+    Args:
+        value: The attribute value.
+
+    Returns:
+        float: The value, or NaN when it is missing or not a number.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class ColumnStore:
+    """
+    Columns holding the numeric attributes and the foreign keys of the objects of
+    one class, one row per object, kept up to date as objects change.
+
+    Numeric values are stored in array('d') columns, which NumPy reads without a
+    copy; foreign keys are stored as integer codes in array('q') columns, each code
+    standing for one distinct value, so that grouping by a foreign key is a
+    bincount over its codes. Deleted rows are filled with the last row, so the
+    columns never have holes.
+
+    Attributes:
+        class_name (str): The name of the class.
+        numeric (tuple): The names of the numeric columns.
+        keys (tuple): The names of the foreign key columns.
+    """
+
+    def __init__(self, class_name, numeric, keys):
+        """
+        Initializes empty columns.
+
+        Args:
+            class_name (str): The name of the class.
+            numeric (iterable): The names of the numeric attributes.
+            keys (iterable): The names of the foreign key attributes.
+        """
+        self.class_name = class_name
+        self.numeric = tuple(numeric)
+        self.keys = tuple(keys)
+        self.clear()
+
+    def __len__(self):
+        """
+        Returns the number of rows.
+        """
+        return len(self.__ids)
+
+    @property
+    def columns(self):
+        """
+        tuple: The names of every column.
+        """
+        return self.numeric + self.keys
+
+    def clear(self):
+        """
+        Removes every row.
+        """
+        self.__rows = {}
+        self.__ids = []
+        self.__values = {c: array("d") for c in self.numeric}
+        self.__codes = {c: array("q") for c in self.keys}
+        self.__groups = {c: ([], {}) for c in self.keys}
+
+    def _code(self, column, value):
+        """
+        Returns the code of a foreign key value, assigning one to new values.
+
+        Args:
+            column (str): The name of the foreign key column.
+            value: The foreign key value.
+
+        Returns:
+            int: The code.
+        """
+        values, codes = self.__groups[column]
+        try:
+            code = codes.get(value)
+        except TypeError:
+            value = repr(value)
+            code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def update(self, key, values):
+        """
+        Stores the values of an object, in a new row or in its existing one.
+
+        Args:
+            key (str): The storage key of the object.
+            values (dict): The value of each column; missing ones are stored as NaN
+                or as the None foreign key.
+        """
+        row = self.__rows.get(key)
+        if row is None:
+            self.__rows[key] = len(self.__ids)
+            self.__ids.append(key)
+            for column, data in self.__values.items():
+                data.append(number(values.get(column)))
+            for column, data in self.__codes.items():
+                data.append(self._code(column, values.get(column)))
+            return
+        for column in self.columns:
+            self.set(key, column, values.get(column))
+
+    def extend(self, keys, columns):
+        """
+        Stores the values of new objects, a column at a time, which is faster than
+        one update() per object when the columns are first filled.
+
+        Args:
+            keys (list): The storage keys of the objects, which must not be stored yet.
+            columns (dict): The list of the values of the objects for each column,
+                in the order of keys; missing columns are stored as missing values.
+        """
+        start = len(self.__ids)
+        self.__ids.extend(keys)
+        self.__rows.update(zip(keys, range(start, start + len(keys))))
+        missing = [None] * len(keys)
+        for column, data in self.__values.items():
+            values = columns.get(column, missing)
+            try:
+                data.extend(array("d", values))
+            except TypeError:
+                data.extend(array("d", map(number, values)))
+        for column, data in self.__codes.items():
+            codes = self.__groups[column][1]
+            for value in columns.get(column, missing):
+                try:
+                    data.append(codes[value])
+                except (KeyError, TypeError):
+                    data.append(self._code(column, value))
+
+    def set(self, key, column, value):
+        """
+        Changes one value of an object, if the object and the column are stored.
+
+        Args:
+            key (str): The storage key of the object.
+            column (str): The name of the column.
+            value: The new value.
+        """
+        row = self.__rows.get(key)
+        if row is None:
+            return
+        if column in self.__values:
+            self.__values[column][row] = number(value)
+        elif column in self.__codes:
+            self.__codes[column][row] = self._code(column, value)
+
+    def discard(self, key):
+        """
+        Removes the row of an object, if it is stored.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        row = self.__rows.pop(key, None)
+        if row is None:
+            return
+        last = self.__ids.pop()
+        for data in list(self.__values.values()) + list(self.__codes.values()):
+            value = data.pop()
+            if row < len(data):
+                data[row] = value
+        if last != key:
+            self.__ids[row] = last
+            self.__rows[last] = row
+
+    def aggregate(self, column=None, by=None):
+        """
+        Aggregates a numeric column, over every row or per value of a foreign key.
+
+        Without a column, only the number of rows is computed. With a column, rows
+        whose value is missing (NaN) are left out of every aggregate.
+
+        Args:
+            column (str): The name of the numeric column, or None.
+            by (str): The name of the foreign key column to group by, or None.
+
+        Returns:
+            dict: The aggregates of each group, as {foreign key value: {aggregate: value}},
+            or {None: {aggregate: value}} without a group-by. Empty groups are left out.
+
+        Raises:
+            ValueError: If the column or the foreign key is not stored.
+        """
+        if column is not None and column not in self.__values:
+            raise ValueError("{} has no numeric column {}".format(self.class_name, column))
+        if by is not None and by not in self.__codes:
+            raise ValueError("{} has no foreign key {}".format(self.class_name, by))
+        groups = self.__groups[by][0] if by else [None]
+        if not self.__ids:
+            return {}
+        if numpy is not None:
+            stats = self._aggregate_numpy(column, by, len(groups))
+        else:
+            stats = self._aggregate_python(column, by, len(groups))
+        return {groups[code]: result for code, result in stats}
+
+    def _aggregate_numpy(self, column, by, size):
+        """
+        Computes aggregate() with NumPy, using bincount for the counts and sums and
+        ufunc.at for the minimums and maximums.
+
+        Args:
+            column (str): The name of the numeric column, or None.
+            by (str): The name of the foreign key column, or None.
+            size (int): The number of groups.
+
+        Returns:
+            list: Pairs of (group code, aggregates) for the non-empty groups.
+        """
+        if by:
+            codes = numpy.frombuffer(self.__codes[by], dtype=numpy.int64)
+        else:
+            codes = numpy.zeros(len(self.__ids), dtype=numpy.int64)
+        rows = numpy.bincount(codes, minlength=size)
+        if column is None:
+            return [(int(code), {"count": int(rows[code])}) for code in numpy.flatnonzero(rows)]
+        values = numpy.frombuffer(self.__values[column], dtype=numpy.float64)
+        valid = ~numpy.isnan(values)
+        codes, values = codes[valid], values[valid]
+        counts = numpy.bincount(codes, minlength=size)
+        sums = numpy.bincount(codes, weights=values, minlength=size)
+        minimums = numpy.full(size, numpy.inf)
+        maximums = numpy.full(size, -numpy.inf)
+        numpy.minimum.at(minimums, codes, values)
+        numpy.maximum.at(maximums, codes, values)
+        result = []
+        for code in numpy.flatnonzero(rows):
+            count = int(counts[code])
+            result.append((int(code), {
+                "count": count,
+                "sum": float(sums[code]),
+                "mean": float(sums[code]) / count if count else None,
+                "min": float(minimums[code]) if count else None,
+                "max": float(maximums[code]) if count else None
+            }))
+        return result
+
+    def _aggregate_python(self, column, by, size):
+        """
+        Computes aggregate() with a loop over the rows, when NumPy is not installed.
+
+        Args:
+            column (str): The name of the numeric column, or None.
+            by (str): The name of the foreign key column, or None.
+            size (int): The number of groups.
+
+        Returns:
+            list: Pairs of (group code, aggregates) for the non-empty groups.
+        """
+        codes = self.__codes[by] if by else [0] * len(self.__ids)
+        rows = [0] * size
+        for code in codes:
+            rows[code] += 1
+        if column is None:
+            return [(code, {"count": n}) for code, n in enumerate(rows) if n]
+        stats = [[0, 0.0, math.inf, -math.inf] for _ in range(size)]
+        for code, value in zip(codes, self.__values[column]):
+            if value != value:
+                continue
+            group = stats[code]
+            group[0] += 1
+            group[1] += value
+            group[2] = min(group[2], value)
+            group[3] = max(group[3], value)
+        result = []
+        for code, n in enumerate(rows):
+            if not n:
+                continue
+            count, total, minimum, maximum = stats[code]
+            result.append((code, {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else None,
+                "min": minimum if count else None,
+                "max": maximum if count else None
+            }))
+        return result
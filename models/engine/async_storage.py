@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+"""
+Module for the AsyncStorage class, an asyncio facade over the storage engines
+for services running an event loop.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncStorage:
+    """
+    Asynchronous facade over a storage engine, FileStorage or DBStorage.
+
+    Reading and writing the storage blocks on file I/O and serialization, so every
+    call is run in an executor, and awaiting it lets the event loop serve other tasks
+    meanwhile. The default executor has a single thread, so that the calls run one at
+    a time, in the order they were made.
+
+    Concurrent saves are coalesced: while a write is running, the saves requested are
+    merged into a single write started once it finishes, which persists the latest
+    state. Each save returns once a write started after it was requested completes.
+
+    Objects are created, modified and deleted as usual, on the event loop; only
+    persisting and loading them is asynchronous:
+
+        storage = AsyncStorage()
+        place = Place()
+        place.name = "Loft"
+        await storage.save()
+        async for place in storage.all(Place):
+            ...
+
+    Objects may be changed while a save is running: the save writes the changes made
+    before it started, and the others are left for the next one. FileStorage only
+    holds its write lock while it encodes the changed objects, not while it writes
+    the files, see FileStorage._commit(), so creating, modifying or deleting an object
+    on the event loop waits at most for that encoding.
+
+    Attributes:
+        storage (FileStorage or DBStorage): The storage engine.
+        batch_size (int): The number of objects all() yields between two returns to
+            the event loop.
+    """
+
+    def __init__(self, storage=None, executor=None, batch_size=1000):
+        """
+        Initializes the facade.
+
+        Args:
+            storage (FileStorage or DBStorage): The storage engine; models.storage
+                by default.
+            executor (concurrent.futures.Executor): The executor running the calls; a
+                single thread owned by the facade by default.
+            batch_size (int): The number of objects all() yields between two returns
+                to the event loop.
+        """
+        if storage is None:
+            from models import storage
+        self.storage = storage
+        self.batch_size = batch_size
+        self.__owned = executor is None
+        self.__executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.__requested = 0
+        self.__written = 0
+        self.__writing = None
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Calls a function in the executor.
+
+        Args:
+            func (callable): The function, usually a method of the storage engine.
+            *args: Positional arguments for func.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            The result of func.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(func, *args, **kwargs))
+
+    async def save(self):
+        """
+        Persists the objects changed until now, coalescing the saves requested while
+        a write is running into the next write.
+        """
+        self.__requested += 1
+        request = self.__requested
+        while self.__written < request:
+            if self.__writing is None:
+                self.__writing = asyncio.ensure_future(self._write())
+            await asyncio.shield(self.__writing)
+
+    async def _write(self):
+        """
+        Writes the storage in the executor, recording which saves it covers.
+        """
+        covered = self.__requested
+        try:
+            await self.run(self._save)
+            self.__written = max(self.__written, covered)
+        finally:
+            self.__writing = None
+
+    def _save(self):
+        """
+        Saves the storage and writes the save right away, whether or not group commit
+        is enabled; runs in the executor.
+        """
+        self.storage.save()
+        self.storage.flush()
+
+    async def reload(self):
+        """
+        Reloads the objects from the storage.
+        """
+        await self.run(self.storage.reload)
+
+    async def get(self, cls, id):
+        """
+        Returns one stored object.
+
+        Args:
+            cls (type or str): The class, or class name, of the object.
+            id (str): The id of the object.
+
+        Returns:
+            BaseModel: The object, or None if it is not stored.
+        """
+        return await self.run(self.storage.get, cls, id)
+
+    async def count(self, cls=None):
+        """
+        Returns the number of stored objects, or of the objects of one class.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to count.
+
+        Returns:
+            int: The number of objects.
+        """
+        return await self.run(self.storage.count, cls)
+
+    async def query(self, cls, *args, **kwargs):
+        """
+        Returns the objects of a class matching predicates, see the query() method of
+        the storage engines.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            *args: Positional arguments for query().
+            **kwargs: Keyword arguments for query().
+
+        Returns:
+            list: The matching objects, or dictionaries of their selected attributes.
+        """
+        return await self.run(self.storage.query, cls, *args, **kwargs)
+
+    async def all(self, cls=None):
+        """
+        Iterates over the stored objects, or only those of one class, as in:
+
+            async for obj in storage.all(Place):
+
+        The objects are loaded in the executor, then yielded batch_size at a time,
+        returning to the event loop between batches.
+
+        Args:
+            cls (type or str): The class, or class name, to restrict the objects to.
+
+        Yields:
+            BaseModel: The objects.
+        """
+        objects = await self.run(lambda: list(self.storage.all(cls).copy().values()))
+        for start in range(0, len(objects), self.batch_size):
+            if start:
+                await asyncio.sleep(0)
+            for obj in objects[start:start + self.batch_size]:
+                yield obj
+
+    async def close(self):
+        """
+        Waits for the write in progress, then shuts the executor down if the facade
+        created it.
+        """
+        if self.__writing is not None:
+            await asyncio.shield(self.__writing)
+        if self.__owned:
+            self.__executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        """
+        Returns the facade, for use in an async with block closing it on exit.
+        """
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """
+        Closes the facade.
+        """
+        await self.close()
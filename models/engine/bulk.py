@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+"""
+Module for the bulk import and export of objects as JSON Lines or CSV files,
+used by the import and export commands of the console.
+
+Both formats are streamed: records are read and written one at a time, so a
+file never has to fit in memory as a whole.
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+from models.engine import timestamps
+
+FORMATS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}
+"""dict: The supported file extensions and the format they select."""
+
+HEADER = ("id", "created_at", "updated_at")
+"""tuple: The columns written first by CSV exports."""
+
+EXTRA = "__extra__"
+"""str: The last column of CSV exports, holding the attributes the class does not
+declare as a JSON object, so that their types survive an import."""
+
+
+def file_format(path):
+    """
+    Returns the format of a file, selected by its extension.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        str: "jsonl" or "csv".
+
+    Raises:
+        ValueError: If the extension is not one of FORMATS.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError("unsupported file format: {}".format(extension or path))
+    return FORMATS[extension]
+
+
+def coerce(fields, types):
+    """
+    Converts the values of a record to the types of the attributes they are assigned to.
+
+    Timestamps are parsed, list attributes accept their JSON encoding (as written in
+    CSV cells) and other values are converted by calling their type. Attributes
+    missing from types are kept as they are, and '__class__' is dropped.
+
+    Args:
+        fields (dict): The attribute names and values of the record.
+        types (dict): The attribute names and types, as returned by FileStorage.attributes().
+
+    Returns:
+        dict: The attribute names and converted values.
+
+    Raises:
+        ValueError: If a value cannot be converted to the type of its attribute.
+    """
+    result = {}
+    for name, value in fields.items():
+        if name == "__class__":
+            continue
+        kind = types.get(name)
+        if kind is None or value is None or type(value) is kind:
+            result[name] = value
+            continue
+        try:
+            if kind is datetime:
+                value = timestamps.parse(value)
+                if not isinstance(value, datetime):
+                    raise TypeError("not a timestamp")
+            elif kind is list:
+                if isinstance(value, str):
+                    value = json.loads(value)
+                if not isinstance(value, list):
+                    raise TypeError("not a list")
+            elif kind is int and isinstance(value, float) and not value.is_integer():
+                raise TypeError("not an integer")
+            else:
+                value = kind(value)
+        except (TypeError, ValueError) as error:
+            raise ValueError("{}: invalid {} {!r} ({})".format(
+                name, kind.__name__, value, error)) from None
+        result[name] = value
+    return result
+
+
+def read(path, on_error=None):
+    """
+    Yields the records of a JSON Lines or CSV file.
+
+    Blank JSON lines and empty CSV cells are skipped, so that a missing value leaves the
+    attribute to its class default. The attributes of the EXTRA column of a CSV row
+    are added to its record with their JSON types.
+
+    Args:
+        path (str): The file path.
+        on_error (callable): Called with the line number and a message for each line
+            that is not a JSON object, or whose EXTRA cell is not one, which is then
+            skipped. When None, such a line raises a ValueError.
+
+    Yields:
+        tuple: Pairs of (line number, record dictionary).
+
+    Raises:
+        ValueError: If a line is invalid and on_error is None.
+    """
+    fmt = file_format(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            rows = ((reader.line_num, row) for row in reader)
+        else:
+            rows = ((number, line) for number, line in enumerate(f, 1) if line.strip())
+        for number, row in rows:
+            try:
+                if fmt == "csv":
+                    record = {k: v for k, v in row.items() if k is not None and v not in ("", None)}
+                    extra = json.loads(record.pop(EXTRA, "{}"))
+                    if not isinstance(extra, dict):
+                        raise ValueError("{} is not a JSON object".format(EXTRA))
+                    for name, value in extra.items():
+                        record.setdefault(name, value)
+                else:
+                    record = json.loads(row)
+                    if not isinstance(record, dict):
+                        raise ValueError("not a JSON object")
+            except ValueError as error:
+                if on_error is None:
+                    raise ValueError("line {}: {}".format(number, error)) from None
+                on_error(number, str(error))
+                continue
+            yield number, record
+
+
+def write(path, objects, attributes=()):
+    """
+    Writes objects to a JSON Lines or CSV file, one record per object, in a single
+    pass over the objects.
+
+    CSV columns are the id and timestamps, then the declared attributes of the class
+    in alphabetical order, with list values JSON-encoded, then the EXTRA column: the
+    other attributes of each object as a JSON object, so that an export imports back
+    unchanged.
+
+    Args:
+        path (str): The file path.
+        objects (iterable): The objects to write.
+        attributes (iterable): The names of the attributes the class declares, as
+            returned by FileStorage.attributes(); for CSV files only.
+
+    Returns:
+        int: The number of objects written.
+    """
+    fmt = file_format(path)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "jsonl":
+            for obj in objects:
+                f.write(json.dumps(obj.to_dict()))
+                f.write("\n")
+                count += 1
+            return count
+        columns = HEADER + tuple(sorted(set(attributes).difference(HEADER)))
+        writer = csv.writer(f)
+        writer.writerow(columns + (EXTRA,))
+        for obj in objects:
+            record = obj.to_dict()
+            del record["__class__"]
+            row = []
+            for name in columns:
+                value = record.pop(name, "")
+                row.append(json.dumps(value) if isinstance(value, (list, dict)) else value)
+            row.append(json.dumps(record) if record else "")
+            writer.writerow(row)
+            count += 1
+    return count
@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+"""
+Module for the ObjectCache class, the bounded identity map of PagedStorage: the
+instances used most recently, up to a number of objects and an estimate of the
+memory they take, the least recently used being evicted first.
+"""
+
+import sys
+from collections import OrderedDict
+from models.engine import metrics
+
+UNITS = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30}
+"""dict: The multiplier of each size suffix accepted by parse_size()."""
+
+
+def parse_size(value):
+    """
+    Converts a size, such as a memory limit, to a number of bytes.
+
+    Args:
+        value (int or str): The size, in bytes or with a k, m or g suffix, such as "64m".
+
+    Returns:
+        int: The number of bytes.
+
+    Raises:
+        ValueError: If the size is not a number or is negative.
+    """
+    if isinstance(value, str):
+        text = value.strip().lower().rstrip("b")
+        unit = UNITS.get(text[-1:], 1)
+        value = int(float(text[:-1] if unit > 1 else text) * unit)
+    if value < 0:
+        raise ValueError("a size must not be negative")
+    return int(value)
+
+
+def footprint(obj):
+    """
+    Estimates the memory an instance takes: the instance, its attribute dictionary
+    and the attribute values, lists and dictionaries one level deep. Values shared
+    with other instances, such as interned strings, are counted for each of them.
+
+    Args:
+        obj (BaseModel): The instance.
+
+    Returns:
+        int: The estimate, in bytes.
+    """
+    size = sys.getsizeof(obj)
+    fields = obj._fields()
+    if getattr(obj, "__dict__", None) is fields:
+        size += sys.getsizeof(fields)
+    for value in fields.values():
+        size += sys.getsizeof(value)
+        if isinstance(value, (list, tuple, set)):
+            size += sum(map(sys.getsizeof, value))
+        elif isinstance(value, dict):
+            size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    return size
+
+
+class ObjectCache:
+    """
+    Least recently used map of storage keys to instances, bounded by a number of
+    objects and by an estimate of their memory, see footprint(). The memory of an
+    instance is estimated when it is put in the cache.
+
+    Before an entry is evicted, on_evict is called with its key and instance, so
+    that the storage can write the instance back if it changed; if it raises, the
+    entry is kept. The most recently put entry is never evicted, so a single
+    instance larger than the memory limit still stays until the next one.
+
+    Hits, misses and evictions are counted in the attributes below, and in the
+    counters of models.engine.metrics named after the cache, such as
+    "storage.cache.hits".
+
+    Attributes:
+        name (str): The prefix of the metrics counters.
+        max_objects (int): The maximum number of instances, 0 for no limit.
+        max_bytes (int): The maximum estimated memory of the instances, 0 for no limit.
+        on_evict (callable): Called as on_evict(key, obj) before an entry is evicted.
+        size (int): The estimated memory of the cached instances, in bytes.
+        hits (int): The lookups that found their instance.
+        misses (int): The lookups that did not.
+        evictions (int): The entries evicted to respect the limits.
+    """
+
+    def __init__(self, max_objects=0, max_bytes=0, on_evict=None, name="cache"):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_objects (int): The maximum number of instances, 0 for no limit.
+            max_bytes (int): The maximum estimated memory of the instances, 0 for no limit.
+            on_evict (callable): Called as on_evict(key, obj) before an entry is evicted.
+            name (str): The prefix of the metrics counters.
+        """
+        self.name = name
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.__entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """
+        Returns the number of cached instances.
+        """
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        """
+        Returns whether an instance is cached, without counting a lookup.
+        """
+        return key in self.__entries
+
+    def keys(self):
+        """
+        Returns the keys of the cached instances, least recently used first.
+
+        Returns:
+            list: The keys.
+        """
+        return list(self.__entries)
+
+    def get(self, key):
+        """
+        Looks an instance up, making it the most recently used.
+
+        Args:
+            key (str): The storage key.
+
+        Returns:
+            BaseModel: The instance, or None if it is not cached.
+        """
+        entry = self.__entries.get(key)
+        if entry is None:
+            self.misses += 1
+            metrics.increment(self.name + ".misses")
+            return None
+        self.__entries.move_to_end(key)
+        self.hits += 1
+        metrics.increment(self.name + ".hits")
+        return entry[0]
+
+    def peek(self, key):
+        """
+        Looks an instance up without counting the lookup or changing the order.
+
+        Args:
+            key (str): The storage key.
+
+        Returns:
+            BaseModel: The instance, or None if it is not cached.
+        """
+        entry = self.__entries.get(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key, obj):
+        """
+        Caches an instance as the most recently used, replacing the one cached under
+        the same key, then evicts entries until the limits are respected.
+
+        Args:
+            key (str): The storage key.
+            obj (BaseModel): The instance.
+        """
+        size = footprint(obj) if self.max_bytes else 0
+        previous = self.__entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous[1]
+        self.__entries[key] = (obj, size)
+        self.size += size
+        self._evict()
+
+    def discard(self, key):
+        """
+        Removes an instance from the cache, without calling on_evict.
+
+        Args:
+            key (str): The storage key.
+        """
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def resize(self, max_objects=None, max_bytes=None):
+        """
+        Changes the limits, evicting entries until they are respected.
+
+        Args:
+            max_objects (int): The maximum number of instances, 0 for no limit.
+            max_bytes (int): The maximum estimated memory of the instances, 0 for no limit.
+        """
+        if max_objects is not None:
+            self.max_objects = max_objects
+        if max_bytes is not None:
+            if max_bytes and not self.max_bytes:
+                self.__entries = OrderedDict((k, (obj, footprint(obj)))
+                                             for k, (obj, _) in self.__entries.items())
+                self.size = sum(size for _, size in self.__entries.values())
+            self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        """
+        Evicts the least recently used entries, but the most recent one, while the
+        cache exceeds a limit.
+        """
+        entries = self.__entries
+        while len(entries) > 1 and (self.max_objects and len(entries) > self.max_objects or
+                                    self.max_bytes and self.size > self.max_bytes):
+            key, (obj, size) = next(iter(entries.items()))
+            if self.on_evict is not None:
+                self.on_evict(key, obj)
+            if entries.get(key, (None,))[0] is obj:
+                del entries[key]
+                self.size -= size
+            self.evictions += 1
+            metrics.increment(self.name + ".evictions")
+
+    def clear(self):
+        """
+        Removes every instance, without calling on_evict. The counters are kept.
+        """
+        self.__entries = OrderedDict()
+        self.size = 0
+
+    def stats(self):
+        """
+        Returns the state and the counters of the cache.
+
+        Returns:
+            dict: The number of "objects" and their estimated "bytes", the limits
+            "max_objects" and "max_bytes", and the "hits", "misses" and "evictions",
+            and the "hit_rate", None before the first lookup.
+        """
+        lookups = self.hits + self.misses
+        return {"objects": len(self.__entries), "bytes": self.size,
+                "max_objects": self.max_objects, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None}
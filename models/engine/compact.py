@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+Module building the compact variants of the model classes.
+
+A compact class is a subclass of a model, with the same name, that keeps the
+attributes declared in FileStorage.attributes() in __slots__ instead of the
+instance dictionary. Attributes that are not declared, such as the ones
+do_update allows, still go to the instance dictionary, which is only created
+when the first of them is set. Values of the foreign keys are interned, so
+that the objects referencing the same City, Place or User share one string.
+"""
+
+import sys
+
+_compact_classes = {}
+
+
+def compact_class(cls, attributes):
+    """
+    Returns the compact variant of a model class, creating it on first use.
+
+    Args:
+        cls (type): The model class.
+        attributes (dict): The declared attributes of every class, as returned by
+            FileStorage.attributes().
+
+    Returns:
+        type: The compact subclass of cls.
+    """
+    if cls in _compact_classes:
+        return _compact_classes[cls]
+    declared = list(attributes["BaseModel"])
+    declared += [a for a in attributes.get(cls.__name__, {}) if a not in declared]
+    slots = frozenset(declared)
+    interned = frozenset(a for a in declared if a.endswith("_id"))
+
+    def __getattr__(self, name):
+        """
+        Returns the class-level default of a declared attribute that was never set.
+        """
+        if name in slots and hasattr(cls, name):
+            return getattr(cls, name)
+        raise AttributeError("'{}' object has no attribute '{}'".format(cls.__name__, name))
+
+    def __setattr__(self, name, value):
+        """
+        Sets an attribute, interning foreign keys and remembering whether the
+        instance dictionary holds anything.
+        """
+        if name in interned and type(value) is str:
+            value = sys.intern(value)
+        elif name not in slots:
+            object.__setattr__(self, "_extra", True)
+        cls.__setattr__(self, name, value)
+
+    def _load(self, fields):
+        """
+        Assigns the attributes of an instance rebuilt from its dictionary representation.
+        """
+        for name, value in fields.items():
+            if name in interned and type(value) is str:
+                value = sys.intern(value)
+            elif name not in slots:
+                object.__setattr__(self, "_extra", True)
+            object.__setattr__(self, name, value)
+
+    def _fields(self):
+        """
+        Returns the attributes set on the instance, declared ones first.
+        """
+        fields = {}
+        for name in declared:
+            try:
+                fields[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        if getattr(self, "_extra", False):
+            fields.update(self.__dict__)
+        return fields
+
+    namespace = {
+        "__slots__": tuple(declared) + ("_extra",),
+        "__module__": cls.__module__,
+        "__qualname__": cls.__qualname__,
+        "__doc__": cls.__doc__,
+        "__getattr__": __getattr__,
+        "__setattr__": __setattr__,
+        "_load": _load,
+        "_fields": _fields,
+    }
+    compact = type(cls.__name__, (cls,), namespace)
+    _compact_classes[cls] = compact
+    return compact
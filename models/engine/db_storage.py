@@ -0,0 +1,779 @@
+#!/usr/bin/python3
+"""Module for the DBStorage class."""
+
+import atexit
+import contextlib
+import datetime
+import json
+import math
+import sqlite3
+import threading
+import time
+from models.engine import geo
+from models.engine import query
+from models.engine import registry
+from models.engine.search import FIELDS, tokenize
+
+SQL_TYPES = {str: "TEXT", int: "INTEGER", float: "REAL", list: "TEXT",
+             datetime.datetime: "TEXT"}
+"""dict: The column type of each attribute type; lists are stored as JSON."""
+
+SYNCHRONOUS = {"none": "OFF", "flush": "NORMAL", "fsync": "FULL"}
+"""dict: The SQLite synchronous setting of each durability level."""
+
+
+class DBStorage:
+    """
+    Class for managing the storage and retrieval of data in a SQLite database.
+
+    Each class has its own table, named after it, with one column per attribute
+    declared in attributes() and an "extra" column holding the other attributes
+    of the object as a JSON object. Foreign keys (the attributes named "<model>_id")
+    are indexed, and so are the coordinates of the classes having a latitude and a
+    longitude. The text attributes listed in models.engine.search.FIELDS are indexed
+    in a full-text (FTS5) table, "search". The database runs in WAL mode.
+
+    Stored objects are kept in an identity map, so that looking an object up twice
+    returns the same instance. Changes are tracked like in FileStorage, through new(),
+    delete() and mark_dirty(), and only the changed rows are written: they are sent
+    to the database before every query, and committed by save().
+
+    The storage must not be called by several threads at once, except that new(),
+    delete() and mark_dirty() may run while another thread saves, as they do when
+    objects change on the event loop during an AsyncStorage save: the bookkeeping
+    of the changes is guarded by __lock, and a write only sends the changes made
+    before it started.
+
+    Attributes:
+        __path (str): The path of the database file.
+        __session (sqlite3.Connection): The connection to the database.
+        __objects (dict): The identity map of the objects read or added, keyed by
+            their class name and ID.
+        __dirty (set): Keys of the objects created or modified since they were last
+            written to the database.
+        __deleted (dict): The class name and ID of the objects deleted since the last
+            write, keyed like __objects.
+        __tables (dict): The columns and attribute types of each table, as
+            {class name: (columns, types)}.
+        __durability (str): "none", "flush" or "fsync", mapped to the synchronous
+            setting of SQLite, see SYNCHRONOUS.
+        __commit_size (int): In group commit mode, the number of saves coalesced
+            into one commit; 0 disables the limit.
+        __commit_interval (float): In group commit mode, the number of seconds after
+            which a save is committed; 0 disables the limit.
+        __deferred (int): Number of saves requested since the last commit.
+        __last_commit (float): time.monotonic() of the last commit.
+        __batch_depth (int): Number of batch() blocks being executed.
+        __exit_flush (bool): Whether flush() was registered to run when the
+            interpreter exits, which happens when group commit is first enabled.
+        __fts (bool): Whether the SQLite library supports full-text search (FTS5).
+        __lock (threading.Lock): Guards __objects, __dirty and __deleted against
+            changes made by another thread during a write.
+    """
+
+    def __init__(self, path="hbnb.db"):
+        """
+        Opens the database at the given path, creating it if needed.
+
+        Args:
+            path (str): The path of the database file.
+        """
+        self.__path = path
+        # The connection may be used by another thread, such as the executor of
+        # AsyncStorage, as long as the calls are not concurrent
+        self.__session = sqlite3.connect(path, check_same_thread=False)
+        self.__objects = {}
+        self.__dirty = set()
+        self.__deleted = {}
+        self.__lock = threading.Lock()
+        self.__tables = {}
+        self.__durability = "flush"
+        self.__commit_size = 0
+        self.__commit_interval = 0.0
+        self.__deferred = 0
+        self.__last_commit = 0.0
+        self.__batch_depth = 0
+        self.__exit_flush = False
+        self.__fts = False
+        self.__session.execute("PRAGMA journal_mode=WAL")
+        self.__session.execute("PRAGMA synchronous=NORMAL")
+
+    def configure(self, durability=None, commit_size=None, commit_interval=None):
+        """
+        Changes how hard commits try to survive a crash, and enables group commit.
+
+        Args:
+            durability (str): "none", "flush" or "fsync", see __durability.
+            commit_size (int): Enables group commit: saves are only committed once this
+                many of them were requested. 0 disables it.
+            commit_interval (float): Enables group commit: saves are only committed once
+                this many seconds passed since the last commit. 0 disables it. As the
+                storage must not be called concurrently, there is no timer: the last
+                saves of a burst wait for the next save, flush() or the exit.
+        """
+        if durability is not None:
+            if durability not in SYNCHRONOUS:
+                raise ValueError("unknown durability level: {}".format(durability))
+            self.__durability = durability
+            self.__session.execute("PRAGMA synchronous={}".format(SYNCHRONOUS[durability]))
+        if commit_size is not None:
+            self.__commit_size = int(commit_size)
+        if commit_interval is not None:
+            self.__commit_interval = float(commit_interval)
+        if (self.__commit_size or self.__commit_interval) and not self.__exit_flush:
+            # Saves deferred by group commit must not be lost on exit
+            atexit.register(self.flush)
+            self.__exit_flush = True
+
+    def close(self):
+        """
+        Commits the pending saves and closes the connection to the database.
+        """
+        self.flush()
+        self.__session.close()
+
+    def reload(self):
+        """
+        Discards the changes that were not committed and empties the identity map,
+        so that objects are read again from the database when they are looked up.
+        """
+        self.__session.rollback()
+        with self.__lock:
+            self.__objects = {}
+            self.__dirty = set()
+            self.__deleted = {}
+        self.__deferred = 0
+        self._create_tables()
+
+    def _create_tables(self):
+        """
+        Creates the missing tables and indexes, one table per class. This happens on
+        reload() or on the first use of the storage, and not when it is instantiated,
+        since the models import the storage.
+        """
+        self.__tables = {}
+        for name, attributes in self.attributes().items():
+            types = dict(self.attributes()["BaseModel"], **attributes)
+            columns = tuple(types)
+            definitions = ['"{}" {}'.format(c, SQL_TYPES.get(types[c], "TEXT")) for c in columns]
+            definitions[0] += " PRIMARY KEY"
+            self.__session.execute('CREATE TABLE IF NOT EXISTS "{}" ({}, extra TEXT)'.format(
+                name, ", ".join(definitions)))
+            for column in columns:
+                if column.endswith("_id"):
+                    self.__session.execute(
+                        'CREATE INDEX IF NOT EXISTS "ix_{0}_{1}" ON "{0}" ("{1}")'.format(name, column))
+            self.__tables[name] = (columns, types)
+            if "latitude" in columns and "longitude" in columns:
+                self.__session.execute('CREATE INDEX IF NOT EXISTS "ix_{0}_location" ON "{0}" ({1}, {2})'.format(
+                    name, self._column(name, "latitude"), self._column(name, "longitude")))
+        self._create_search()
+        self.__session.commit()
+
+    def _create_search(self):
+        """
+        Creates the full-text table and the table mapping each object to its row in it,
+        indexing the objects already stored when the table is new. Full-text search is
+        disabled when the SQLite library was built without FTS5.
+        """
+        exists = self.__session.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'search'").fetchone() is not None
+        try:
+            self.__session.execute("CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(body, key UNINDEXED)")
+        except sqlite3.OperationalError:
+            self.__fts = False
+            return
+        self.__fts = True
+        self.__session.execute("CREATE TABLE IF NOT EXISTS search_rows (key TEXT PRIMARY KEY, row INTEGER)")
+        if exists:
+            return
+        for name, fields in FIELDS.items():
+            body = " || ' ' || ".join("COALESCE(\"{}\", '')".format(f) for f in fields)
+            for key, text in self.__session.execute(
+                    "SELECT '{0}.' || id, {1} FROM \"{0}\"".format(name, body)).fetchall():
+                self._index_text(key, text)
+
+    def _index_text(self, key, text):
+        """
+        Replaces the full-text row of an object.
+
+        Args:
+            key (str): The key of the object.
+            text (str): Its text attributes, joined, or None to only remove its row.
+        """
+        row = self.__session.execute("SELECT row FROM search_rows WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.__session.execute("DELETE FROM search WHERE rowid = ?", row)
+            self.__session.execute("DELETE FROM search_rows WHERE key = ?", (key,))
+        if text is not None:
+            cursor = self.__session.execute("INSERT INTO search (body, key) VALUES (?, ?)", (text, key))
+            self.__session.execute("INSERT INTO search_rows VALUES (?, ?)", (key, cursor.lastrowid))
+
+    def _schema(self):
+        """
+        Returns the columns and attribute types of each table, creating the tables if
+        they were not yet.
+
+        Returns:
+            dict: {class name: (columns, types)}, see __tables.
+        """
+        if not self.__tables:
+            self._create_tables()
+        return self.__tables
+
+    def _table(self, cls):
+        """
+        Returns the name of the table of a class, and its columns and attribute types.
+
+        Args:
+            cls (type or str): The class, or class name.
+
+        Returns:
+            tuple: The class name, its columns and their attribute types, or None
+            when the class has no table.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        tables = self._schema()
+        if name not in tables:
+            return None
+        return (name,) + tables[name]
+
+    def _row(self, obj):
+        """
+        Converts an object to the values of its row.
+
+        Args:
+            obj (BaseModel): The object.
+
+        Returns:
+            list: The values of the columns of its table, followed by the extra column.
+        """
+        fields = obj.to_dict()
+        del fields["__class__"]
+        columns, types = self.__tables[type(obj).__name__]
+        row = []
+        for column in columns:
+            value = fields.pop(column, None)
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value)
+            row.append(value)
+        row.append(json.dumps(fields) if fields else None)
+        return row
+
+    def _object(self, name, row):
+        """
+        Returns the object stored in a row, from the identity map if it was already read.
+
+        Args:
+            name (str): The class name.
+            row (tuple): The values of the columns, followed by the extra column.
+
+        Returns:
+            BaseModel: The object.
+        """
+        key = "{}.{}".format(name, row[0])
+        obj = self.__objects.get(key)
+        if obj is not None:
+            return obj
+        columns, types = self.__tables[name]
+        fields = {}
+        for column, value in zip(columns, row):
+            if value is None:
+                continue
+            if types[column] is list and isinstance(value, str):
+                value = json.loads(value)
+            fields[column] = value
+        if row[-1]:
+            fields.update(json.loads(row[-1]))
+        obj = self.classes()[name](**fields)
+        self.__objects[key] = obj
+        return obj
+
+    def _select(self, name, where="", params=(), tail=""):
+        """
+        Reads the objects of a class matching a condition.
+
+        Args:
+            name (str): The class name.
+            where (str): The SQL condition, without the WHERE keyword.
+            params (tuple): The parameters of the condition and of the tail.
+            tail (str): The ORDER BY and LIMIT clauses of the query.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+        """
+        columns = self.__tables[name][0]
+        query = 'SELECT {}, extra FROM "{}"'.format(", ".join('"{}"'.format(c) for c in columns), name)
+        if where:
+            query += " WHERE " + where
+        query += tail
+        result = {}
+        for row in self.__session.execute(query, params):
+            obj = self._object(name, row)
+            result["{}.{}".format(name, obj.id)] = obj
+        return result
+
+    def all(self, cls=None):
+        """
+        Returns the stored objects, or only those of one class.
+
+        Args:
+            cls (type or str): The class, or class name, to restrict the result to.
+
+        Returns:
+            dict: The objects, keyed by their class name and ID.
+        """
+        self._write()
+        if cls is not None:
+            table = self._table(cls)
+            return self._select(table[0]) if table else {}
+        result = {}
+        for name in self._schema():
+            result.update(self._select(name))
+        return result
+
+    def count(self, cls=None):
+        """
+        Returns the number of stored objects, or of the objects of one class.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to count.
+
+        Returns:
+            int: The number of objects.
+        """
+        self._write()
+        if cls is None:
+            names = list(self._schema())
+        else:
+            table = self._table(cls)
+            names = [table[0]] if table else []
+        return sum(self.__session.execute('SELECT COUNT(*) FROM "{}"'.format(name)).fetchone()[0]
+                   for name in names)
+
+    def get(self, cls, id):
+        """
+        Returns one stored object.
+
+        Args:
+            cls (type or str): The class, or class name, of the object.
+            id (str): The id of the object.
+
+        Returns:
+            BaseModel: The object, or None if it is not stored.
+        """
+        table = self._table(cls)
+        if table is None:
+            return None
+        key = "{}.{}".format(table[0], id)
+        if key in self.__objects:
+            return self.__objects[key]
+        if key in self.__deleted:
+            return None
+        return self._select(table[0], "id = ?", (id,)).get(key)
+
+    def find(self, cls, **criteria):
+        """
+        Returns the objects of a class whose attributes equal the given values, such as
+        find(Place, city_id=...) for the places of a city. Criteria on columns are
+        evaluated by the database, using the foreign key indexes; the others filter
+        the rows it returns.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to find.
+            **criteria: Attribute names and the values they must equal.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+        """
+        self._write()
+        table = self._table(cls)
+        if table is None:
+            return {}
+        name, columns = table[:2]
+        where, params = [], []
+        for attribute, value in criteria.items():
+            if attribute in columns and isinstance(value, (str, int, float)):
+                where.append('"{}" = ?'.format(attribute))
+                params.append(value)
+        return {k: obj for k, obj in self._select(name, " AND ".join(where), tuple(params)).items()
+                if all(getattr(obj, a, None) == v for a, v in criteria.items())}
+
+    def query(self, cls, where=(), order_by=None, limit=None, offset=0, fields=None):
+        """
+        Returns the objects of a class matching predicates such as price_by_night < 100,
+        ordered and paginated, see models.engine.query. Predicates on columns are
+        evaluated by the database, using the foreign key indexes; when every predicate
+        and the order apply to columns, the ordering and pagination are done by the
+        database as well, so that only the requested rows are read.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to return.
+            where (iterable): The query.Predicate every result must match.
+            order_by (str): The attribute to order by, prefixed with '-' for a descending order.
+            limit (int): The maximum number of results.
+            offset (int): The number of results to skip.
+            fields (list): The attributes to return instead of the objects.
+
+        Returns:
+            list: The matching objects, or dictionaries of their selected attributes.
+        """
+        self._write()
+        table = self._table(cls)
+        if table is None:
+            return []
+        name, columns, types = table
+        scalar = {c for c in columns if types[c] in (str, int, float)}
+        clauses, params, rest = [], [], []
+        for predicate in where:
+            if predicate.attribute in scalar and isinstance(predicate.value, (str, int, float)):
+                clauses.append("{} {} ?".format(self._column(name, predicate.attribute),
+                                                "=" if predicate.equality else predicate.operator))
+                params.append(predicate.value)
+            else:
+                rest.append(predicate)
+        attribute = order_by.lstrip("-") if order_by else None
+        if rest or (attribute and attribute not in scalar):
+            objects = self._select(name, " AND ".join(clauses), tuple(params)).values()
+            return query.run(objects, rest, order_by, limit, offset, fields)
+        tail = ""
+        if attribute:
+            tail += " ORDER BY {0} IS NULL, {0}{1}".format(
+                self._column(name, attribute), " DESC" if order_by.startswith("-") else "")
+        if limit is not None or offset:
+            tail += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        objects = self._select(name, " AND ".join(clauses), tuple(params), tail).values()
+        return query.run(objects, fields=fields)
+
+    def aggregate(self, cls, column=None, by=None):
+        """
+        Returns the count, sum, mean, minimum and maximum of a numeric attribute of the
+        objects of a class, or only the number of objects without an attribute, like
+        FileStorage.aggregate(). The aggregates are computed by the database, with a
+        GROUP BY over the foreign key.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            column (str): The numeric attribute to aggregate, or None to count objects.
+            by (str): The foreign key to group by, or None for a single group.
+
+        Returns:
+            dict: The aggregates of each group, as {foreign key value: {aggregate: value}},
+            or {None: {aggregate: value}} without a group-by.
+
+        Raises:
+            ValueError: If the attribute is not numeric or the foreign key is not one.
+        """
+        self._write()
+        table = self._table(cls)
+        name = cls if isinstance(cls, str) else cls.__name__
+        columns, types = (table[1], table[2]) if table else ((), {})
+        if column is not None and types.get(column) not in (int, float):
+            raise ValueError("{} has no numeric column {}".format(name, column))
+        if by is not None and (by not in columns or not by.endswith("_id")):
+            raise ValueError("{} has no foreign key {}".format(name, by))
+        if table is None:
+            return {}
+        group = '"{}"'.format(by) if by else "NULL"
+        if column is None:
+            rows = self.__session.execute('SELECT {0}, COUNT(*) FROM "{1}" GROUP BY {0}'.format(group, name))
+            return {row[0]: {"count": row[1]} for row in rows}
+        value = "CAST({} AS REAL)".format(self._column(name, column))
+        rows = self.__session.execute(
+            'SELECT {0}, COUNT({1}), TOTAL({1}), MIN({1}), MAX({1}) FROM "{2}" GROUP BY {0}'.format(
+                group, value, name))
+        return {row[0]: {"count": row[1], "sum": row[2], "mean": row[2] / row[1] if row[1] else None,
+                         "min": row[3], "max": row[4]} for row in rows}
+
+    def search(self, text, cls=None, limit=None):
+        """
+        Returns the objects whose text attributes, listed in models.engine.search.FIELDS,
+        contain any word of a text, the most relevant first, using the full-text table
+        and its BM25 ranking.
+
+        Args:
+            text (str): The words to look for.
+            cls (type or str): The class, or class name, to restrict the results to.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: Pairs of (score, object), highest score first.
+
+        Raises:
+            ValueError: If the SQLite library does not support full-text search.
+        """
+        self._write()
+        self._schema()
+        if not self.__fts:
+            raise ValueError("full-text search is not available")
+        words = set(tokenize(text))
+        if not words:
+            return []
+        sql = "SELECT key, -bm25(search) FROM search WHERE search MATCH ?"
+        params = [" OR ".join('"{}"'.format(w) for w in sorted(words))]
+        if cls is not None:
+            sql += " AND key LIKE ?"
+            params.append((cls if isinstance(cls, str) else cls.__name__) + ".%")
+        sql += " ORDER BY bm25(search), key"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        results = []
+        for key, score in self.__session.execute(sql, params).fetchall():
+            obj = self.get(*key.split(".", 1))
+            if obj is not None:
+                results.append((score, obj))
+        return results
+
+    def within(self, cls, south, west, north, east):
+        """
+        Returns the objects of a class located in a latitude/longitude box, using the
+        index over their coordinates. The objects still at the class-level default
+        coordinates were never located and are left out, as in GridIndex.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            south (float): The southern bound, in degrees.
+            west (float): The western bound; greater than east for a box crossing
+                the antimeridian.
+            north (float): The northern bound, in degrees.
+            east (float): The eastern bound, in degrees.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+
+        Raises:
+            ValueError: If the class has no latitude and longitude.
+        """
+        self._write()
+        table = self._table(cls)
+        if table is None or "latitude" not in table[1] or "longitude" not in table[1]:
+            raise ValueError("{} has no coordinates".format(cls if isinstance(cls, str) else cls.__name__))
+        name = table[0]
+        latitude, longitude = self._column(name, "latitude"), self._column(name, "longitude")
+        where = "{0} BETWEEN ? AND ? AND ({1} >= ? {2} {1} <= ?)".format(
+            latitude, longitude, "AND" if west <= east else "OR")
+        parameters = [south, north, west, east]
+        default = [getattr(self.classes()[name], c, None) for c in ("latitude", "longitude")]
+        if all(isinstance(d, (int, float)) for d in default):
+            where += " AND NOT ({} = ? AND {} = ?)".format(latitude, longitude)
+            parameters += default
+        return self._select(name, where, parameters)
+
+    def within_radius(self, cls, latitude, longitude, radius):
+        """
+        Returns the objects of a class located within a distance of a point.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            latitude (float): The latitude of the center, in degrees.
+            longitude (float): The longitude of the center, in degrees.
+            radius (float): The distance, in kilometers.
+
+        Returns:
+            list: Pairs of (distance in kilometers, object), nearest first.
+        """
+        found = []
+        for obj in self.within(cls, *geo.bounding_box(latitude, longitude, radius)).values():
+            km = geo.distance(latitude, longitude, obj.latitude, obj.longitude)
+            if km <= radius:
+                found.append((km, obj))
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+    def nearest(self, cls, latitude, longitude, count=1):
+        """
+        Returns the objects of a class nearest to a point, searching within a radius
+        doubled until it holds enough objects, like GridIndex.nearest().
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            count (int): The number of objects to return.
+
+        Returns:
+            list: Pairs of (distance in kilometers, object), nearest first.
+        """
+        radius = 0.5 * geo.KM_PER_DEGREE
+        while True:
+            found = self.within_radius(cls, latitude, longitude, radius)
+            if len(found) >= count or radius >= math.pi * geo.EARTH_RADIUS:
+                return found[:count]
+            radius *= 2
+
+    def _column(self, name, column):
+        """
+        Returns the SQL expression of a column in queries. The rows of objects that
+        keep the class default of an attribute hold NULL, so the expression substitutes
+        the default, for queries to compare the values the objects actually have.
+
+        Args:
+            name (str): The class name.
+            column (str): The column name.
+
+        Returns:
+            str: The SQL expression.
+        """
+        default = getattr(self.classes()[name], column, None)
+        if isinstance(default, str):
+            return """COALESCE("{}", '{}')""".format(column, default.replace("'", "''"))
+        if isinstance(default, (int, float)):
+            return 'COALESCE("{}", {!r})'.format(column, default)
+        return '"{}"'.format(column)
+
+    def new(self, obj):
+        """
+        Adds a new object to the storage.
+
+        Args:
+            obj (BaseModel): The object to store, which must have an 'id' attribute.
+        """
+        key = "{}.{}".format(type(obj).__name__, obj.id)
+        with self.__lock:
+            self.__objects[key] = obj
+            self.__dirty.add(key)
+            self.__deleted.pop(key, None)
+
+    def delete(self, obj=None):
+        """
+        Removes an object from the storage.
+
+        Args:
+            obj (BaseModel): The object to remove. Nothing happens if it is None.
+        """
+        if obj is None:
+            return
+        name = type(obj).__name__
+        key = "{}.{}".format(name, obj.id)
+        with self.__lock:
+            self.__objects.pop(key, None)
+            self.__dirty.discard(key)
+            self.__deleted[key] = (name, obj.id)
+
+    def mark_dirty(self, obj, attribute=None):
+        """
+        Records that an attribute of a stored object changed, so that its row is
+        written again.
+
+        Args:
+            obj (BaseModel): The modified object. Objects that are not stored are ignored.
+            attribute (str): The name of the modified attribute.
+        """
+        key = "{}.{}".format(type(obj).__name__, getattr(obj, "id", None))
+        with self.__lock:
+            if self.__objects.get(key) is obj:
+                self.__dirty.add(key)
+
+    def _write(self):
+        """
+        Sends the rows of the objects changed since the last write to the database,
+        in the current transaction, which is committed by flush().
+
+        The changes are taken over under __lock before anything is sent, so that the
+        objects changed meanwhile by another thread are left for the next write. If
+        sending fails, the changes taken over are tracked again.
+        """
+        with self.__lock:
+            if not self.__dirty and not self.__deleted:
+                return
+            dirty = {key: self.__objects[key] for key in self.__dirty}
+            deleted = self.__deleted
+            self.__dirty = set()
+            self.__deleted = {}
+        try:
+            self._schema()
+            rows = {}
+            for obj in dirty.values():
+                rows.setdefault(type(obj).__name__, []).append(self._row(obj))
+            for name, values in rows.items():
+                self.__session.executemany('INSERT OR REPLACE INTO "{}" VALUES ({})'.format(
+                    name, ", ".join("?" * len(values[0]))), values)
+            for name, id in deleted.values():
+                self.__session.execute('DELETE FROM "{}" WHERE id = ?'.format(name), (id,))
+            if self.__fts:
+                for key, obj in dirty.items():
+                    fields = FIELDS.get(type(obj).__name__)
+                    if fields:
+                        self._index_text(key, " ".join(str(getattr(obj, f, None) or "") for f in fields))
+                for key in deleted:
+                    if key.split(".", 1)[0] in FIELDS:
+                        self._index_text(key, None)
+        except BaseException:
+            with self.__lock:
+                for key in dirty:
+                    if key not in self.__deleted:
+                        self.__dirty.add(key)
+                for key, value in deleted.items():
+                    if key not in self.__dirty:
+                        self.__deleted.setdefault(key, value)
+            raise
+
+    def save(self):
+        """
+        Commits the changes made since the last commit.
+
+        Inside a batch() block, or when group commit is enabled, the commit is deferred
+        like in FileStorage.save().
+        """
+        self.__deferred += 1
+        if self.__batch_depth:
+            return
+        size, interval = self.__commit_size, self.__commit_interval
+        if size or interval:
+            if not (size and self.__deferred >= size) and \
+                    not (interval and time.monotonic() - self.__last_commit >= interval):
+                return
+        self.flush()
+
+    def flush(self):
+        """
+        Writes the changed rows and commits the saves requested since the last commit,
+        if any.
+        """
+        if not self.__deferred:
+            return
+        self.__deferred = 0
+        self.__last_commit = time.monotonic()
+        self._write()
+        self.__session.commit()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Coalesces the saves requested inside a with block into a single commit, made
+        when the outermost block exits.
+
+        Yields:
+            DBStorage: The storage.
+        """
+        self.__batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.__batch_depth -= 1
+            if not self.__batch_depth and self.__deferred:
+                self.flush()
+
+    def classes(self):
+        """
+        Returns a dictionary of valid class names and their corresponding class references,
+        as registered by the models, see models.engine.registry. The compact option of
+        FileStorage does not apply: _column() reads the defaults of the attributes from
+        the classes, which the compact variants keep in __slots__ instead.
+
+        Returns:
+            dict: A dictionary where the keys are class names and the values are class references.
+        """
+        return registry.classes()
+
+    def attributes(self):
+        """
+        Returns a dictionary of valid attributes and their types for each class.
+
+        Returns:
+            dict: A dictionary where the keys are class names and the values are dictionaries
+                  mapping attribute names to their types.
+        """
+        return registry.attributes()
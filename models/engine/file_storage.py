@@ -1,32 +1,601 @@
 #!/usr/bin/python3
 """Module for the FileStorage class."""
 
-import datetime
-import json
+import atexit
+import contextlib
+import functools
 import os
+import threading
+import time
+from collections.abc import MutableMapping
+from models.engine.analytics import ColumnStore
+from models.engine.indexes import ForeignKeyIndex, GridIndex
+from models.engine.journal import Journal
+from models.engine.locking import FileLock, RWLock, read_locked, write_locked
+from models.engine import metrics
+from models.engine import query
+from models.engine import registry
+from models.engine.search import FIELDS, TextIndex
+from models.engine.shards import ShardLayout
+from models.engine.serializers import get_serializer
+
+
+class StoredObjects(MutableMapping):
+    """
+    The mapping returned by FileStorage.all(): a live view of the stored objects, or
+    of the objects of one class, keyed by their class name and ID. Nothing is copied,
+    and the objects stored or deleted afterwards show in the view. Setting a key
+    stores the object with new(), and removing one deletes its object with delete(),
+    so that the idiom of the first versions of the console still works:
+
+        del storage.all()["Place." + place_id]
+        storage.save()
+
+    As with a dictionary, the storage must not change while the view is iterated
+    over; iterate over copy() to change it in the loop.
+    """
+
+    def __init__(self, storage, name=None):
+        """
+        Creates the view.
+
+        Args:
+            storage (FileStorage): The storage viewed, to which the changes are applied.
+            name (str): The class name of the objects viewed, or None for every object.
+        """
+        self.__storage = storage
+        self.__name = name
+
+    def __getitem__(self, key):
+        """
+        Returns the stored object of a key.
+        """
+        return self.__storage._objects(self.__name)[key]
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the stored objects.
+        """
+        return iter(self.__storage._objects(self.__name))
+
+    def __len__(self):
+        """
+        Returns the number of stored objects.
+        """
+        return len(self.__storage._objects(self.__name))
+
+    def __contains__(self, key):
+        """
+        Tells whether an object is stored under a key.
+        """
+        return key in self.__storage._objects(self.__name)
+
+    def __setitem__(self, key, obj):
+        """
+        Stores an object with new().
+        """
+        self.__storage.new(obj)
+
+    def __delitem__(self, key):
+        """
+        Deletes an object with delete().
+        """
+        self.__storage.delete(self[key])
+
+    def __ior__(self, other):
+        """
+        Stores the objects of another dictionary with new().
+        """
+        self.update(other)
+        return self
+
+    def __repr__(self):
+        """
+        Returns the representation of the stored objects as a dictionary.
+        """
+        return repr(self.copy())
+
+    def copy(self):
+        """
+        Returns a dictionary copying the stored objects at once, which later changes
+        to the storage leave untouched.
+        """
+        return self.__storage._objects(self.__name, copy=True)
 
 
 class FileStorage:
     """
     Class for managing the storage and retrieval of data.
 
+    The storage may be shared by several threads and several processes. Between
+    threads, reads run concurrently while writes (new, delete, saves, reload) are
+    serialized by a reader-writer lock, which saves release before writing the files.
+    Between processes, an advisory lock on a file next to the snapshot is held shared
+    while the files are read and exclusively while they are written; before writing,
+    a process picks up the changes the others saved since it last read the files, so
+    that saves never discard objects saved by another process. With the shared
+    option, reads pick them up as well. See locked() for read-modify-write sequences.
+
     Attributes:
-        __file_path (str): The file path where the JSON data is stored.
+        _lock (RWLock): The lock between the threads of the process.
+        __file_path (str): The file path where the objects are stored.
         __objects (dict): A dictionary storing all objects, keyed by their class name and ID.
+        __mode (str): "snapshot" rewrites the whole file on every save, "journal"
+            appends only the changed records to a log next to the file.
+        __compact_threshold (int): Number of journal entries after which the log
+            is folded back into the snapshot.
+        __dirty (set): Keys of the objects created, modified or deleted since the
+            last save.
+        __durability (str): How hard saves try to survive a crash: "none" writes the
+            file in place, "flush" writes a temporary file and renames it over the
+            file, "fsync" also forces the data and the rename to disk.
+        __format (str): The name of the file format, "json" or "binary", see
+            models.engine.serializers.
+        __fragments (dict): Cache of the encoding of each object, keyed like
+            __objects, holding (object, fragment) pairs.
+        __journal_entries (int): Number of entries currently in the journal.
+        __partitions (dict): The same objects partitioned by class, as
+            {class name: {key: object}}.
+        __indexes (dict): Secondary indexes over the foreign keys of each class,
+            as {class name: {attribute: ForeignKeyIndex}}, or None until the first lookup.
+        __spatial (dict): Spatial indexes over the latitude and longitude of each class
+            having both, as {class name: GridIndex}, or None until the first spatial search.
+        __columns (dict): Columnar copies of the numeric attributes and foreign keys of
+            each class, as {class name: ColumnStore}, or None until the first aggregate.
+        __text (TextIndex): The full-text index over the attributes listed in
+            models.engine.search.FIELDS, or None until the first search. It is saved
+            next to the snapshot, and loaded back instead of being rebuilt.
+        __replayed (set): Keys of the records read from the journal by the last reload,
+            which a full-text index saved with the snapshot does not cover.
+        __synced (dict): The dictionary of objects the partitions were built from;
+            they are rebuilt when __objects is replaced.
+        __records (dict): Objects read from the file but not instantiated yet, as
+            {class name: {key: fragment}}. An object is built on first access.
+        __unscanned (bool): Whether reload() was called and the file has not been
+            read yet. The file is read on the first access to the storage.
+        __compact (bool): Whether classes() returns the compact variants of the
+            models, which keep their declared attributes in __slots__.
+        __commit_size (int): In group commit mode, the number of saves coalesced
+            into one write; 0 disables the limit.
+        __commit_interval (float): In group commit mode, the number of seconds after
+            which a save is written; 0 disables the limit.
+        __deferred (int): Number of saves requested since the last write.
+        __last_commit (float): time.monotonic() of the last write.
+        __batch_depth (int): Number of batch() blocks being executed.
+        __timer (threading.Timer): In group commit mode with an interval, writes the
+            deferred saves once the interval has passed, or None when none is pending.
+        __exit_flush (bool): Whether flush() was registered to run when the
+            interpreter exits, which happens when group commit is first enabled.
+        __lazy (RLock): Serializes the lazy reads of the file and the lazy builds of
+            the indexes, which happen while only the read lock is held. It is also held
+            while the files are written, see _commit(), so that they are not read
+            half-written by the other threads.
+        __io (Lock): Held from the preparation of a write of the files until it is
+            done, so that the writes of two threads never interleave.
+        __file_lock (FileLock): The lock between processes, kept in __file_path + ".lock".
+        __shared (bool): Whether reads check the files for the changes other
+            processes saved, see _refresh().
+        __seen (list): The state of the files when this process last read or wrote
+            them, see _disk_version().
+        __shards (int): 0 to store the snapshot in a single file; otherwise the number
+            of shard files of each class, stored in __file_path + ".shards", see
+            models.engine.shards.
+        __unread (set): The shards listed by reload() but not read yet, as
+            (class name, bucket) pairs. A shard is read on the first access to its class.
+        __pending (dict): The journal entries of the unread shards, applied when they
+            are read, as {(class name, bucket): {key: fragment or None}}.
+        __changed (set): The shards whose file does not hold their latest objects.
+        __rewrite (bool): Whether the next snapshot write must rewrite every shard,
+            because files of another layout, or an unsharded snapshot, are left.
+        __listed (list): The state of the files when the shards were listed.
+        __torn (tuple): Where the torn last entry found by the last replay of the
+            journal begins, cut off by the next append, see Journal.cut().
     """
 
     __file_path = "file.json"
     __objects = {}
+    __mode = "snapshot"
+    __compact_threshold = 1000
+    __dirty = set()
+    __durability = "flush"
+    __format = "json"
+    __fragments = {}
+    __journal_entries = 0
+    __partitions = {}
+    __indexes = None
+    __spatial = None
+    __columns = None
+    __text = None
+    __replayed = set()
+    __synced = None
+    __records = {}
+    __unscanned = False
+    __compact = False
+    __commit_size = 0
+    __commit_interval = 0.0
+    __deferred = 0
+    __last_commit = 0.0
+    __batch_depth = 0
+    __timer = None
+    __exit_flush = False
+    _lock = RWLock()
+    __lazy = threading.RLock()
+    __io = threading.Lock()
+    __file_lock = None
+    __shared = False
+    __seen = None
+    __shards = 0
+    __unread = set()
+    __pending = {}
+    __changed = set()
+    __rewrite = False
+    __listed = None
+    __torn = None
+
+    @write_locked
+    def configure(self, file_path=None, mode=None, compact_threshold=None, compact=None,
+                  format=None, durability=None, commit_size=None, commit_interval=None,
+                  shared=None, shards=None):
+        """
+        Changes how the storage is persisted and how objects are represented in memory.
+
+        Args:
+            file_path (str): The file path of the snapshot.
+            mode (str): Either "snapshot" or "journal".
+            compact_threshold (int): Number of journal entries that triggers a
+                compaction of the log into the snapshot.
+            compact (bool or str): Whether to instantiate the compact variants of the
+                models. Strings such as "1" or "true" are accepted.
+            format (str): The file format, "json" or "binary". Objects read from the
+                file but not instantiated yet are converted to the new format.
+            durability (str): "none", "flush" or "fsync", see __durability.
+            commit_size (int): Enables group commit: saves are only written once this
+                many of them were requested. 0 disables it.
+            commit_interval (float): Enables group commit: saves are written once this
+                many seconds passed since the last write, by a timer thread if no
+                other save comes. 0 disables it.
+            shared (bool or str): Whether reads pick up the changes saved by other
+                processes. Strings such as "1" or "true" are accepted.
+            shards (int or str): 0 or "none" to store the snapshot in a single file,
+                "class" or 1 for one file per class, or the number of files each class
+                is split into by a hash of the object ids.
+        """
+        if shards is not None:
+            if isinstance(shards, str):
+                shards = {"": 0, "none": 0, "class": 1}.get(shards.lower(), shards)
+            shards = int(shards)
+            if shards < 0:
+                raise ValueError("the number of shards must not be negative")
+        if file_path not in (None, FileStorage.__file_path) and not FileStorage.__batch_depth:
+            # The deferred saves belong to the current file
+            self.flush()
+        if file_path not in (None, FileStorage.__file_path) or \
+                shards not in (None, FileStorage.__shards) or \
+                format not in (None, FileStorage.__format):
+            self._load()
+            FileStorage.__rewrite = True
+        if shards is not None:
+            FileStorage.__shards = shards
+        if file_path is not None and file_path != FileStorage.__file_path:
+            FileStorage.__file_path = file_path
+            FileStorage.__seen = None
+            if FileStorage.__file_lock is not None:
+                FileStorage.__file_lock.close()
+                FileStorage.__file_lock = None
+        if mode is not None:
+            if mode not in ("snapshot", "journal"):
+                raise ValueError("unknown storage mode: {}".format(mode))
+            FileStorage.__mode = mode
+        if compact_threshold is not None:
+            FileStorage.__compact_threshold = int(compact_threshold)
+        if compact is not None:
+            if isinstance(compact, str):
+                compact = compact.lower() in ("1", "true", "yes", "on")
+            FileStorage.__compact = compact
+        if shared is not None:
+            if isinstance(shared, str):
+                shared = shared.lower() in ("1", "true", "yes", "on")
+            FileStorage.__shared = shared
+        if durability is not None:
+            if durability not in ("none", "flush", "fsync"):
+                raise ValueError("unknown durability level: {}".format(durability))
+            FileStorage.__durability = durability
+        if commit_size is not None:
+            FileStorage.__commit_size = int(commit_size)
+        if commit_interval is not None:
+            FileStorage.__commit_interval = float(commit_interval)
+        if commit_size is not None or commit_interval is not None:
+            if FileStorage.__commit_size or FileStorage.__commit_interval:
+                if not FileStorage.__exit_flush:
+                    # Saves deferred by group commit must not be lost on exit
+                    atexit.register(self.flush)
+                    FileStorage.__exit_flush = True
+            elif not FileStorage.__batch_depth:
+                self.flush()
+            if not FileStorage.__commit_interval:
+                self._cancel_timer()
+        if format is not None and format != FileStorage.__format:
+            old, new = self._serializer(), get_serializer(format)
+            for records in FileStorage.__records.values():
+                for key, fragment in records.items():
+                    records[key] = new.encode(old.decode(fragment))
+            FileStorage.__format = format
+            FileStorage.__fragments = {}
+
+    def _serializer(self):
+        """
+        Returns the serializer of the configured file format.
+
+        Returns:
+            JSONSerializer or BinarySerializer: The serializer.
+        """
+        return get_serializer(FileStorage.__format)
+
+    def _open(self, path, mode):
+        """
+        Opens a storage file in text or binary mode, depending on the file format.
+
+        Args:
+            path (str): The file path.
+            mode (str): "r" or "w".
+
+        Returns:
+            file: The open file.
+        """
+        if self._serializer().binary:
+            return open(path, mode + "b")
+        return open(path, mode, encoding="utf-8")
+
+    def journal(self):
+        """
+        Returns the journal kept next to the snapshot.
+
+        Returns:
+            Journal: The append-only log of changes.
+        """
+        return Journal(FileStorage.__file_path + ".log", self._serializer(),
+                       fsync=FileStorage.__durability == "fsync")
+
+    def _replay(self):
+        """
+        Replays the journal, counting the bytes read, and records its torn last
+        entry in __torn once every entry is read.
+
+        Yields:
+            tuple: The entries of the journal, see Journal.replay().
+        """
+        journal = self.journal()
+        metrics.increment("storage.bytes_read", self._size(journal.path))
+        yield from journal.replay()
+        FileStorage.__torn = journal.torn
+
+    @staticmethod
+    def _size(path):
+        """
+        Returns the size of a file.
+
+        Args:
+            path (str): The file path.
+
+        Returns:
+            int: The size in bytes, 0 if the file does not exist.
+        """
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    def _layout(self):
+        """
+        Returns the layout of the shard files.
+
+        Returns:
+            ShardLayout: The layout, or None when the snapshot is not sharded.
+        """
+        if not FileStorage.__shards:
+            return None
+        return ShardLayout(FileStorage.__file_path + ".shards", FileStorage.__shards,
+                           self._serializer().extension)
+
+    def _file_lock(self):
+        """
+        Returns the lock between processes, kept in a file next to the snapshot.
+
+        Returns:
+            FileLock: The lock.
+        """
+        if FileStorage.__file_lock is None:
+            FileStorage.__file_lock = FileLock(FileStorage.__file_path + ".lock")
+        return FileStorage.__file_lock
+
+    def _disk_version(self):
+        """
+        Identifies the state of the storage files, which changes whenever a process
+        writes them.
+
+        Returns:
+            list: The generation counter of the lock file, then the inode, modification
+            time and size of the snapshot, of the journal and of the shard directory,
+            None for a missing file.
+        """
+        version = [self._file_lock().generation()]
+        for path in (FileStorage.__file_path, FileStorage.__file_path + ".log",
+                     FileStorage.__file_path + ".shards"):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                version.append(None)
+            else:
+                version.append([stat.st_ino, stat.st_mtime_ns, stat.st_size])
+        return version
+
+    def _refresh(self):
+        """
+        Picks up the changes other processes saved, before a read, when the storage
+        is shared. Nothing is done when the current thread already holds the lock.
+        """
+        if not FileStorage.__shared or self._lock.held():
+            return
+        if self._disk_version() == FileStorage.__seen:
+            return
+        with self._lock.write(), self._file_lock().shared():
+            self._sync()
+            self._merge()
+
+    @metrics.timed("storage.merge")
+    def _merge(self):
+        """
+        Picks up the changes other processes saved since this one last read or wrote
+        the files: objects they created, modified or deleted are added, updated in
+        place or removed. Objects changed by this process since its last save are left
+        as they are, so that the last process to save an object wins. The write lock
+        and the file lock must be held; __lazy is taken, so that the files are not read
+        while another thread writes them.
+        """
+        with FileStorage.__lazy:
+            version = self._disk_version()
+            if version == FileStorage.__seen:
+                return
+            self._load()
+            records, replayed, entries = self._read_files()
+            dirty = FileStorage.__dirty
+            changed = False
+            for name, fragments in records.items():
+                pending = FileStorage.__records.setdefault(name, {})
+                for key, fragment in fragments.items():
+                    if key in dirty:
+                        continue
+                    obj = FileStorage.__objects.get(key)
+                    if obj is None:
+                        if pending.get(key) != fragment:
+                            pending[key] = fragment
+                            changed = True
+                        continue
+                    cached = FileStorage.__fragments.get(key)
+                    if cached is not None and cached[0] is obj and cached[1] == fragment:
+                        continue
+                    record = self._serializer().decode(fragment)
+                    obj._load(dict(self.classes()[record["__class__"]](**record)._fields()))
+                    FileStorage.__fragments[key] = (obj, fragment)
+                    changed = True
+            for key in list(FileStorage.__objects):
+                name = key.split(".", 1)[0]
+                if key not in dirty and key not in records.get(name, {}):
+                    del FileStorage.__objects[key]
+                    FileStorage.__partitions[name].pop(key, None)
+                    FileStorage.__fragments.pop(key, None)
+                    changed = True
+            for name, pending in FileStorage.__records.items():
+                for key in [k for k in pending if k not in dirty and k not in records.get(name, {})]:
+                    del pending[key]
+                    changed = True
+            if changed:
+                FileStorage.__indexes = None
+                FileStorage.__spatial = None
+                FileStorage.__columns = None
+                FileStorage.__text = None
+            FileStorage.__journal_entries = entries
+            FileStorage.__replayed = replayed
+            FileStorage.__seen = version
+
+    def _written(self):
+        """
+        Records that this process wrote the files, incrementing the generation counter
+        so that the other processes notice. The file lock must be held exclusively.
+        """
+        self._file_lock().increment()
+        FileStorage.__seen = self._disk_version()
+        FileStorage.__listed = FileStorage.__seen
+
+    @metrics.timed("storage.all")
+    def all(self, cls=None):
+        """
+        Returns the stored objects, or only those of one class.
+
+        Args:
+            cls (type or str): The class, or class name, to restrict the result to.
+
+        Returns:
+            StoredObjects: A live view of the stored objects, or of the objects of the
+            class read from its partition, keyed by their class name and ID; setting or
+            deleting a key stores or deletes its object. Only the objects of the
+            requested class are instantiated, and nothing is copied unless copy() is called.
+        """
+        name = None if cls is None else cls if isinstance(cls, str) else cls.__name__
+        self._objects(name)
+        return StoredObjects(self, name)
+
+    @read_locked
+    def _objects(self, name=None, copy=False):
+        """
+        Returns the dictionary holding the stored objects, or the partition of a class,
+        after instantiating those still waiting in __records; the views returned by
+        all() look their objects up here.
+
+        Args:
+            name (str): The class name, or None for every object.
+            copy (bool): Whether to return a copy of the dictionary, made under the lock.
+
+        Returns:
+            dict: The stored objects, keyed by their class name and ID.
+        """
+        self._sync()
+        if name is None:
+            self._load()
+            for pending in list(FileStorage.__records):
+                self._materialize_all(pending)
+            objects = FileStorage.__objects
+        else:
+            self._load(name)
+            self._materialize_all(name)
+            objects = FileStorage.__partitions.get(name, {})
+        return dict(objects) if copy else objects
 
-    def all(self):
+    @metrics.timed("storage.count")
+    @read_locked
+    def count(self, cls=None):
         """
-        Returns the dictionary of stored objects.
+        Returns the number of stored objects, or of the objects of one class.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to count.
+
+        Returns:
+            int: The number of objects.
+        """
+        self._sync()
+        if cls is None:
+            self._load()
+            return len(FileStorage.__objects) + sum(map(len, FileStorage.__records.values()))
+        name = cls if isinstance(cls, str) else cls.__name__
+        self._load(name)
+        return len(FileStorage.__partitions.get(name, {})) + len(FileStorage.__records.get(name, {}))
+
+    @metrics.timed("storage.get")
+    @read_locked
+    def get(self, cls, id):
+        """
+        Returns one stored object.
+
+        Args:
+            cls (type or str): The class, or class name, of the object.
+            id (str): The id of the object.
 
         Returns:
-            dict: The dictionary containing all stored objects.
+            BaseModel: The object, or None if it is not stored.
         """
-        return FileStorage.__objects
+        self._sync()
+        name = cls if isinstance(cls, str) else cls.__name__
+        key = "{}.{}".format(name, id)
+        obj = FileStorage.__objects.get(key)
+        if obj is None:
+            self._load(name, id)
+            if key in FileStorage.__records.get(name, {}):
+                obj = self._materialize(name, key)
+        return obj
 
+    @metrics.timed("storage.new")
+    @write_locked
     def new(self, obj):
         """
         Adds a new object to the storage.
@@ -34,107 +603,1135 @@ class FileStorage:
         Args:
             obj (BaseModel): The object to store, which must have an 'id' attribute.
         """
-        key = "{}.{}".format(type(obj).__name__, obj.id)
+        self._sync()
+        name = type(obj).__name__
+        key = "{}.{}".format(name, obj.id)
         FileStorage.__objects[key] = obj
+        FileStorage.__partitions.setdefault(name, {})[key] = obj
+        FileStorage.__records.get(name, {}).pop(key, None)
+        FileStorage.__dirty.add(key)
+        if FileStorage.__indexes is not None:
+            for attribute, index in FileStorage.__indexes.get(name, {}).items():
+                index.update(key, getattr(obj, attribute, None))
+        if FileStorage.__spatial is not None and name in FileStorage.__spatial:
+            FileStorage.__spatial[name].update(key, getattr(obj, "latitude", None),
+                                               getattr(obj, "longitude", None))
+        if FileStorage.__columns is not None and name in FileStorage.__columns:
+            store = FileStorage.__columns[name]
+            store.update(key, {c: getattr(obj, c, None) for c in store.columns})
+        if FileStorage.__text is not None and name in FIELDS:
+            FileStorage.__text.update(key, [getattr(obj, f, None) for f in FIELDS[name]])
+
+    @metrics.timed("storage.delete")
+    @write_locked
+    def delete(self, obj=None):
+        """
+        Removes an object from the storage.
+
+        Args:
+            obj (BaseModel): The object to remove. Nothing happens if it is None.
+        """
+        if obj is None:
+            return
+        self._sync()
+        name = type(obj).__name__
+        key = "{}.{}".format(name, obj.id)
+        if FileStorage.__objects.pop(key, None) is not None:
+            FileStorage.__partitions[name].pop(key, None)
+            FileStorage.__dirty.add(key)
+            FileStorage.__fragments.pop(key, None)
+            if FileStorage.__indexes is not None:
+                for index in FileStorage.__indexes.get(name, {}).values():
+                    index.discard(key)
+            if FileStorage.__spatial is not None and name in FileStorage.__spatial:
+                FileStorage.__spatial[name].discard(key)
+            if FileStorage.__columns is not None and name in FileStorage.__columns:
+                FileStorage.__columns[name].discard(key)
+            if FileStorage.__text is not None:
+                FileStorage.__text.discard(key)
+
+    def mark_dirty(self, obj, attribute=None):
+        """
+        Records that an attribute of a stored object changed, so that the next save
+        serializes it again and the indexes over that attribute stay consistent.
+
+        Args:
+            obj (BaseModel): The modified object. Objects that are not stored are ignored.
+            attribute (str): The name of the modified attribute.
+        """
+        key = "{}.{}".format(type(obj).__name__, getattr(obj, "id", None))
+        if FileStorage.__objects.get(key) is not obj:
+            return
+        self._lock.acquire_write()
+        try:
+            FileStorage.__dirty.add(key)
+            if FileStorage.__synced is not FileStorage.__objects:
+                return
+            if FileStorage.__indexes is not None:
+                index = FileStorage.__indexes.get(type(obj).__name__, {}).get(attribute)
+                if index is not None:
+                    index.update(key, getattr(obj, attribute, None))
+            if FileStorage.__spatial is not None and attribute in ("latitude", "longitude"):
+                spatial = FileStorage.__spatial.get(type(obj).__name__)
+                if spatial is not None:
+                    spatial.update(key, getattr(obj, "latitude", None), getattr(obj, "longitude", None))
+            if FileStorage.__columns is not None and type(obj).__name__ in FileStorage.__columns:
+                FileStorage.__columns[type(obj).__name__].set(key, attribute, getattr(obj, attribute, None))
+            fields = FIELDS.get(type(obj).__name__, ())
+            if FileStorage.__text is not None and attribute in fields:
+                FileStorage.__text.update(key, [getattr(obj, f, None) for f in fields])
+        finally:
+            self._lock.release_write()
+
+    def _sync(self):
+        """
+        Rebuilds the per-class partitions from __objects when the dictionary was replaced
+        from outside, drops the indexes so that they are rebuilt on the next lookup, and
+        reads the file if reload() deferred it.
+
+        A dictionary replaced from outside is taken as the whole content of the storage,
+        so the changes saved by other processes until then are not picked up.
+        """
+        if FileStorage.__synced is FileStorage.__objects and not FileStorage.__unscanned:
+            return
+        with FileStorage.__lazy:
+            if FileStorage.__synced is not FileStorage.__objects:
+                partitions = {}
+                for key, obj in FileStorage.__objects.items():
+                    partitions.setdefault(type(obj).__name__, {})[key] = obj
+                FileStorage.__partitions = partitions
+                FileStorage.__records = {}
+                FileStorage.__unscanned = False
+                FileStorage.__indexes = None
+                FileStorage.__spatial = None
+                FileStorage.__columns = None
+                FileStorage.__text = None
+                FileStorage.__synced = FileStorage.__objects
+                FileStorage.__seen = self._disk_version()
+                FileStorage.__unread = set()
+                FileStorage.__pending = {}
+                FileStorage.__changed = set()
+                FileStorage.__rewrite = True
+            if FileStorage.__unscanned:
+                FileStorage.__unscanned = False
+                self._scan()
+
+    def _load(self, name=None, id=None):
+        """
+        Reads the unread shards holding the objects of a class, or only the one that
+        would hold an object, or every unread shard, into __records.
+
+        Args:
+            name (str): The class name, or None for every class.
+            id (str): The id of the object, or None for every object of the class.
+        """
+        if not FileStorage.__unread:
+            return
+        with FileStorage.__lazy:
+            layout = self._layout()
+            if name is None:
+                shards = set(FileStorage.__unread)
+            elif id is not None:
+                shards = {layout.shard(name + "." + id)} & FileStorage.__unread
+            else:
+                shards = {s for s in FileStorage.__unread if s[0] == name}
+            if not shards:
+                return
+            with self._file_lock().shared():
+                if self._disk_version() != FileStorage.__listed:
+                    self._replay_pending()
+                for shard in sorted(shards):
+                    self._read_shard(layout, shard)
+
+    def _replay_pending(self):
+        """
+        Replays the journal again into the entries of the unread shards, after another
+        process wrote the files; the entries replayed earlier may be in the shard files
+        by now, and older than them. The file lock must be held.
+        """
+        layout = self._layout()
+        pending = {}
+        for key, fragment in self._replay():
+            shard = layout.shard(key)
+            if shard in FileStorage.__unread:
+                pending.setdefault(shard, {})[key] = fragment
+        FileStorage.__pending = pending
+        FileStorage.__listed = self._disk_version()
+
+    @metrics.timed("storage.read_shard")
+    def _read_shard(self, layout, shard):
+        """
+        Reads a shard file and applies its journal entries, leaving out the objects
+        created, modified or deleted in memory since. The file lock must be held.
+
+        Args:
+            layout (ShardLayout): The layout of the shard files.
+            shard (tuple): The (class name, bucket) of the shard.
+        """
+        name = shard[0]
+        records = FileStorage.__records.setdefault(name, {})
+        entries = []
+        path = layout.path(shard)
+        if os.path.isfile(path):
+            metrics.increment("storage.bytes_read", self._size(path))
+            with self._open(path, "r") as f:
+                entries.extend(self._serializer().read_snapshot(f))
+        entries.extend(FileStorage.__pending.pop(shard, {}).items())
+        for key, fragment in entries:
+            if key in FileStorage.__objects or key in FileStorage.__dirty:
+                continue
+            if fragment is None:
+                records.pop(key, None)
+            else:
+                records[key] = fragment
+        FileStorage.__unread.discard(shard)
+
+    def _materialize(self, name, key):
+        """
+        Instantiates an object read from the file and moves it from __records to the
+        dictionary of objects. Its fragment is kept as the cached encoding.
 
+        Args:
+            name (str): The class name of the object.
+            key (str): The key of the object.
+
+        Returns:
+            BaseModel: The new instance, or the one another thread instantiated first.
+        """
+        with FileStorage.__lazy:
+            obj = FileStorage.__objects.get(key)
+            if obj is not None:
+                return obj
+            fragment = FileStorage.__records[name].pop(key)
+            record = self._serializer().decode(fragment)
+            obj = self.classes()[record["__class__"]](**record)
+            metrics.increment("storage.decoded")
+            FileStorage.__objects[key] = obj
+            FileStorage.__partitions.setdefault(name, {})[key] = obj
+            FileStorage.__fragments[key] = (obj, fragment)
+            return obj
+
+    def _materialize_all(self, name):
+        """
+        Instantiates every object of a class that is still waiting in __records.
+
+        Args:
+            name (str): The class name.
+        """
+        with FileStorage.__lazy:
+            for key in list(FileStorage.__records.get(name, ())):
+                self._materialize(name, key)
+
+    def _build_indexes(self):
+        """
+        Creates a secondary index for every foreign key declared in attributes(),
+        that is every attribute named like "<model>_id", and fills them from the partitions.
+        """
+        indexes = {}
+        for name, attributes in self.attributes().items():
+            indexed = {a: ForeignKeyIndex(name, a) for a in attributes if a.endswith("_id")}
+            if not indexed:
+                continue
+            for key, obj in FileStorage.__partitions.get(name, {}).items():
+                for attribute, index in indexed.items():
+                    index.update(key, getattr(obj, attribute, None))
+            for key, fragment in FileStorage.__records.get(name, {}).items():
+                record = self._serializer().decode(fragment)
+                for attribute, index in indexed.items():
+                    index.update(key, record.get(attribute, getattr(self.classes()[name], attribute, None)))
+            indexes[name] = indexed
+        FileStorage.__indexes = indexes
+
+    @metrics.timed("storage.find")
+    @read_locked
+    def find(self, cls, **criteria):
+        """
+        Returns the objects of a class whose attributes equal the given values, such as
+        find(Place, city_id=...) for the places of a city. Foreign keys are looked up in
+        the secondary indexes; other criteria filter the indexed matches.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to find.
+            **criteria: Attribute names and the values they must equal.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        self._sync()
+        with FileStorage.__lazy:
+            if FileStorage.__indexes is None:
+                self._load()
+                self._build_indexes()
+        indexes = FileStorage.__indexes.get(name, {})
+        keys = None
+        for attribute, value in criteria.items():
+            if attribute in indexes:
+                found = indexes[attribute].lookup(value)
+                keys = found if keys is None else keys & found
+        if keys is None:
+            self._materialize_all(name)
+            keys = FileStorage.__partitions.get(name, {})
+        result = {}
+        for key in keys:
+            obj = self.get(name, key[len(name) + 1:])
+            if all(getattr(obj, a, None) == v for a, v in criteria.items()):
+                result[key] = obj
+        return result
+
+    def _build_spatial(self):
+        """
+        Creates a spatial index for every class declaring both a latitude and a longitude
+        in attributes(), and fills them from the partitions and the unread records. The
+        defaults are read from the registered classes, as the compact ones hide them.
+        """
+        spatial = {}
+        for name, attributes in self.attributes().items():
+            if "latitude" not in attributes or "longitude" not in attributes:
+                continue
+            cls = registry.classes()[name]
+            latitude, longitude = getattr(cls, "latitude", None), getattr(cls, "longitude", None)
+            index = GridIndex(name, default=(latitude, longitude))
+            for key, obj in FileStorage.__partitions.get(name, {}).items():
+                index.update(key, getattr(obj, "latitude", None), getattr(obj, "longitude", None))
+            for key, fragment in FileStorage.__records.get(name, {}).items():
+                record = self._serializer().decode(fragment)
+                index.update(key, record.get("latitude", latitude), record.get("longitude", longitude))
+            spatial[name] = index
+        FileStorage.__spatial = spatial
+
+    def _spatial_index(self, cls):
+        """
+        Returns the spatial index of a class, building the spatial indexes if needed.
+
+        Args:
+            cls (type or str): The class, or class name.
+
+        Returns:
+            tuple: The class name and its GridIndex.
+
+        Raises:
+            ValueError: If the class has no latitude and longitude.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        self._sync()
+        with FileStorage.__lazy:
+            if FileStorage.__spatial is None:
+                self._load()
+                self._build_spatial()
+        if name not in FileStorage.__spatial:
+            raise ValueError("{} has no coordinates".format(name))
+        return name, FileStorage.__spatial[name]
+
+    @metrics.timed("storage.within")
+    @read_locked
+    def within(self, cls, south, west, north, east):
+        """
+        Returns the objects of a class located in a latitude/longitude box.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            south (float): The southern bound, in degrees.
+            west (float): The western bound; greater than east for a box crossing
+                the antimeridian.
+            north (float): The northern bound, in degrees.
+            east (float): The eastern bound, in degrees.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+        """
+        name, index = self._spatial_index(cls)
+        return {key: self.get(name, key[len(name) + 1:])
+                for key in index.within(south, west, north, east)}
+
+    @metrics.timed("storage.within_radius")
+    @read_locked
+    def within_radius(self, cls, latitude, longitude, radius):
+        """
+        Returns the objects of a class located within a distance of a point.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            latitude (float): The latitude of the center, in degrees.
+            longitude (float): The longitude of the center, in degrees.
+            radius (float): The distance, in kilometers.
+
+        Returns:
+            list: Pairs of (distance in kilometers, object), nearest first.
+        """
+        name, index = self._spatial_index(cls)
+        return [(km, self.get(name, key[len(name) + 1:]))
+                for km, key in index.within_radius(latitude, longitude, radius)]
+
+    @metrics.timed("storage.nearest")
+    @read_locked
+    def nearest(self, cls, latitude, longitude, count=1):
+        """
+        Returns the objects of a class nearest to a point.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            count (int): The number of objects to return.
+
+        Returns:
+            list: Pairs of (distance in kilometers, object), nearest first.
+        """
+        name, index = self._spatial_index(cls)
+        return [(km, self.get(name, key[len(name) + 1:]))
+                for km, key in index.nearest(latitude, longitude, count)]
+
+    def _build_columns(self):
+        """
+        Creates the columns of every class declaring numeric attributes or foreign keys
+        in attributes(), and fills them from the partitions and the unread records.
+        """
+        columns = {}
+        for name, attributes in self.attributes().items():
+            numeric = [a for a, kind in attributes.items() if kind in (int, float)]
+            keys = [a for a in attributes if a.endswith("_id")]
+            if not numeric and not keys:
+                continue
+            store = ColumnStore(name, numeric, keys)
+            objects = FileStorage.__partitions.get(name, {})
+            store.extend(list(objects), {c: [getattr(obj, c, None) for obj in objects.values()]
+                                         for c in store.columns})
+            cls = self.classes()[name]
+            records = FileStorage.__records.get(name, {})
+            decoded = [self._serializer().decode(fragment) for fragment in records.values()]
+            store.extend(list(records), {c: [r.get(c, getattr(cls, c, None)) for r in decoded]
+                                         for c in store.columns})
+            columns[name] = store
+        FileStorage.__columns = columns
+
+    @metrics.timed("storage.aggregate")
+    @read_locked
+    def aggregate(self, cls, column=None, by=None):
+        """
+        Returns the count, sum, mean, minimum and maximum of a numeric attribute of the
+        objects of a class, such as aggregate(Place, "price_by_night", by="city_id"),
+        or only the number of objects without an attribute. The aggregates are computed
+        over columnar copies of the attributes, see models.engine.analytics, which are
+        built on the first call and then kept up to date as objects change.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            column (str): The numeric attribute to aggregate, or None to count objects.
+            by (str): The foreign key to group by, or None for a single group.
+
+        Returns:
+            dict: The aggregates of each group, as {foreign key value: {aggregate: value}},
+            or {None: {aggregate: value}} without a group-by.
+
+        Raises:
+            ValueError: If the attribute is not numeric or the foreign key is not one.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        self._sync()
+        with FileStorage.__lazy:
+            if FileStorage.__columns is None:
+                self._load()
+                self._build_columns()
+        store = FileStorage.__columns.get(name)
+        if store is None:
+            store = ColumnStore(name, (), ())
+        return store.aggregate(column, by)
+
+    def _signature(self):
+        """
+        Identifies the current snapshot file, for the full-text index saved with it.
+
+        Returns:
+            list: The inode, modification time and size of the file, or None if there
+            is no snapshot. When the snapshot is sharded, the name, inode, modification
+            time and size of every shard file.
+        """
+        layout = self._layout()
+        if layout is not None:
+            signature = []
+            for path in layout.scan()[0].values():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    return None
+                signature.append([os.path.basename(path), stat.st_ino, stat.st_mtime_ns, stat.st_size])
+            return signature or None
+        try:
+            stat = os.stat(FileStorage.__file_path)
+        except OSError:
+            return None
+        return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+    def _text_fields(self, key):
+        """
+        Returns the values of the indexed text attributes of a stored object, whether
+        it was instantiated or is still an unread record.
+
+        Args:
+            key (str): The key of the object.
+
+        Returns:
+            list: The values, or None if the object is not stored.
+        """
+        name = key.split(".", 1)[0]
+        fields = FIELDS.get(name, ())
+        obj = FileStorage.__objects.get(key)
+        if obj is not None:
+            return [getattr(obj, f, None) for f in fields]
+        fragment = FileStorage.__records.get(name, {}).get(key)
+        if fragment is None:
+            return None
+        record = self._serializer().decode(fragment)
+        return [record.get(f) for f in fields]
+
+    def _text_index(self):
+        """
+        Returns the full-text index, loading the one saved with the snapshot, or
+        building it from the stored objects when there is none or it is out of date.
+
+        A loaded index is brought up to date with the objects changed since the
+        snapshot: those read from the journal, those instantiated since the reload,
+        which may have been modified, and those deleted since.
+
+        Returns:
+            TextIndex: The index.
+        """
+        self._sync()
+        with FileStorage.__lazy:
+            if FileStorage.__text is not None:
+                return FileStorage.__text
+            self._load()
+            with self._file_lock().shared():
+                index = TextIndex.load(FileStorage.__file_path + ".search", self._signature())
+            if index is None:
+                index = TextIndex()
+                keys = [k for name in FIELDS for k in FileStorage.__partitions.get(name, {})]
+                keys += [k for name in FIELDS for k in FileStorage.__records.get(name, {})]
+            else:
+                for key in index.keys():
+                    name = key.split(".", 1)[0]
+                    if key not in FileStorage.__objects and key not in FileStorage.__records.get(name, {}):
+                        index.discard(key)
+                keys = {k for k in FileStorage.__replayed if k.split(".", 1)[0] in FIELDS}
+                keys.update(k for name in FIELDS for k in FileStorage.__partitions.get(name, {}))
+            for key in keys:
+                texts = self._text_fields(key)
+                if texts is None:
+                    index.discard(key)
+                else:
+                    index.update(key, texts)
+            FileStorage.__text = index
+            return index
+
+    @metrics.timed("storage.search")
+    @read_locked
+    def search(self, text, cls=None, limit=None):
+        """
+        Returns the objects whose text attributes, listed in models.engine.search.FIELDS,
+        contain any word of a text, the most relevant first. Only the returned objects
+        are instantiated.
+
+        Args:
+            text (str): The words to look for.
+            cls (type or str): The class, or class name, to restrict the results to.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: Pairs of (score, object), highest score first.
+        """
+        index = self._text_index()
+        name = None if cls is None else cls if isinstance(cls, str) else cls.__name__
+        return [(score, self.get(*key.split(".", 1)))
+                for score, key in index.search(text, name and name + ".", limit)]
+
+    @metrics.timed("storage.query")
+    @read_locked
+    def query(self, cls, where=(), order_by=None, limit=None, offset=0, fields=None):
+        """
+        Returns the objects of a class matching predicates such as price_by_night < 100,
+        ordered and paginated, see models.engine.query. Equality predicates on foreign
+        keys are looked up in the secondary indexes, so that only the objects they
+        designate are instantiated and compared.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to return.
+            where (iterable): The query.Predicate every result must match.
+            order_by (str): The attribute to order by, prefixed with '-' for a descending order.
+            limit (int): The maximum number of results.
+            offset (int): The number of results to skip.
+            fields (list): The attributes to return instead of the objects.
+
+        Returns:
+            list: The matching objects, or dictionaries of their selected attributes.
+        """
+        where = list(where)
+        indexed = {p.attribute: p.value for p in where if p.equality and p.attribute.endswith("_id")}
+        candidates = self.find(cls, **indexed) if indexed else self.all(cls)
+        return query.run(candidates.values(), where, order_by, limit, offset, fields)
+
+    def _fragment(self, key, obj):
+        """
+        Returns the encoding of a stored object in the configured file format,
+        re-encoding it only when it changed since it was last encoded.
+
+        Args:
+            key (str): The key of the object in __objects.
+            obj (BaseModel): The object to encode.
+
+        Returns:
+            str or bytes: The encoding of obj.to_dict().
+        """
+        cached = FileStorage.__fragments.get(key)
+        if cached is None or cached[0] is not obj or key in FileStorage.__dirty:
+            cached = (obj, self._serializer().encode(obj.to_dict()))
+            FileStorage.__fragments[key] = cached
+            metrics.increment("storage.encoded")
+        return cached[1]
+
+    @metrics.timed("storage.save")
     def save(self):
         """
-        Serializes the dictionary of objects to a JSON file at the path specified by __file_path.
+        Persists the objects changed since the last save.
+
+        Inside a batch() block, or when group commit is enabled, the save is deferred:
+        it is only written at the end of the block, or once __commit_size saves were
+        requested or __commit_interval seconds passed since the last write. See flush().
         """
-        with open(FileStorage.__file_path, "w", encoding="utf-8") as f:
-            # Convert objects to dictionaries for serialization
-            d = {k: v.to_dict() for k, v in FileStorage.__objects.items()}
-            json.dump(d, f)
+        with self._lock.write():
+            FileStorage.__deferred += 1
+            if FileStorage.__batch_depth:
+                return
+            size, interval = FileStorage.__commit_size, FileStorage.__commit_interval
+            if size or interval:
+                elapsed = time.monotonic() - FileStorage.__last_commit
+                if not (size and FileStorage.__deferred >= size) and not (interval and elapsed >= interval):
+                    if interval and FileStorage.__timer is None:
+                        delay = min(interval - elapsed, interval)
+                        FileStorage.__timer = threading.Timer(delay, self._flush_due)
+                        FileStorage.__timer.daemon = True
+                        FileStorage.__timer.start()
+                    return
+        self.flush()
+
+    def _flush_due(self):
+        """
+        Writes the saves deferred by group commit once commit_interval has passed;
+        runs in the thread of __timer. Saves deferred inside a batch() block are left
+        for the end of the block.
+        """
+        with self._lock.write():
+            if FileStorage.__timer is not threading.current_thread():
+                return
+            FileStorage.__timer = None
+            if FileStorage.__batch_depth:
+                return
+        self.flush()
+
+    def _cancel_timer(self):
+        """
+        Cancels the pending write of __timer, if any.
+        """
+        timer, FileStorage.__timer = FileStorage.__timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+
+    @metrics.timed("storage.flush")
+    def flush(self):
+        """
+        Writes the saves requested since the last write, if any.
+
+        In snapshot mode the whole dictionary of objects is serialized to the file at
+        the path specified by __file_path, or only the shards holding changed objects
+        when the snapshot is sharded. In journal mode only the changed objects, and a
+        tombstone for each deleted one, are appended to the journal; the journal is folded
+        back into the snapshot once it holds __compact_threshold entries.
+
+        Either way, only the objects changed since the last save are encoded again; the
+        encoding of the others is reused from __fragments. The files are written after
+        the write lock is released, see _commit().
+        """
+        if not FileStorage.__deferred:
+            return
+        with self._lock.write():
+            if not FileStorage.__deferred:
+                return
+            self._cancel_timer()
+            FileStorage.__deferred = 0
+            FileStorage.__last_commit = time.monotonic()
+            entries = FileStorage.__journal_entries + len(FileStorage.__dirty)
+            compact = FileStorage.__mode != "journal" or entries >= FileStorage.__compact_threshold
+        if compact:
+            self.compact()
+        else:
+            self._commit(self._plan_journal)
+
+    def _plan_journal(self):
+        """
+        Prepares the append of the changed objects to the journal, see _commit().
+
+        Returns:
+            list: The writes.
+        """
+        entries = []
+        for key in FileStorage.__dirty:
+            obj = FileStorage.__objects.get(key)
+            entries.append((key, self._fragment(key, obj) if obj is not None else None))
+        layout = self._layout()
+        if layout is not None:
+            for key, fragment in entries:
+                shard = layout.shard(key)
+                FileStorage.__changed.add(shard)
+                if shard in FileStorage.__unread:
+                    FileStorage.__pending.setdefault(shard, {})[key] = fragment
+        FileStorage.__journal_entries += len(entries)
+        FileStorage.__dirty = set()
+        journal = self.journal()
+        torn, FileStorage.__torn = FileStorage.__torn, None
+
+        def append():
+            if torn is not None:
+                journal.cut(torn)
+            size = self._size(journal.path)
+            journal.append(entries)
+            metrics.increment("storage.bytes_written", self._size(journal.path) - size)
+        return [append]
+
+    def _commit(self, prepare):
+        """
+        Writes the files in two steps, so that the write lock is not held during the
+        I/O: prepare() runs under the write lock, after picking up the changes other
+        processes saved, see _merge(). It encodes the changed objects, records them
+        as written and returns the writes, callables doing the I/O alone, which are
+        then called once the write lock is released. Objects may thus be created,
+        modified and deleted by other threads while the files are written; those
+        changes are left for the next save.
+
+        The exclusive file lock and __io are held until the files are written, so
+        that writes never interleave. When the caller holds the write lock, such as
+        in a batch() or locked() block, the files are written under it.
+
+        If a write fails, the changes it held are recorded as unsaved again.
+
+        Args:
+            prepare (callable): Returns the list of writes, or None for no write.
+        """
+        self._lock.acquire_write()
+        locked, writing = True, False
+        try:
+            with FileStorage.__io, self._file_lock().exclusive():
+                self._sync()
+                self._merge()
+                dirty, changed = FileStorage.__dirty, FileStorage.__changed
+                writes = prepare()
+                if writes is None:
+                    return
+                self._lock.release_write()
+                locked, writing = False, True
+                with FileStorage.__lazy:
+                    for write in writes:
+                        write()
+                    self._written()
+                writing = False
+        finally:
+            if locked:
+                self._lock.release_write()
+            elif writing:
+                with self._lock.write():
+                    FileStorage.__dirty |= dirty
+                    FileStorage.__changed |= changed
+                    FileStorage.__rewrite = True
+                    FileStorage.__deferred += 1
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Coalesces the saves requested inside a with block into a single write, made
+        when the outermost block exits. This is not a transaction: the write happens
+        even if the block raises, and nothing is rolled back.
+
+        Yields:
+            FileStorage: The storage.
+        """
+        with self._lock.write():
+            FileStorage.__batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock.write():
+                FileStorage.__batch_depth -= 1
+                due = not FileStorage.__batch_depth and FileStorage.__deferred
+            if due:
+                self.flush()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Holds the storage exclusively, against the other threads and the other
+        processes, for the duration of a with block, so that objects can be read,
+        modified and saved without another writer interleaving, as in:
+
+            with storage.locked():
+                place = storage.get("Place", place_id)
+                place.number_rooms += 1
+                place.save()
+
+        The changes other processes saved are picked up first, and the saves requested
+        in the block are written when it exits, as with batch().
+
+        Yields:
+            FileStorage: The storage.
+        """
+        with self._lock.write(), self._file_lock().exclusive():
+            self._sync()
+            self._merge()
+            with self.batch():
+                yield self
+
+    @metrics.timed("storage.compact")
+    def compact(self):
+        """
+        Serializes the dictionary of objects to the file at the path specified by
+        __file_path and empties the journal, whose changes the snapshot now contains.
+        Objects that were never instantiated are written back from their fragment.
+        The changes other processes saved are picked up first, see _merge(), and the
+        files are written after the write lock is released, see _commit().
+
+        When the snapshot is sharded, only the shards holding objects changed since
+        they were last written are rewritten, see _plan_shards().
+        """
+        self._commit(self._plan_compact)
+
+    def _plan_compact(self):
+        """
+        Prepares the write of the snapshot, the removal of the journal, and the write
+        of the full-text index, if it was built, see _commit().
+
+        Returns:
+            list: The writes.
+        """
+        layout = self._layout()
+        if layout is not None:
+            writes = self._plan_shards(layout)
+        else:
+            items = [(k, self._fragment(k, v)) for k, v in FileStorage.__objects.items()]
+            for records in FileStorage.__records.values():
+                items.extend(records.items())
+            writes = [functools.partial(self._write_snapshot, items), self._remove_shards]
+        writes.append(self.journal().truncate)
+        FileStorage.__journal_entries = 0
+        FileStorage.__torn = None
+        FileStorage.__dirty = set()
+        FileStorage.__replayed = set()
+        text = FileStorage.__text
+        if text is not None:
+            copy = text.copy()
+
+            def save_text():
+                text.signature = copy.signature = self._signature()
+                self._write_file(FileStorage.__file_path + ".search", copy.save, text=True)
+            writes.append(save_text)
+        return writes
+
+    def _plan_shards(self, layout):
+        """
+        Prepares the write of the shards holding objects changed since they were last
+        written, and the removal of the files of the shards left empty. After a change
+        of layout or of format, every shard is written, then the other files of the
+        shard directory and the unsharded snapshot are removed. The file lock must be
+        held exclusively.
+
+        Args:
+            layout (ShardLayout): The layout of the shard files.
+
+        Returns:
+            list: The writes.
+        """
+        existing, others = layout.scan()
+        rewrite = FileStorage.__rewrite or others or os.path.isfile(FileStorage.__file_path)
+        if rewrite:
+            self._load()
+            shards = set(existing)
+            shards.update(layout.shard(k) for k in FileStorage.__objects)
+            for records in FileStorage.__records.values():
+                shards.update(layout.shard(k) for k in records)
+        else:
+            shards = FileStorage.__changed | {layout.shard(k) for k in FileStorage.__dirty}
+            shards.update(layout.shard(k) for k in FileStorage.__replayed)
+            for shard in sorted(shards & FileStorage.__unread):
+                self._read_shard(layout, shard)
+        groups = {shard: [] for shard in shards}
+        for name in {name for name, _ in shards}:
+            objects = FileStorage.__partitions.get(name, {}).items()
+            records = FileStorage.__records.get(name, {}).items()
+            if layout.buckets == 1:
+                items = groups[(name, 0)]
+                items.extend((key, self._fragment(key, obj)) for key, obj in objects)
+                items.extend(records)
+                continue
+            for key, obj in objects:
+                items = groups.get(layout.shard(key))
+                if items is not None:
+                    items.append((key, self._fragment(key, obj)))
+            for key, fragment in records:
+                items = groups.get(layout.shard(key))
+                if items is not None:
+                    items.append((key, fragment))
+        FileStorage.__changed = set()
+        FileStorage.__rewrite = False
+        snapshot = FileStorage.__file_path
+
+        def write_shards():
+            os.makedirs(layout.directory, exist_ok=True)
+            for shard, items in sorted(groups.items()):
+                path = layout.path(shard)
+                if items:
+                    self._write_snapshot(items, path)
+                elif os.path.isfile(path):
+                    os.remove(path)
+            if rewrite:
+                written = {layout.path(shard) for shard, items in groups.items() if items}
+                for filename in os.listdir(layout.directory):
+                    path = os.path.join(layout.directory, filename)
+                    if path not in written:
+                        os.remove(path)
+                if os.path.isfile(snapshot):
+                    os.remove(snapshot)
+        return [write_shards]
+
+
+    def _remove_shards(self):
+        """
+        Removes the shard files, once their objects were written to an unsharded
+        snapshot.
+        """
+        directory = FileStorage.__file_path + ".shards"
+        if not os.path.isdir(directory):
+            return
+        for filename in os.listdir(directory):
+            os.remove(os.path.join(directory, filename))
+        os.rmdir(directory)
+
+    def _write_snapshot(self, items, path=None):
+        """
+        Writes the snapshot file with the configured durability, see _write_file().
+
+        Args:
+            items (list): Pairs of (key, fragment).
+            path (str): The file path, __file_path by default.
+        """
+        path = path or FileStorage.__file_path
+        self._write_file(path, lambda f: self._serializer().write_snapshot(f, items))
+        metrics.increment("storage.bytes_written", self._size(path))
+
+    def _write_file(self, path, write, text=False):
+        """
+        Writes a storage file with the configured durability.
+
+        With "none" the file is truncated and written in place. Otherwise the content
+        is written to a temporary file next to it, which is then renamed over it, so
+        that a crash leaves either the previous or the new file, never a truncated
+        one. With "fsync" the temporary file is forced to disk before the rename, and
+        the directory after it.
+
+        Args:
+            path (str): The file path.
+            write (callable): Called with the open file to write the content.
+            text (bool): Whether to open the file in text mode whatever the file format.
+        """
+        def open_file(file_path):
+            if text:
+                return open(file_path, "w", encoding="utf-8")
+            return self._open(file_path, "w")
+
+        durability = FileStorage.__durability
+        if durability == "none":
+            with open_file(path) as f:
+                write(f)
+            return
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open_file(tmp_path) as f:
+                write(f)
+                f.flush()
+                if durability == "fsync":
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if durability == "fsync":
+            fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
 
     def classes(self):
         """
         Returns a dictionary of valid class names and their corresponding class references.
+        When the storage is configured with compact=True, the compact variants of the
+        classes are returned, see models.engine.compact.
+
+        The dictionary is built once by the model registry, see models.engine.registry,
+        and must not be modified.
 
         Returns:
             dict: A dictionary where the keys are class names and the values are class references.
         """
-        from models.base_model import BaseModel
-        from models.user import User
-        from models.state import State
-        from models.city import City
-        from models.amenity import Amenity
-        from models.place import Place
-        from models.review import Review
-
-        classes = {
-            "BaseModel": BaseModel,
-            "User": User,
-            "State": State,
-            "City": City,
-            "Amenity": Amenity,
-            "Place": Place,
-            "Review": Review
-        }
-        return classes
+        if FileStorage.__compact:
+            return registry.compact_classes()
+        return registry.classes()
 
+    @metrics.timed("storage.reload")
+    @write_locked
     def reload(self):
         """
-        Reloads objects from the JSON file into the storage.
+        Reloads objects from the file into the storage.
 
-        If the JSON file does not exist, this method does nothing. Otherwise, it reads the file,
-        reconstructs objects from the data, and updates the storage dictionary.
+        If neither the file nor its journal exist, this method does nothing. Otherwise,
+        the storage is emptied and the file is only read on the first access to the storage,
+        so reload() returns immediately. The file is then parsed one record at a time, the
+        journal is replayed on top of it, and each record is kept as an encoded fragment
+        until its object is looked up, see __records. When the snapshot is sharded, each
+        shard file is only read once its class is looked up, see _load().
         """
-        if not os.path.isfile(FileStorage.__file_path):
+        if not os.path.isfile(FileStorage.__file_path) and not os.path.isfile(self.journal().path) \
+                and not os.path.isdir(FileStorage.__file_path + ".shards"):
             return
-        with open(FileStorage.__file_path, "r", encoding="utf-8") as f:
-            obj_dict = json.load(f)
-            # Recreate objects from the dictionary
-            obj_dict = {k: self.classes()[v["__class__"]](**v) for k, v in obj_dict.items()}
-            # TODO: Determine whether this should overwrite or merge existing objects
-            FileStorage.__objects = obj_dict
+        FileStorage.__objects = {}
+        FileStorage.__partitions = {}
+        FileStorage.__records = {}
+        FileStorage.__indexes = None
+        FileStorage.__spatial = None
+        FileStorage.__columns = None
+        FileStorage.__text = None
+        FileStorage.__synced = FileStorage.__objects
+        FileStorage.__journal_entries = 0
+        FileStorage.__dirty = set()
+        FileStorage.__fragments = {}
+        FileStorage.__seen = None
+        FileStorage.__unread = set()
+        FileStorage.__pending = {}
+        FileStorage.__changed = set()
+        FileStorage.__rewrite = False
+        FileStorage.__listed = None
+        FileStorage.__unscanned = True
+
+    @metrics.timed("storage.scan")
+    def _scan(self):
+        """
+        Reads the file and the journal into __records without instantiating anything.
+        When the snapshot is sharded, the shard files are only listed, and the journal
+        entries are set aside until their shard is read, see _load().
+        """
+        with self._file_lock().shared():
+            layout = self._layout()
+            if layout is None:
+                records, replayed, entries = self._read_files()
+            else:
+                records, replayed, entries = self._list_shards(layout)
+            FileStorage.__seen = self._disk_version()
+            FileStorage.__listed = FileStorage.__seen
+        FileStorage.__records = records
+        FileStorage.__journal_entries = entries
+        FileStorage.__replayed = replayed
+
+    def _list_shards(self, layout):
+        """
+        Lists the shard files to read on demand, and replays the journal into the
+        entries of each shard. A snapshot left by another layout, unsharded or with
+        another number of buckets, is read right away and rewritten on the next save.
+        The file lock must be held.
+
+        Args:
+            layout (ShardLayout): The layout of the shard files.
+
+        Returns:
+            tuple: The records read right away, as {class name: {key: fragment}}, the
+            keys read from the journal, and the number of journal entries.
+        """
+        shards, others = layout.scan()
+        paths = others
+        if os.path.isfile(FileStorage.__file_path):
+            paths = [FileStorage.__file_path] + others
+        records = self._read_snapshots(paths)
+        pending = {}
+        entries = 0
+        replayed = set()
+        for key, fragment in self._replay():
+            name = key.split(".", 1)[0]
+            if fragment is None:
+                records.get(name, {}).pop(key, None)
+            else:
+                records.setdefault(name, {})[key] = fragment
+            pending.setdefault(layout.shard(key), {})[key] = fragment
+            replayed.add(key)
+            entries += 1
+        FileStorage.__unread = set(shards) | set(pending)
+        FileStorage.__pending = pending
+        FileStorage.__changed = set(pending)
+        FileStorage.__rewrite = bool(paths)
+        return records, replayed, entries
+
+    def _read_snapshots(self, paths):
+        """
+        Reads snapshot files, the later ones overriding the earlier ones, without
+        decoding anything.
+
+        Args:
+            paths (list): The file paths.
+
+        Returns:
+            dict: The records, as {class name: {key: fragment}}.
+        """
+        records = {}
+        for path in paths:
+            metrics.increment("storage.bytes_read", self._size(path))
+            with self._open(path, "r") as f:
+                for key, fragment in self._serializer().read_snapshot(f):
+                    records.setdefault(key.split(".", 1)[0], {})[key] = fragment
+        return records
+
+    def _read_files(self):
+        """
+        Reads the file, or the shard files, and replays the journal on top of them,
+        without decoding anything. The file lock must be held.
+
+        Returns:
+            tuple: The records, as {class name: {key: fragment}}, the keys read from the
+            journal, and the number of journal entries.
+        """
+        paths = []
+        if os.path.isfile(FileStorage.__file_path):
+            paths.append(FileStorage.__file_path)
+        layout = self._layout() or ShardLayout(FileStorage.__file_path + ".shards", 1,
+                                               self._serializer().extension)
+        shards, others = layout.scan()
+        paths.extend(others)
+        paths.extend(shards.values())
+        records = self._read_snapshots(paths)
+        entries = 0
+        replayed = set()
+        for key, fragment in self._replay():
+            name = key.split(".", 1)[0]
+            if fragment is None:
+                records.get(name, {}).pop(key, None)
+            else:
+                records.setdefault(name, {})[key] = fragment
+            replayed.add(key)
+            entries += 1
+        return records, replayed, entries
 
     def attributes(self):
         """
-        Returns a dictionary of valid attributes and their types for each class.
+        Returns a dictionary of valid attributes and their types for each class, as
+        registered by the models, see models.engine.registry. It is built once and must
+        not be modified.
 
         Returns:
             dict: A dictionary where the keys are class names and the values are dictionaries
                   mapping attribute names to their types.
         """
-        attributes = {
-            "BaseModel": {
-                "id": str,
-                "created_at": datetime.datetime,
-                "updated_at": datetime.datetime
-            },
-            "User": {
-                "email": str,
-                "password": str,
-                "first_name": str,
-                "last_name": str
-            },
-            "State": {
-                "name": str
-            },
-            "City": {
-                "state_id": str,
-                "name": str
-            },
-            "Amenity": {
-                "name": str
-            },
-            "Place": {
-                "city_id": str,
-                "user_id": str,
-                "name": str,
-                "description": str,
-                "number_rooms": int,
-                "number_bathrooms": int,
-                "max_guest": int,
-                "price_by_night": int,
-                "latitude": float,
-                "longitude": float,
-                "amenity_ids": list
-            },
-            "Review": {
-                "place_id": str,
-                "user_id": str,
-                "text": str
-            }
-        }
-        return attributes
+        return registry.attributes()
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Module for the geographic computations behind the spatial queries of the
+storage engines: great-circle distances and the bounding boxes of circles.
+"""
+
+from math import asin, cos, degrees, radians, sin, sqrt
+
+EARTH_RADIUS = 6371.0088
+"""float: The mean radius of the Earth, in kilometers."""
+
+KM_PER_DEGREE = radians(EARTH_RADIUS)
+"""float: The length of one degree of latitude, in kilometers."""
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """
+    Returns the great-circle distance between two points (haversine formula).
+
+    Args:
+        lat1 (float): The latitude of the first point, in degrees.
+        lon1 (float): The longitude of the first point, in degrees.
+        lat2 (float): The latitude of the second point, in degrees.
+        lon2 (float): The longitude of the second point, in degrees.
+
+    Returns:
+        float: The distance, in kilometers.
+    """
+    a = sin(radians(lat2 - lat1) / 2) ** 2 + \
+        cos(radians(lat1)) * cos(radians(lat2)) * sin(radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius):
+    """
+    Returns the smallest latitude/longitude box containing a circle.
+
+    The box may cross the antimeridian, in which case its west longitude is greater
+    than its east longitude. When the circle contains a pole, the box spans every
+    longitude.
+
+    Args:
+        latitude (float): The latitude of the center, in degrees.
+        longitude (float): The longitude of the center, in degrees.
+        radius (float): The radius, in kilometers.
+
+    Returns:
+        tuple: The (south, west, north, east) bounds, in degrees.
+    """
+    angle = radius / EARTH_RADIUS
+    south = latitude - degrees(angle)
+    north = latitude + degrees(angle)
+    if south <= -90 or north >= 90 or sin(angle) >= cos(radians(latitude)):
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    delta = degrees(asin(sin(angle) / cos(radians(latitude))))
+    west = (longitude - delta + 180) % 360 - 180
+    east = (longitude + delta + 180) % 360 - 180
+    return south, west, north, east
+
+
+def in_box(latitude, longitude, south, west, north, east):
+    """
+    Returns whether a point lies in a box, which may cross the antimeridian.
+
+    Args:
+        latitude (float): The latitude of the point.
+        longitude (float): The longitude of the point.
+        south (float): The southern bound.
+        west (float): The western bound.
+        north (float): The northern bound.
+        east (float): The eastern bound.
+
+    Returns:
+        bool: Whether the point is in the box, bounds included.
+    """
+    if not south <= latitude <= north:
+        return False
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+"""Module for the secondary indexes maintained by the storage engines."""
+
+import math
+from models.engine import geo
+
+
+class ForeignKeyIndex:
+    """
+    In-memory index mapping the value of one attribute to the keys of the objects
+    of one class holding that value, such as City.state_id or Review.place_id.
+
+    Attributes:
+        class_name (str): The name of the indexed class.
+        attribute (str): The name of the indexed attribute.
+    """
+
+    def __init__(self, class_name, attribute):
+        """
+        Initializes an empty index.
+
+        Args:
+            class_name (str): The name of the indexed class.
+            attribute (str): The name of the indexed attribute.
+        """
+        self.class_name = class_name
+        self.attribute = attribute
+        self.__keys = {}
+        self.__values = {}
+
+    def __len__(self):
+        """
+        Returns the number of indexed objects.
+        """
+        return len(self.__values)
+
+    def update(self, key, value):
+        """
+        Indexes an object under its current attribute value, replacing the value it
+        was previously indexed under.
+
+        Args:
+            key (str): The storage key of the object.
+            value: The value of the indexed attribute.
+        """
+        self.discard(key)
+        try:
+            self.__keys.setdefault(value, set()).add(key)
+        except TypeError:
+            return  # unhashable values can never match a lookup
+        self.__values[key] = value
+
+    def discard(self, key):
+        """
+        Removes an object from the index, if it is indexed.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        keys = self.__keys[value]
+        keys.discard(key)
+        if not keys:
+            del self.__keys[value]
+
+    def clear(self):
+        """
+        Removes every object from the index.
+        """
+        self.__keys = {}
+        self.__values = {}
+
+    def lookup(self, value):
+        """
+        Returns the keys of the objects whose attribute holds a value.
+
+        Args:
+            value: The value to look up.
+
+        Returns:
+            set: The matching storage keys.
+        """
+        return set(self.__keys.get(value, ()))
+
+
+class GridIndex:
+    """
+    In-memory spatial index over the coordinates of the objects of one class, such
+    as the latitude and longitude of Place. Points are bucketed in a grid of square
+    cells, so that a search only visits the cells overlapping the searched area.
+
+    Objects still at the class-level default coordinates, 0.0 and 0.0 for Place,
+    were never located, and are left out rather than found in the Gulf of Guinea.
+
+    Attributes:
+        class_name (str): The name of the indexed class.
+        cell (float): The size of the cells, in degrees.
+        default (tuple): The class-level default latitude and longitude, or None.
+    """
+
+    def __init__(self, class_name, cell=0.5, default=None):
+        """
+        Initializes an empty index.
+
+        Args:
+            class_name (str): The name of the indexed class.
+            cell (float): The size of the cells, in degrees.
+            default (tuple): The class-level default latitude and longitude, whose
+                objects are not indexed, or None to index every object.
+        """
+        self.class_name = class_name
+        self.cell = cell
+        self.default = default
+        self.__cells = {}
+        self.__points = {}
+
+    def __len__(self):
+        """
+        Returns the number of indexed objects.
+        """
+        return len(self.__points)
+
+    def _cell(self, latitude, longitude):
+        """
+        Returns the grid coordinates of the cell containing a point.
+        """
+        return int(math.floor(latitude / self.cell)), int(math.floor(longitude / self.cell))
+
+    def update(self, key, latitude, longitude):
+        """
+        Indexes an object at its current coordinates, replacing the ones it was
+        previously indexed at. Objects without numeric coordinates, or still at the
+        default ones, are not indexed.
+
+        Args:
+            key (str): The storage key of the object.
+            latitude (float): The latitude of the object, in degrees.
+            longitude (float): The longitude of the object, in degrees.
+        """
+        self.discard(key)
+        try:
+            point = (float(latitude), float(longitude))
+        except (TypeError, ValueError):
+            return
+        if not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180) or point == self.default:
+            return
+        self.__points[key] = point
+        self.__cells.setdefault(self._cell(*point), set()).add(key)
+
+    def discard(self, key):
+        """
+        Removes an object from the index, if it is indexed.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        point = self.__points.pop(key, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        keys = self.__cells[cell]
+        keys.discard(key)
+        if not keys:
+            del self.__cells[cell]
+
+    def clear(self):
+        """
+        Removes every object from the index.
+        """
+        self.__cells = {}
+        self.__points = {}
+
+    def within(self, south, west, north, east):
+        """
+        Returns the objects located in a latitude/longitude box.
+
+        Args:
+            south (float): The southern bound, in degrees.
+            west (float): The western bound; greater than east for a box crossing
+                the antimeridian.
+            north (float): The northern bound, in degrees.
+            east (float): The eastern bound, in degrees.
+
+        Returns:
+            dict: The storage keys of the matching objects and their (latitude,
+            longitude) coordinates.
+        """
+        if west > east:
+            found = self.within(south, west, north, 180.0)
+            found.update(self.within(south, -180.0, north, east))
+            return found
+        rows = range(self._cell(south, 0)[0], self._cell(north, 0)[0] + 1)
+        columns = range(self._cell(0, west)[1], self._cell(0, east)[1] + 1)
+        if len(rows) * len(columns) > len(self.__cells):
+            cells = [c for c in self.__cells if c[0] in rows and c[1] in columns]
+        else:
+            cells = [(r, c) for r in rows for c in columns if (r, c) in self.__cells]
+        found = {}
+        for cell in cells:
+            for key in self.__cells[cell]:
+                point = self.__points[key]
+                if geo.in_box(point[0], point[1], south, west, north, east):
+                    found[key] = point
+        return found
+
+    def within_radius(self, latitude, longitude, radius):
+        """
+        Returns the objects located within a distance of a point.
+
+        Args:
+            latitude (float): The latitude of the center, in degrees.
+            longitude (float): The longitude of the center, in degrees.
+            radius (float): The distance, in kilometers.
+
+        Returns:
+            list: Pairs of (distance in kilometers, storage key), nearest first.
+        """
+        found = []
+        for key, point in self.within(*geo.bounding_box(latitude, longitude, radius)).items():
+            km = geo.distance(latitude, longitude, point[0], point[1])
+            if km <= radius:
+                found.append((km, key))
+        found.sort()
+        return found
+
+    def nearest(self, latitude, longitude, count=1):
+        """
+        Returns the objects nearest to a point.
+
+        The search looks within a radius of one cell, doubled until it holds enough
+        objects: every object outside that radius is farther than the ones inside.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            count (int): The number of objects to return.
+
+        Returns:
+            list: Pairs of (distance in kilometers, storage key), nearest first.
+        """
+        radius = self.cell * geo.KM_PER_DEGREE
+        while True:
+            found = self.within_radius(latitude, longitude, radius)
+            if len(found) >= count or radius >= math.pi * geo.EARTH_RADIUS:
+                return found[:count]
+            radius *= 2
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""Module for the Journal class, an append-only log of storage changes."""
+
+import os
+
+
+class Journal:
+    """
+    Append-only log of changed records used by FileStorage in journal mode.
+
+    Each entry of the log holds the storage key and either the serialized record
+    or nothing when the object was destroyed (tombstone). Records are handed to
+    the journal already encoded, and entries are framed by the serializer of the
+    storage format, as JSON lines for the JSON format.
+
+    Attributes:
+        path (str): The file path of the log.
+        serializer (JSONSerializer or BinarySerializer): The storage format.
+        fsync (bool): Whether appends are forced to disk before returning.
+        torn (tuple): After replay(), the (valid, size) pair locating a torn last
+            entry, or None.
+    """
+
+    def __init__(self, path, serializer, fsync=False):
+        """
+        Initializes a journal stored at the given path.
+
+        Args:
+            path (str): The file path of the log.
+            serializer (JSONSerializer or BinarySerializer): The storage format.
+            fsync (bool): Whether appends are forced to disk before returning.
+        """
+        self.path = path
+        self.serializer = serializer
+        self.fsync = fsync
+        self.torn = None
+
+    def _open(self, mode):
+        """
+        Opens the log in text or binary mode, depending on the format.
+
+        Args:
+            mode (str): "r" or "a".
+
+        Returns:
+            file: The open log.
+        """
+        if self.serializer.binary:
+            return open(self.path, mode + "b")
+        return open(self.path, mode, encoding="utf-8")
+
+    def append(self, entries):
+        """
+        Appends entries to the end of the log.
+
+        Args:
+            entries (iterable): Pairs of (key, fragment), where fragment is the encoded
+                dictionary representation of the object or None for a tombstone.
+
+        Returns:
+            int: The number of entries written.
+        """
+        lines = [self.serializer.encode_entry(key, fragment) for key, fragment in entries]
+        if lines:
+            with self._open("a") as f:
+                f.write(lines[0][:0].join(lines))
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        return len(lines)
+
+    def replay(self):
+        """
+        Yields the entries of the log in the order they were written.
+
+        A torn last entry, left behind by a crash in the middle of an append,
+        is ignored. Readers only hold the file lock shared, so the log is not
+        cut here: once the entries are read, torn tells where the valid ones
+        end, and the next writer cuts the torn entry off with cut() before
+        appending, so that the entries appended later are not hidden behind it.
+        A corrupt entry followed by others is not a torn append: the log is
+        left as it is and an error is raised, rather than dropping the entries
+        after it.
+
+        Yields:
+            tuple: Pairs of (key, fragment), fragment being None for a tombstone.
+
+        Raises:
+            ValueError: If an entry before the last one is corrupt.
+        """
+        self.torn = None
+        if not os.path.isfile(self.path):
+            return
+        with self._open("r") as f:
+            valid = 0
+            try:
+                for entry in self.serializer.read_entries(f):
+                    valid = f.tell()
+                    yield entry
+            except ValueError as error:
+                raise ValueError("{}: {}; the journal was left untouched".format(
+                    self.path, error)) from None
+            size = os.fstat(f.fileno()).st_size
+        if size > valid:
+            self.torn = (valid, size)
+
+    def cut(self, torn):
+        """
+        Cuts off the torn last entry found by replay(). The log is left as it is
+        if its size changed since, another writer having cut it already. The file
+        lock of the storage must be held exclusively.
+
+        Args:
+            torn (tuple): The (valid, size) pair of torn: where the valid entries
+                end, and the size of the log when it was replayed.
+        """
+        valid, size = torn
+        if os.path.isfile(self.path) and os.path.getsize(self.path) == size:
+            os.truncate(self.path, valid)
+
+    def truncate(self):
+        """
+        Removes every entry from the log.
+        """
+        if os.path.isfile(self.path):
+            os.remove(self.path)
@@ -0,0 +1,367 @@
+#!/usr/bin/python3
+"""
+Module for the locks that let several threads and several processes share the
+storage: a reader-writer lock between the threads of a process, and an advisory
+file lock between processes.
+
+File locking relies on fcntl.flock(); where fcntl is not available, such as on
+Windows, file locks are no-ops and only the threads of one process are
+synchronized.
+"""
+
+import contextlib
+import functools
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+GENERATION = struct.Struct("<Q")
+"""struct.Struct: The layout of the generation counter kept in a lock file."""
+
+
+class _Held(threading.local):
+    """
+    How many times the current thread entered each side of an RWLock.
+    """
+
+    reads = 0
+    writes = 0
+
+
+class RWLock:
+    """
+    Reader-writer lock: any number of threads may hold the read side at once, but
+    the write side is held by a single thread, while no thread reads.
+
+    Both sides are reentrant, and the thread holding the write side may also take
+    the read side. A thread holding only the read side cannot take the write side,
+    since two threads doing so would wait for each other forever. Waiting writers
+    go before new readers, so that a steady flow of readers does not starve them.
+    """
+
+    def __init__(self):
+        """
+        Initializes an unlocked lock.
+        """
+        self.__mutex = threading.Lock()
+        self.__condition = threading.Condition(self.__mutex)
+        self.__held = _Held()
+        self.__readers = 0
+        self.__writing = False
+        self.__waiting = 0
+        self.__sleeping = 0
+
+    def held(self):
+        """
+        Returns whether the current thread holds either side of the lock.
+
+        Returns:
+            bool: Whether the lock is held by the current thread.
+        """
+        return bool(self.__held.reads or self.__held.writes)
+
+    def acquire_read(self):
+        """
+        Takes the read side of the lock, waiting for the writer, and the waiting
+        writers, to be done.
+        """
+        held = self.__held
+        if held.reads or held.writes:
+            held.reads += 1
+            return
+        with self.__mutex:
+            while self.__writing or self.__waiting:
+                self._wait()
+            self.__readers += 1
+        held.reads = 1
+
+    def release_read(self):
+        """
+        Releases the read side of the lock.
+        """
+        held = self.__held
+        held.reads -= 1
+        if held.reads or held.writes:
+            return
+        with self.__mutex:
+            self.__readers -= 1
+            if self.__sleeping:
+                self.__condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Takes the write side of the lock, waiting for the readers and the writer to
+        be done.
+
+        Raises:
+            RuntimeError: If the current thread holds the read side but not the write side.
+        """
+        held = self.__held
+        if held.writes:
+            held.writes += 1
+            return
+        if held.reads:
+            raise RuntimeError("cannot take the write lock while holding the read lock")
+        with self.__mutex:
+            self.__waiting += 1
+            try:
+                while self.__writing or self.__readers:
+                    self._wait()
+            finally:
+                self.__waiting -= 1
+            self.__writing = True
+        held.writes = 1
+
+    def release_write(self):
+        """
+        Releases the write side of the lock.
+        """
+        held = self.__held
+        held.writes -= 1
+        if held.writes:
+            return
+        with self.__mutex:
+            self.__writing = False
+            if self.__sleeping:
+                self.__condition.notify_all()
+
+    def _wait(self):
+        """
+        Waits until another thread releases the lock; the mutex must be held.
+        """
+        self.__sleeping += 1
+        try:
+            self.__condition.wait()
+        finally:
+            self.__sleeping -= 1
+
+    @contextlib.contextmanager
+    def read(self):
+        """
+        Holds the read side of the lock for the duration of a with block.
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        """
+        Holds the write side of the lock for the duration of a with block.
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class FileLock:
+    """
+    Advisory lock on a file, shared by the readers of the storage and exclusive for
+    its writers, across processes. It is reentrant within a process.
+
+    The lock file also holds a generation counter, which writers increment, so that
+    a process can tell whether another one changed the storage since it last read it,
+    even when the files kept the same size and modification time. For both reasons
+    the lock file is never removed: another process may still be locking it, and the
+    counter must outlive the processes.
+
+    Attributes:
+        path (str): The file path of the lock file.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes the lock of a file, which is created on first use.
+
+        Args:
+            path (str): The file path of the lock file.
+        """
+        self.path = path
+        self.__fd = None
+        self.__depth = 0
+        self.__exclusive = False
+        self.__mutex = threading.Lock()
+
+    def _fd(self):
+        """
+        Returns the descriptor of the lock file, opening it if needed.
+
+        Returns:
+            int: The file descriptor.
+        """
+        if self.__fd is None:
+            self.__fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self.__fd
+
+    def close(self):
+        """
+        Closes the lock file, which must not be locked.
+        """
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
+
+    def _acquire(self, exclusive, blocking=True):
+        """
+        Takes the lock, or enters it again if this process already holds it.
+
+        Args:
+            exclusive (bool): Whether to take it exclusively.
+            blocking (bool): Whether to wait while another process holds it.
+
+        Returns:
+            bool: Whether the lock was taken, False only when blocking is False and
+            another process holds it.
+
+        Raises:
+            RuntimeError: If the lock is held shared and is requested exclusively.
+        """
+        with self.__mutex:
+            if self.__depth:
+                if exclusive and not self.__exclusive:
+                    raise RuntimeError("cannot upgrade a shared file lock")
+                self.__depth += 1
+                return True
+            if fcntl is not None:
+                operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                try:
+                    fcntl.flock(self._fd(), operation if blocking else operation | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            self.__depth = 1
+            self.__exclusive = exclusive
+            return True
+
+    def _release(self):
+        """
+        Leaves the lock, releasing it when it was entered for the last time.
+        """
+        with self.__mutex:
+            self.__depth -= 1
+            if not self.__depth and fcntl is not None:
+                fcntl.flock(self._fd(), fcntl.LOCK_UN)
+
+    def acquire(self, exclusive=False, blocking=True):
+        """
+        Takes the lock until release() is called, for locks held longer than a with
+        block.
+
+        Args:
+            exclusive (bool): Whether to take it exclusively.
+            blocking (bool): Whether to wait while another process holds it.
+
+        Returns:
+            bool: Whether the lock was taken, False only when blocking is False and
+            another process holds it.
+        """
+        return self._acquire(exclusive, blocking)
+
+    def release(self):
+        """
+        Leaves the lock taken by acquire().
+        """
+        self._release()
+
+    @contextlib.contextmanager
+    def shared(self):
+        """
+        Holds the lock shared for the duration of a with block.
+        """
+        self._acquire(False)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        """
+        Holds the lock exclusively for the duration of a with block.
+        """
+        self._acquire(True)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def generation(self):
+        """
+        Returns the generation counter of the lock file.
+
+        Returns:
+            int: The counter, 0 if it was never incremented.
+        """
+        if self.__fd is None and not os.path.isfile(self.path):
+            return 0
+        with self.__mutex:
+            os.lseek(self._fd(), 0, os.SEEK_SET)
+            data = os.read(self._fd(), GENERATION.size)
+        return GENERATION.unpack(data)[0] if len(data) == GENERATION.size else 0
+
+    def increment(self):
+        """
+        Increments the generation counter; the lock must be held exclusively.
+
+        Returns:
+            int: The new counter.
+        """
+        generation = self.generation() + 1
+        with self.__mutex:
+            os.lseek(self._fd(), 0, os.SEEK_SET)
+            os.write(self._fd(), GENERATION.pack(generation))
+        return generation
+
+
+def read_locked(method):
+    """
+    Decorates a storage method to run under the read side of the storage's RWLock,
+    its _lock attribute. The storage's _refresh() method is called first, outside
+    of the lock, so that it may take the write side to pick up external changes.
+
+    Args:
+        method (callable): The method.
+
+    Returns:
+        callable: The decorated method.
+    """
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        self._refresh()
+        lock = self._lock
+        lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_read()
+    return locked
+
+
+def write_locked(method):
+    """
+    Decorates a storage method to run under the write side of the storage's RWLock,
+    its _lock attribute.
+
+    Args:
+        method (callable): The method.
+
+    Returns:
+        callable: The decorated method.
+    """
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        lock = self._lock
+        lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_write()
+    return locked
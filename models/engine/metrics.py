@@ -0,0 +1,296 @@
+#!/usr/bin/python3
+"""
+Module for the instrumentation of the storage and the console: counters, and
+latency histograms of the storage methods and console commands, kept in the
+process-wide registry METRICS, plus an optional cProfile hook.
+
+Recording a latency costs two clock reads and a few additions, so the
+instrumentation is on by default; HBNB_METRICS=0 turns it off. Counts may be
+slightly off under concurrent reads, since the readers update them without a
+lock.
+"""
+
+import atexit
+import cProfile
+import functools
+import io
+import pstats
+import time
+
+BUCKETS = 40
+"""int: The number of buckets of a histogram; bucket i counts the latencies from
+2 ** (i - 1) to 2 ** i microseconds, of 1024 nanoseconds, the last one every
+longer latency."""
+
+
+class Histogram:
+    """
+    Distribution of the latencies of one operation, in buckets growing by powers of
+    two, so that recording a latency takes constant time and memory. Latencies are
+    kept in integer nanoseconds, which are cheaper to add up than floats.
+
+    Attributes:
+        count (int): The number of latencies recorded.
+        total (int): Their sum, in nanoseconds.
+        max (int): The longest latency, in nanoseconds.
+        buckets (list): The number of latencies in each bucket, see BUCKETS.
+    """
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        """
+        Initializes an empty histogram.
+        """
+        self.clear()
+
+    def clear(self):
+        """
+        Forgets every latency recorded.
+        """
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * BUCKETS
+
+    def record(self, nanoseconds):
+        """
+        Records a latency.
+
+        Args:
+            nanoseconds (int): The latency, in nanoseconds.
+        """
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+        bucket = (nanoseconds >> 10).bit_length()
+        self.buckets[bucket if bucket < BUCKETS else BUCKETS - 1] += 1
+
+    def percentile(self, fraction):
+        """
+        Returns an upper bound of a percentile of the latencies: the upper edge of
+        the bucket holding it, or the longest latency if it is shorter.
+
+        Args:
+            fraction (float): The percentile, between 0 and 1, such as 0.99.
+
+        Returns:
+            int: The latency, in nanoseconds, 0 if none was recorded.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** i << 10, self.max)
+        return self.max
+
+
+class Metrics:
+    """
+    Registry of the counters and latency histograms, by name, such as
+    "storage.get" or "console.update".
+
+    Attributes:
+        enabled (bool): Whether latencies and counters are recorded.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Initializes an empty registry.
+
+        Args:
+            enabled (bool): Whether latencies and counters are recorded.
+        """
+        self.enabled = enabled
+        self.__histograms = {}
+        self.__counters = {}
+        self.__profiler = None
+
+    def histogram(self, name):
+        """
+        Returns the latency histogram of an operation, creating it if needed.
+
+        Args:
+            name (str): The name of the operation.
+
+        Returns:
+            Histogram: The histogram.
+        """
+        histogram = self.__histograms.get(name)
+        if histogram is None:
+            histogram = self.__histograms.setdefault(name, Histogram())
+        return histogram
+
+    def record(self, name, nanoseconds):
+        """
+        Records the latency of an operation.
+
+        Args:
+            name (str): The name of the operation.
+            nanoseconds (int): The latency, in nanoseconds.
+        """
+        if self.enabled:
+            self.histogram(name).record(nanoseconds)
+
+    def increment(self, name, amount=1):
+        """
+        Adds to a counter, such as a number of bytes written.
+
+        Args:
+            name (str): The name of the counter.
+            amount (int): The amount to add.
+        """
+        if self.enabled:
+            self.__counters[name] = self.__counters.get(name, 0) + amount
+
+    def timed(self, name):
+        """
+        Decorates a function to record the latency of its calls.
+
+        Args:
+            name (str): The name of the operation.
+
+        Returns:
+            callable: The decorator.
+        """
+        histogram = self.histogram(name)
+        clock = time.perf_counter_ns
+
+        def decorate(func):
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = clock()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    histogram.record(clock() - start)
+            return timed
+        return decorate
+
+    def histograms(self):
+        """
+        Returns the latency histograms of the operations called at least once.
+
+        Returns:
+            dict: The histogram of each operation, by name, sorted by name.
+        """
+        return {k: v for k, v in sorted(self.__histograms.items()) if v.count}
+
+    def counters(self):
+        """
+        Returns the counters.
+
+        Returns:
+            dict: The value of each counter, by name, sorted by name.
+        """
+        return dict(sorted(self.__counters.items()))
+
+    def reset(self):
+        """
+        Clears every counter and histogram, and the statistics of the profiler.
+        """
+        for histogram in self.__histograms.values():
+            histogram.clear()
+        self.__counters = {}
+        if self.__profiler is not None:
+            self.__profiler.disable()
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+
+    def start_profiler(self, path=None):
+        """
+        Starts profiling the process with cProfile, until it exits.
+
+        Args:
+            path (str): The file the statistics are written to at exit, for pstats or
+                snakeviz; None to keep them in memory only, see profile().
+        """
+        if self.__profiler is not None:
+            return
+        self.__profiler = cProfile.Profile()
+        self.__profiler.enable()
+        if path:
+            atexit.register(self._dump_profile, path)
+
+    def _dump_profile(self, path):
+        """
+        Writes the statistics of the profiler to a file.
+
+        Args:
+            path (str): The file path.
+        """
+        self.__profiler.disable()
+        self.__profiler.dump_stats(path)
+
+    def profile(self, limit=20, sort="cumulative"):
+        """
+        Returns the functions that took the most time since the profiler started.
+
+        Args:
+            limit (int): The number of functions listed.
+            sort (str): The pstats sort key, such as "cumulative" or "tottime".
+
+        Returns:
+            str: The pstats report, or None if the profiler is not running.
+        """
+        if self.__profiler is None:
+            return None
+        stream = io.StringIO()
+        self.__profiler.disable()
+        try:
+            pstats.Stats(self.__profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        finally:
+            self.__profiler.enable()
+        return stream.getvalue()
+
+    def report(self, prefix=""):
+        """
+        Returns a table of the latencies and counters.
+
+        Args:
+            prefix (str): Only list the names starting with it, such as "storage.".
+
+        Returns:
+            list: The lines of the table.
+        """
+        lines = ["{:<28} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "operation", "calls", "total ms", "mean us", "p50 us", "p99 us", "max us")]
+        for name, h in self.histograms().items():
+            if name.startswith(prefix):
+                lines.append("{:<28} {:>8} {:>10.3f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                    name, h.count, h.total / 1e6, h.total / h.count / 1e3,
+                    h.percentile(0.5) / 1e3, h.percentile(0.99) / 1e3, h.max / 1e3))
+        counters = [(k, v) for k, v in self.counters().items() if k.startswith(prefix)]
+        if counters:
+            lines.append("")
+            lines.extend("{:<28} {:>8}".format(name, value) for name, value in counters)
+        return lines
+
+
+METRICS = Metrics()
+"""Metrics: The registry of the process."""
+
+timed = METRICS.timed
+increment = METRICS.increment
+
+
+def configure(enabled=None, profile=None):
+    """
+    Configures the instrumentation of the process.
+
+    Args:
+        enabled (bool or str): Whether latencies and counters are recorded. Strings
+            such as "0" or "false" are accepted.
+        profile (str): Starts cProfile when set: the file its statistics are written
+            to at exit, or "1" to keep them in memory for the profile command.
+    """
+    if enabled is not None:
+        if isinstance(enabled, str):
+            enabled = enabled.lower() not in ("0", "false", "no", "off")
+        METRICS.enabled = enabled
+    if profile:
+        METRICS.start_profiler(None if profile == "1" else profile)
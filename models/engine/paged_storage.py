@@ -0,0 +1,954 @@
+#!/usr/bin/python3
+"""Module for the PagedStorage class."""
+
+import atexit
+import contextlib
+import os
+import time
+import weakref
+from models.engine.analytics import ColumnStore
+from models.engine.cache import ObjectCache, parse_size
+from models.engine.indexes import GridIndex
+from models.engine.locking import FileLock
+from models.engine import metrics
+from models.engine import query
+from models.engine import registry
+from models.engine.search import FIELDS, TextIndex
+from models.engine.serializers import BinarySerializer, get_serializer
+
+MAGIC = b"HBNBPAGE\x01"
+"""bytes: The start of a data file, followed by the code of its format, see FORMATS."""
+
+FORMATS = ("json", "binary")
+"""tuple: The formats of the fragments, by code."""
+
+FRAME = BinarySerializer.FRAME
+"""struct.Struct: The header of a frame: the length of the key and of the fragment."""
+
+CACHE_SIZE = 10000
+"""int: The default maximum number of cached instances."""
+
+COMPACT_RATIO = 0.5
+"""float: The default share of replaced frames in the data file above which saves
+compact it."""
+
+COMPACT_MINIMUM = 1 << 20
+"""int: The number of bytes of replaced frames below which saves do not compact the
+data file, whatever their share."""
+
+
+class PagedStorage:
+    """
+    Class for storing objects in a data file read on demand, with a bounded cache of
+    instances in front of it, for object graphs that do not fit in memory.
+
+    The data file is authoritative. It is an append-only log of frames, laid out
+    like the journal entries of the binary format: the length of the key and of the
+    fragment, then both, an empty fragment being a tombstone. The fragments are
+    encoded in the configured format, see models.engine.serializers. An index kept
+    in memory maps the key of every stored object to the offset and length of its
+    latest fragment, so that an object is read with a single positioned read; it is
+    rebuilt by reload(), which only reads the frame headers and the keys.
+
+    Instances are kept in an ObjectCache, bounded by a number of objects and by an
+    estimate of their memory, the least recently used evicted first. While an instance
+    is cached, looking its object up returns it, and changing its attributes marks it
+    dirty, like in FileStorage. An evicted instance still referenced elsewhere stays
+    the instance of its object: looking the object up returns it rather than reading
+    a second copy, and changing it puts it back in the cache, marked dirty. Evicting a dirty instance writes it back: its fragment
+    is appended to the data file before it is dropped, so a change is never lost,
+    but it may reach the file before the next save. Saves append the fragments of the
+    dirty instances and a tombstone for each object deleted; once the fragments they
+    replaced take more than __compact_ratio of the file, the live ones are copied
+    into a new file, see compact().
+
+    all(), find(), query() and the other searches read the objects they scan one at
+    a time, instantiating only the ones they return; all() and query() instantiate
+    every object of a class, of which the cache keeps the most recent ones. The
+    spatial, columnar and full-text indexes of the searches are built from the data
+    file and kept until an object changes.
+
+    Like DBStorage, the storage must not be called by several threads at once. Only
+    one process may open a data file, since the index of another process would miss
+    the frames it appends: reload() takes an exclusive lock on the file next to it,
+    __path + ".lock", until close(), and fails if another process holds it.
+
+    Attributes:
+        __path (str): The path of the data file.
+        __fd (int): The file descriptor of the data file, or None until reload().
+        __lock (FileLock): The lock on the data file, held from reload() to close().
+        __serializer (JSONSerializer or BinarySerializer): The format of the data file.
+        __format (str): The configured format, "json" or "binary"; compact() converts
+            a data file of another format.
+        __index (dict): The offset and length of the latest fragment of every stored
+            object, as {class name: {key: (offset, length)}}; None for an object only
+            cached so far.
+        __cache (ObjectCache): The cached instances.
+        __instances (WeakValueDictionary): The instances handed out, cached or not, so
+            that an object has a single instance as long as it is referenced.
+        __dirty (set): Keys of the cached instances created or modified since they
+            were last written.
+        __deleted (set): Keys of the objects deleted since the last write, whose
+            tombstone is not written yet.
+        __garbage (int): The number of bytes of the frames replaced in the data file.
+        __write_backs (int): The number of dirty instances written back on eviction.
+        __compact_ratio (float): The share of replaced frames above which saves compact
+            the data file.
+        __version (int): Incremented whenever an object changes, so that the indexes
+            of the searches are rebuilt.
+        __derived (dict): The indexes of the searches, as {(kind, class name): (version,
+            index)}.
+        __durability (str): "none" or "flush" write the frames with os.write(), "fsync"
+            also forces them to disk on every save.
+        __commit_size (int): In group commit mode, the number of saves coalesced
+            into one write; 0 disables the limit.
+        __commit_interval (float): In group commit mode, the number of seconds after
+            which a save is written; 0 disables the limit.
+        __deferred (int): Number of saves requested since the last write.
+        __last_commit (float): time.monotonic() of the last write.
+        __batch_depth (int): Number of batch() blocks being executed.
+        __exit_flush (bool): Whether flush() was registered to run when the
+            interpreter exits, which happens when group commit is first enabled.
+    """
+
+    def __init__(self, path="hbnb.pages"):
+        """
+        Initializes a storage over the data file at the given path, which is opened
+        by reload().
+
+        Args:
+            path (str): The path of the data file.
+        """
+        self.__path = path
+        self.__fd = None
+        self.__lock = None
+        self.__format = "json"
+        self.__serializer = get_serializer("json")
+        self.__index = {}
+        self.__cache = ObjectCache(CACHE_SIZE, 0, self._write_back, "storage.cache")
+        self.__instances = weakref.WeakValueDictionary()
+        self.__dirty = set()
+        self.__deleted = set()
+        self.__garbage = 0
+        self.__write_backs = 0
+        self.__compact_ratio = COMPACT_RATIO
+        self.__version = 0
+        self.__derived = {}
+        self.__durability = "flush"
+        self.__commit_size = 0
+        self.__commit_interval = 0.0
+        self.__deferred = 0
+        self.__last_commit = 0.0
+        self.__batch_depth = 0
+        self.__exit_flush = False
+
+    def configure(self, format=None, durability=None, commit_size=None, commit_interval=None,
+                  cache_size=None, cache_memory=None, compact_ratio=None):
+        """
+        Changes the format of the data file, how hard saves try to survive a crash, and
+        the limits of the cache.
+
+        Args:
+            format (str): The format of the fragments, "json" or "binary". A data file
+                of another format is converted on the next save.
+            durability (str): "none", "flush" or "fsync", see __durability.
+            commit_size (int): Enables group commit: saves are only written once this
+                many of them were requested. 0 disables it.
+            commit_interval (float): Enables group commit: saves are only written once
+                this many seconds passed since the last write. 0 disables it. As the
+                storage must not be called concurrently, there is no timer: the last
+                saves of a burst wait for the next save, flush() or the exit.
+            cache_size (int or str): The maximum number of cached instances, 0 for no
+                limit.
+            cache_memory (int or str): The maximum estimated memory of the cached
+                instances, in bytes or with a k, m or g suffix such as "64m"; 0 for no
+                limit.
+            compact_ratio (float): The share of replaced frames in the data file above
+                which saves compact it.
+        """
+        if format is not None:
+            get_serializer(format)
+            self.__format = format
+        if durability is not None:
+            if durability not in ("none", "flush", "fsync"):
+                raise ValueError("unknown durability level: {}".format(durability))
+            self.__durability = durability
+        if commit_size is not None:
+            self.__commit_size = int(commit_size)
+        if commit_interval is not None:
+            self.__commit_interval = float(commit_interval)
+        if (self.__commit_size or self.__commit_interval) and not self.__exit_flush:
+            # Saves deferred by group commit must not be lost on exit
+            atexit.register(self.flush)
+            self.__exit_flush = True
+        if compact_ratio is not None:
+            self.__compact_ratio = float(compact_ratio)
+        if cache_size is not None or cache_memory is not None:
+            self.__cache.resize(None if cache_size is None else parse_size(cache_size),
+                                None if cache_memory is None else parse_size(cache_memory))
+
+    def close(self):
+        """
+        Writes the pending saves, closes the data file and releases its lock.
+        """
+        self.flush()
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
+        if self.__lock is not None:
+            self.__lock.release()
+            self.__lock.close()
+            self.__lock = None
+
+    def reload(self):
+        """
+        Discards the changes that were neither saved nor written back, empties the
+        cache and rebuilds the index from the data file, creating the file if needed.
+        A torn last frame, left behind by a crash in the middle of a write, is cut off.
+
+        Raises:
+            RuntimeError: If another process opened the data file.
+        """
+        if self.__lock is None:
+            lock = FileLock(self.__path + ".lock")
+            if not lock.acquire(exclusive=True, blocking=False):
+                lock.close()
+                raise RuntimeError("{} is open in another process".format(self.__path))
+            self.__lock = lock
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
+        self.__cache.clear()
+        self.__instances = weakref.WeakValueDictionary()
+        self.__dirty = set()
+        self.__deleted = set()
+        self.__deferred = 0
+        self.__version += 1
+        self.__derived = {}
+        self._scan()
+        self.__fd = os.open(self.__path, os.O_RDWR | os.O_APPEND | getattr(os, "O_BINARY", 0))
+
+    @metrics.timed("storage.scan")
+    def _scan(self):
+        """
+        Reads the frame headers and keys of the data file into the index, skipping
+        the fragments, or writes the header of a new data file.
+        """
+        index, garbage = {}, 0
+        if not os.path.isfile(self.__path) or not os.path.getsize(self.__path):
+            with open(self.__path, "wb") as f:
+                f.write(MAGIC + bytes((FORMATS.index(self.__format),)))
+            self.__serializer = get_serializer(self.__format)
+            self.__index, self.__garbage = index, garbage
+            return
+        with open(self.__path, "rb") as f:
+            header = f.read(len(MAGIC) + 1)
+            if header[:len(MAGIC)] != MAGIC or len(header) <= len(MAGIC) or header[-1] >= len(FORMATS):
+                raise ValueError("{} is not a data file".format(self.__path))
+            self.__serializer = get_serializer(FORMATS[header[-1]])
+            end = os.fstat(f.fileno()).st_size
+            position = len(header)
+            while True:
+                head = f.read(FRAME.size)
+                if len(head) < FRAME.size:
+                    break
+                key_size, size = FRAME.unpack(head)
+                offset = position + FRAME.size + key_size
+                if offset + size > end:
+                    break
+                key = f.read(key_size).decode("utf-8")
+                f.seek(size, os.SEEK_CUR)
+                keys = index.setdefault(key.split(".", 1)[0], {})
+                previous = keys.pop(key, None)
+                if previous is not None:
+                    garbage += self._frame_size(key, previous)
+                if size:
+                    keys[key] = (offset, size)
+                else:
+                    garbage += offset + size - position
+                position = offset + size
+        metrics.increment("storage.bytes_read", position)
+        if position < end:
+            os.truncate(self.__path, position)
+        self.__index, self.__garbage = index, garbage
+
+    @staticmethod
+    def _frame_size(key, extent):
+        """
+        Returns the size of the frame holding a fragment.
+
+        Args:
+            key (str): The key of the object.
+            extent (tuple): The offset and length of the fragment.
+
+        Returns:
+            int: The size of the frame, in bytes.
+        """
+        return FRAME.size + len(key.encode("utf-8")) + extent[1]
+
+    def _read(self, extent):
+        """
+        Reads a fragment from the data file.
+
+        Args:
+            extent (tuple): The offset and length of the fragment.
+
+        Returns:
+            bytes: The fragment, as stored.
+        """
+        offset, size = extent
+        if hasattr(os, "pread"):
+            data = os.pread(self.__fd, size, offset)
+        else:
+            os.lseek(self.__fd, offset, os.SEEK_SET)
+            data = os.read(self.__fd, size)
+        metrics.increment("storage.bytes_read", size)
+        return data
+
+    @staticmethod
+    def _decode(serializer, data):
+        """
+        Decodes a fragment read from a data file.
+
+        Args:
+            serializer (JSONSerializer or BinarySerializer): The format of the fragment.
+            data (bytes): The fragment.
+
+        Returns:
+            dict: The dictionary representation of the object.
+        """
+        return serializer.decode(data if serializer.binary else data.decode("utf-8"))
+
+    @staticmethod
+    def _encode(serializer, record):
+        """
+        Encodes the dictionary representation of an object for a data file.
+
+        Args:
+            serializer (JSONSerializer or BinarySerializer): The format of the fragment.
+            record (dict): The dictionary representation.
+
+        Returns:
+            bytes: The fragment.
+        """
+        metrics.increment("storage.encoded")
+        fragment = serializer.encode(record)
+        return fragment if serializer.binary else fragment.encode("utf-8")
+
+    def _append(self, entries):
+        """
+        Appends frames to the data file and points the index to their fragments.
+
+        Args:
+            entries (list): Pairs of (key, fragment), fragment being None for a tombstone.
+        """
+        if not entries:
+            return
+        position = os.lseek(self.__fd, 0, os.SEEK_END)
+        frames = []
+        for key, fragment in entries:
+            encoded = key.encode("utf-8")
+            fragment = fragment or b""
+            frames.append(FRAME.pack(len(encoded), len(fragment)) + encoded + fragment)
+            offset = position + FRAME.size + len(encoded)
+            if fragment:
+                keys = self.__index.setdefault(key.split(".", 1)[0], {})
+                previous = keys.get(key)
+                if previous is not None:
+                    self.__garbage += self._frame_size(key, previous)
+                keys[key] = (offset, len(fragment))
+            else:
+                self.__garbage += offset - position
+            position = offset + len(fragment)
+        data = memoryview(b"".join(frames))
+        metrics.increment("storage.bytes_written", len(data))
+        while data:
+            data = data[os.write(self.__fd, data):]
+
+    def _write_back(self, key, obj):
+        """
+        Appends the fragment of an instance evicted from the cache if it changed since
+        it was last written; called by the cache before the eviction.
+
+        Args:
+            key (str): The key of the object.
+            obj (BaseModel): The evicted instance.
+        """
+        if key in self.__dirty:
+            self._append([(key, self._encode(self.__serializer, obj.to_dict()))])
+            self.__dirty.discard(key)
+            self.__write_backs += 1
+            metrics.increment("storage.cache.write_backs")
+
+    def _object(self, name, key):
+        """
+        Returns the instance of a stored object, from the cache, among the evicted
+        instances still referenced, or read from the data file, and caches it.
+
+        Args:
+            name (str): The class name.
+            key (str): The key of the object, which must be in the index.
+
+        Returns:
+            BaseModel: The instance.
+        """
+        obj = self.__cache.get(key)
+        if obj is None:
+            obj = self.__instances.get(key)
+            if obj is None:
+                record = self._decode(self.__serializer, self._read(self.__index[name][key]))
+                obj = self.classes()[record["__class__"]](**record)
+                metrics.increment("storage.decoded")
+                self.__instances[key] = obj
+            self.__cache.put(key, obj)
+        return obj
+
+    def _objects(self, name):
+        """
+        Yields the stored objects of a class, one at a time.
+
+        Args:
+            name (str): The class name.
+
+        Yields:
+            BaseModel: The instances.
+        """
+        keys = self.__index.get(name, {})
+        for key in list(keys):
+            if key in keys:
+                yield self._object(name, key)
+
+    def _values(self, name, attributes):
+        """
+        Yields attributes of the stored objects of a class, taken from the cached
+        instances, or decoded from the data file without instantiating the others.
+
+        Args:
+            name (str): The class name.
+            attributes (list): The attribute names.
+
+        Yields:
+            tuple: The key of each object and the list of its values, the class default
+            for the attributes an object does not set.
+        """
+        keys = self.__index.get(name, {})
+        defaults = [getattr(self.classes().get(name), a, None) for a in attributes]
+        for key in list(keys):
+            obj = self.__cache.peek(key)
+            if obj is not None:
+                yield key, [getattr(obj, a, None) for a in attributes]
+                continue
+            extent = keys.get(key)
+            if extent is not None:
+                record = self._decode(self.__serializer, self._read(extent))
+                yield key, [record.get(a, d) for a, d in zip(attributes, defaults)]
+
+    def _derive(self, kind, name, build):
+        """
+        Returns an index of the searches, building it if an object changed since.
+
+        Args:
+            kind (str): The kind of index, such as "spatial".
+            name (str): The class name, or None for an index over several classes.
+            build (callable): Builds the index, called with the class name.
+
+        Returns:
+            The index.
+        """
+        derived = self.__derived.get((kind, name))
+        if derived is None or derived[0] != self.__version:
+            derived = self.__derived[(kind, name)] = (self.__version, build(name))
+        return derived[1]
+
+    def _changed(self):
+        """
+        Records that an object changed, so that the indexes of the searches are rebuilt.
+        """
+        self.__version += 1
+        if self.__derived:
+            self.__derived = {}
+
+    @metrics.timed("storage.all")
+    def all(self, cls=None):
+        """
+        Returns the stored objects, or only those of one class.
+
+        Args:
+            cls (type or str): The class, or class name, to restrict the result to.
+
+        Returns:
+            dict: The objects, keyed by their class name and ID.
+        """
+        if cls is None:
+            names = list(self.__index)
+        else:
+            names = [cls if isinstance(cls, str) else cls.__name__]
+        result = {}
+        for name in names:
+            for obj in self._objects(name):
+                result["{}.{}".format(name, obj.id)] = obj
+        return result
+
+    @metrics.timed("storage.count")
+    def count(self, cls=None):
+        """
+        Returns the number of stored objects, or of the objects of one class.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to count.
+
+        Returns:
+            int: The number of objects.
+        """
+        if cls is None:
+            return sum(map(len, self.__index.values()))
+        return len(self.__index.get(cls if isinstance(cls, str) else cls.__name__, ()))
+
+    @metrics.timed("storage.get")
+    def get(self, cls, id):
+        """
+        Returns one stored object.
+
+        Args:
+            cls (type or str): The class, or class name, of the object.
+            id (str): The id of the object.
+
+        Returns:
+            BaseModel: The object, or None if it is not stored.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        key = "{}.{}".format(name, id)
+        if key not in self.__index.get(name, ()):
+            return None
+        return self._object(name, key)
+
+    @metrics.timed("storage.find")
+    def find(self, cls, **criteria):
+        """
+        Returns the objects of a class whose attributes equal the given values, such as
+        find(Place, city_id=...) for the places of a city. The criteria are compared
+        with the decoded fragments, and only the matching objects are instantiated.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to find.
+            **criteria: Attribute names and the values they must equal.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        expected = list(criteria.values())
+        matches = [key for key, values in self._values(name, list(criteria)) if values == expected]
+        return {key: self._object(name, key) for key in matches if key in self.__index[name]}
+
+    @metrics.timed("storage.query")
+    def query(self, cls, where=(), order_by=None, limit=None, offset=0, fields=None):
+        """
+        Returns the objects of a class matching predicates such as price_by_night < 100,
+        ordered and paginated, see models.engine.query. Equality predicates on foreign
+        keys are evaluated first, by find(); the other predicates are evaluated on the
+        instances, one at a time.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects to return.
+            where (iterable): The query.Predicate every result must match.
+            order_by (str): The attribute to order by, prefixed with '-' for a descending order.
+            limit (int): The maximum number of results.
+            offset (int): The number of results to skip.
+            fields (list): The attributes to return instead of the objects.
+
+        Returns:
+            list: The matching objects, or dictionaries of their selected attributes.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        where = list(where)
+        indexed = {p.attribute: p.value for p in where if p.equality and p.attribute.endswith("_id")}
+        candidates = self.find(name, **indexed).values() if indexed else self._objects(name)
+        return query.run(candidates, where, order_by, limit, offset, fields)
+
+    def _build_columns(self, name):
+        """
+        Creates the columns of the numeric attributes and foreign keys of a class, see
+        FileStorage.aggregate(), filled from the data file.
+
+        Args:
+            name (str): The class name.
+
+        Returns:
+            ColumnStore: The columns.
+        """
+        attributes = self.attributes().get(name, {})
+        store = ColumnStore(name, [a for a, kind in attributes.items() if kind in (int, float)],
+                            [a for a in attributes if a.endswith("_id")])
+        if store.columns:
+            rows = list(self._values(name, store.columns))
+            store.extend([key for key, _ in rows],
+                         {c: [values[i] for _, values in rows] for i, c in enumerate(store.columns)})
+        return store
+
+    @metrics.timed("storage.aggregate")
+    def aggregate(self, cls, column=None, by=None):
+        """
+        Returns the count, sum, mean, minimum and maximum of a numeric attribute of the
+        objects of a class, or only the number of objects without an attribute, like
+        FileStorage.aggregate(), over columns read from the data file.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            column (str): The numeric attribute to aggregate, or None to count objects.
+            by (str): The foreign key to group by, or None for a single group.
+
+        Returns:
+            dict: The aggregates of each group, as {foreign key value: {aggregate: value}},
+            or {None: {aggregate: value}} without a group-by.
+
+        Raises:
+            ValueError: If the attribute is not numeric or the foreign key is not one.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        return self._derive("columns", name, self._build_columns).aggregate(column, by)
+
+    def _build_text(self, name):
+        """
+        Creates the full-text index of the attributes listed in
+        models.engine.search.FIELDS, filled from the data file.
+
+        Args:
+            name (str): Ignored; the index covers every class.
+
+        Returns:
+            TextIndex: The index.
+        """
+        index = TextIndex()
+        for indexed, fields in FIELDS.items():
+            for key, texts in self._values(indexed, list(fields)):
+                index.update(key, texts)
+        return index
+
+    @metrics.timed("storage.search")
+    def search(self, text, cls=None, limit=None):
+        """
+        Returns the objects whose text attributes, listed in models.engine.search.FIELDS,
+        contain any word of a text, the most relevant first, like FileStorage.search().
+
+        Args:
+            text (str): The words to look for.
+            cls (type or str): The class, or class name, to restrict the results to.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: Pairs of (score, object), highest score first.
+        """
+        index = self._derive("text", None, self._build_text)
+        name = None if cls is None else cls if isinstance(cls, str) else cls.__name__
+        return [(score, self.get(*key.split(".", 1)))
+                for score, key in index.search(text, name and name + ".", limit)]
+
+    def _build_spatial(self, name):
+        """
+        Creates the spatial index over the latitude and longitude of a class, filled
+        from the data file.
+
+        Args:
+            name (str): The class name.
+
+        Returns:
+            GridIndex: The index.
+        """
+        cls = self.classes().get(name)
+        index = GridIndex(name, default=(getattr(cls, "latitude", None), getattr(cls, "longitude", None)))
+        for key, (latitude, longitude) in self._values(name, ["latitude", "longitude"]):
+            index.update(key, latitude, longitude)
+        return index
+
+    def _spatial_index(self, cls):
+        """
+        Returns the spatial index of a class.
+
+        Args:
+            cls (type or str): The class, or class name.
+
+        Returns:
+            tuple: The class name and its GridIndex.
+
+        Raises:
+            ValueError: If the class has no latitude and longitude.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        attributes = self.attributes().get(name, {})
+        if "latitude" not in attributes or "longitude" not in attributes:
+            raise ValueError("{} has no coordinates".format(name))
+        return name, self._derive("spatial", name, self._build_spatial)
+
+    @metrics.timed("storage.within")
+    def within(self, cls, south, west, north, east):
+        """
+        Returns the objects of a class located in a latitude/longitude box.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            south (float): The southern bound, in degrees.
+            west (float): The western bound; greater than east for a box crossing
+                the antimeridian.
+            north (float): The northern bound, in degrees.
+            east (float): The eastern bound, in degrees.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+
+        Raises:
+            ValueError: If the class has no latitude and longitude.
+        """
+        name, index = self._spatial_index(cls)
+        return {key: self._object(name, key) for key in index.within(south, west, north, east)}
+
+    @metrics.timed("storage.within_radius")
+    def within_radius(self, cls, latitude, longitude, radius):
+        """
+        Returns the objects of a class located within a distance of a point.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            latitude (float): The latitude of the center, in degrees.
+            longitude (float): The longitude of the center, in degrees.
+            radius (float): The distance, in kilometers.
+
+        Returns:
+            list: Pairs of (distance in kilometers, object), nearest first.
+        """
+        name, index = self._spatial_index(cls)
+        return [(km, self._object(name, key))
+                for km, key in index.within_radius(latitude, longitude, radius)]
+
+    @metrics.timed("storage.nearest")
+    def nearest(self, cls, latitude, longitude, count=1):
+        """
+        Returns the objects of a class nearest to a point.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects.
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            count (int): The number of objects to return.
+
+        Returns:
+            list: Pairs of (distance in kilometers, object), nearest first.
+        """
+        name, index = self._spatial_index(cls)
+        return [(km, self._object(name, key))
+                for km, key in index.nearest(latitude, longitude, count)]
+
+    @metrics.timed("storage.new")
+    def new(self, obj):
+        """
+        Adds a new object to the storage, or a modified one back to the cache.
+
+        Args:
+            obj (BaseModel): The object to store, which must have an 'id' attribute.
+        """
+        name = type(obj).__name__
+        key = "{}.{}".format(name, obj.id)
+        self.__index.setdefault(name, {}).setdefault(key, None)
+        self.__dirty.add(key)
+        self.__deleted.discard(key)
+        self._changed()
+        self.__instances[key] = obj
+        self.__cache.put(key, obj)
+
+    @metrics.timed("storage.delete")
+    def delete(self, obj=None):
+        """
+        Removes an object from the storage.
+
+        Args:
+            obj (BaseModel): The object to remove. Nothing happens if it is None.
+        """
+        if obj is None:
+            return
+        name = type(obj).__name__
+        key = "{}.{}".format(name, obj.id)
+        keys = self.__index.get(name, {})
+        if key not in keys:
+            return
+        extent = keys.pop(key)
+        self.__cache.discard(key)
+        self.__instances.pop(key, None)
+        self.__dirty.discard(key)
+        if extent is not None:
+            self.__garbage += self._frame_size(key, extent)
+            self.__deleted.add(key)
+        self._changed()
+
+    def mark_dirty(self, obj, attribute=None):
+        """
+        Records that an attribute of a stored instance changed, so that it is written
+        again. An evicted instance is put back in the cache until then.
+
+        Args:
+            obj (BaseModel): The modified object. Objects that are not stored, and
+                instances that are not the one of their object, are ignored.
+            attribute (str): The name of the modified attribute.
+        """
+        key = "{}.{}".format(type(obj).__name__, getattr(obj, "id", None))
+        if self.__instances.get(key) is not obj:
+            return
+        self.__dirty.add(key)
+        if self.__cache.peek(key) is not obj:
+            self.__cache.put(key, obj)
+        self._changed()
+
+    def cache_stats(self):
+        """
+        Returns the state and the counters of the cache of instances.
+
+        Returns:
+            dict: The statistics of the ObjectCache, see ObjectCache.stats(), plus
+            the number of "dirty" instances, of "write_backs" on eviction, and the
+            "file_bytes" and "garbage_bytes" of the data file.
+        """
+        stats = self.__cache.stats()
+        stats.update(dirty=len(self.__dirty), write_backs=self.__write_backs,
+                     file_bytes=os.fstat(self.__fd).st_size if self.__fd is not None else 0,
+                     garbage_bytes=self.__garbage)
+        return stats
+
+    def save(self):
+        """
+        Writes the changes made since the last write.
+
+        Inside a batch() block, or when group commit is enabled, the write is deferred
+        like in FileStorage.save().
+        """
+        self.__deferred += 1
+        if self.__batch_depth:
+            return
+        size, interval = self.__commit_size, self.__commit_interval
+        if size or interval:
+            if not (size and self.__deferred >= size) and \
+                    not (interval and time.monotonic() - self.__last_commit >= interval):
+                return
+        self.flush()
+
+    @metrics.timed("storage.flush")
+    def flush(self):
+        """
+        Appends the fragments of the dirty instances and the tombstones of the deleted
+        objects, if saves were requested since the last write, then compacts the data
+        file when the frames replaced take more than __compact_ratio of it, or when
+        it is not in the configured format.
+        """
+        if not self.__deferred or self.__fd is None:
+            return
+        self.__deferred = 0
+        self.__last_commit = time.monotonic()
+        entries = [(key, self._encode(self.__serializer, self.__cache.peek(key).to_dict()))
+                   for key in self.__dirty]
+        entries.extend((key, None) for key in self.__deleted)
+        self._append(entries)
+        self.__dirty = set()
+        self.__deleted = set()
+        size = os.fstat(self.__fd).st_size
+        if self.__serializer.name != self.__format or \
+                self.__garbage >= COMPACT_MINIMUM and self.__garbage > size * self.__compact_ratio:
+            self.compact()
+        elif self.__durability == "fsync":
+            os.fsync(self.__fd)
+
+    @metrics.timed("storage.compact")
+    def compact(self):
+        """
+        Rewrites the data file with the latest fragment of every stored object, in the
+        configured format, dropping the frames replaced and the tombstones. The file is
+        written next to the data file, then renamed over it, so that a crash leaves
+        either of them whole; the dirty instances are written as well.
+        """
+        if self.__fd is None:
+            return
+        serializer = get_serializer(self.__format)
+        convert = serializer.name != self.__serializer.name
+        tmp_path = "{}.{}.tmp".format(self.__path, os.getpid())
+        header = MAGIC + bytes((FORMATS.index(serializer.name),))
+        index = {}
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                position = len(header)
+                frames = []
+                for name, keys in self.__index.items():
+                    extents = index[name] = {}
+                    for key, extent in keys.items():
+                        if key in self.__dirty:
+                            fragment = self._encode(serializer, self.__cache.peek(key).to_dict())
+                        elif convert:
+                            fragment = self._encode(serializer, self._decode(self.__serializer,
+                                                                             self._read(extent)))
+                        else:
+                            fragment = self._read(extent)
+                        encoded = key.encode("utf-8")
+                        frames.append(FRAME.pack(len(encoded), len(fragment)) + encoded + fragment)
+                        extents[key] = (position + FRAME.size + len(encoded), len(fragment))
+                        position += FRAME.size + len(encoded) + len(fragment)
+                        if len(frames) >= 1000:
+                            f.write(b"".join(frames))
+                            frames = []
+                f.write(b"".join(frames))
+                f.flush()
+                if self.__durability == "fsync":
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.__path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        metrics.increment("storage.bytes_written", position)
+        if self.__durability == "fsync":
+            fd = os.open(os.path.dirname(os.path.abspath(self.__path)), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        os.close(self.__fd)
+        self.__fd = os.open(self.__path, os.O_RDWR | os.O_APPEND | getattr(os, "O_BINARY", 0))
+        self.__serializer = serializer
+        self.__index = index
+        self.__dirty = set()
+        self.__deleted = set()
+        self.__garbage = 0
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Coalesces the saves requested inside a with block into a single write, made
+        when the outermost block exits.
+
+        Yields:
+            PagedStorage: The storage.
+        """
+        self.__batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.__batch_depth -= 1
+            if not self.__batch_depth and self.__deferred:
+                self.flush()
+
+    def classes(self):
+        """
+        Returns a dictionary of valid class names and their corresponding class references,
+        as registered by the models, see models.engine.registry. The compact option of
+        FileStorage does not apply.
+
+        Returns:
+            dict: A dictionary where the keys are class names and the values are class references.
+        """
+        return registry.classes()
+
+    def attributes(self):
+        """
+        Returns a dictionary of valid attributes and their types for each class.
+
+        Returns:
+            dict: A dictionary where the keys are class names and the values are dictionaries
+                  mapping attribute names to their types.
+        """
+        return registry.attributes()
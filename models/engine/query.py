@@ -0,0 +1,234 @@
+#!/usr/bin/python3
+"""
+Module for the queries over stored objects: attribute predicates, ordering,
+pagination and projection, as used by the query() method of the storage engines
+and the query command of the console.
+"""
+
+import heapq
+import operator
+import re
+from collections import namedtuple
+
+OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge
+}
+"""dict: The comparison operators of predicates and the functions evaluating them."""
+
+PREDICATE = re.compile(r'^(\w+)(==|!=|<=|>=|=|<|>)(.*)$')
+OPTIONS = ("order_by", "limit", "offset", "fields")
+WORD = re.compile(r'(?:"[^"]*"|[^\s"])+')
+STARTS_WITH_OPERATOR = re.compile(r'^(?:==|!=|<=|>=|=|<|>)')
+ENDS_WITH_OPERATOR = re.compile(r'(?:==|!=|<=|>=|=|<|>)$')
+
+
+class Predicate(namedtuple("Predicate", "attribute operator value")):
+    """
+    A comparison between an attribute of the objects and a value, such as
+    price_by_night < 100.
+
+    Attributes:
+        attribute (str): The name of the attribute.
+        operator (str): One of the keys of OPERATORS.
+        value: The value the attribute is compared to.
+    """
+
+    @property
+    def equality(self):
+        """
+        bool: Whether the predicate tests the attribute for equality with the value.
+        """
+        return OPERATORS[self.operator] is operator.eq
+
+    def matches(self, obj):
+        """
+        Evaluates the predicate on an object. Objects without the attribute, or holding
+        a value that cannot be compared to the predicate value, do not match.
+
+        Args:
+            obj (BaseModel): The object.
+
+        Returns:
+            bool: Whether the object matches.
+        """
+        value = getattr(obj, self.attribute, None)
+        if value is None:
+            return OPERATORS[self.operator] is operator.ne and self.value is not None
+        try:
+            return OPERATORS[self.operator](value, self.value)
+        except TypeError:
+            return False
+
+
+def parse_value(text, kind=None):
+    """
+    Converts a value typed in a query. Double-quoted values are strings; other values
+    are converted to the type of the attribute when it is known, and otherwise to an
+    integer or a float when they look like one.
+
+    Args:
+        text (str): The value as typed.
+        kind (type): The type of the attribute, from FileStorage.attributes().
+
+    Returns:
+        The value.
+
+    Raises:
+        ValueError: If the value cannot be converted to the type of the attribute.
+    """
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        return text[1:-1]
+    if kind in (str, int, float):
+        return kind(text)
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def split(text):
+    """
+    Splits the arguments of a query into words on spaces, keeping double-quoted
+    values whole, and joining an operator written apart from its attribute or its
+    value, so that name=="Big House" and name == "Big House" both give the word
+    name=="Big House".
+
+    Args:
+        text (str): The arguments.
+
+    Returns:
+        list: The words.
+
+    Raises:
+        ValueError: If a double-quoted value is not terminated.
+    """
+    if text.count('"') % 2:
+        raise ValueError("unterminated string: {}".format(text))
+    words = []
+    for word in WORD.findall(text):
+        if words and (ENDS_WITH_OPERATOR.search(words[-1]) or STARTS_WITH_OPERATOR.match(word)):
+            words[-1] += word
+        else:
+            words.append(word)
+    return words
+
+
+def parse(words, types):
+    """
+    Parses the arguments of a query: predicates such as price_by_night<100, and the
+    options order_by=<attribute> (prefixed with '-' for a descending order), limit=<n>,
+    offset=<n> and fields=<attribute>,<attribute>.
+
+    Args:
+        words (list): The arguments.
+        types (dict): The attribute names and types of the queried class.
+
+    Returns:
+        dict: The keyword arguments of query(): where, order_by, limit, offset and fields.
+
+    Raises:
+        ValueError: If an argument is not a predicate or an option, or a value is invalid.
+    """
+    query = {"where": [], "order_by": None, "limit": None, "offset": 0, "fields": None}
+    for word in words:
+        match = PREDICATE.match(word)
+        if not match:
+            raise ValueError("invalid predicate: {}".format(word))
+        attribute, op, text = match.groups()
+        if attribute in OPTIONS and op == "=":
+            if attribute in ("limit", "offset"):
+                query[attribute] = int(text)
+                if query[attribute] < 0:
+                    raise ValueError("{} must not be negative".format(attribute))
+            elif attribute == "fields":
+                query["fields"] = [f for f in text.split(",") if f]
+            else:
+                query["order_by"] = text
+            continue
+        try:
+            value = parse_value(text, types.get(attribute))
+        except ValueError:
+            raise ValueError("invalid value for {}: {}".format(attribute, text)) from None
+        query["where"].append(Predicate(attribute, op, value))
+    return query
+
+
+def sort_key(attribute, reverse=False):
+    """
+    Returns the key function ordering objects by an attribute, missing values last.
+
+    Args:
+        attribute (str): The name of the attribute.
+        reverse (bool): Whether the key is used for a descending order.
+
+    Returns:
+        callable: The key function.
+    """
+    def key(obj):
+        value = getattr(obj, attribute, None)
+        return ((value is None) != reverse, value if value is not None else 0)
+    return key
+
+
+def project(obj, fields):
+    """
+    Returns the selected attributes of an object.
+
+    Args:
+        obj (BaseModel): The object.
+        fields (list): The names of the attributes.
+
+    Returns:
+        dict: The attribute names and values, leaving out the attributes the object
+        does not have.
+    """
+    return {f: getattr(obj, f) for f in fields if hasattr(obj, f)}
+
+
+def run(objects, where=(), order_by=None, limit=None, offset=0, fields=None):
+    """
+    Filters, orders, paginates and projects objects.
+
+    When a limit is given, only the first offset + limit objects are kept while
+    ordering, instead of sorting every match.
+
+    Args:
+        objects (iterable): The candidate objects.
+        where (iterable): The Predicates every result must match.
+        order_by (str): The attribute to order by, prefixed with '-' for a descending order.
+        limit (int): The maximum number of results.
+        offset (int): The number of results to skip.
+        fields (list): The attributes to return instead of the objects.
+
+    Returns:
+        list: The matching objects, or their projections when fields is given.
+    """
+    where = list(where)
+    matches = (obj for obj in objects if all(p.matches(obj) for p in where))
+    end = None if limit is None else offset + limit
+    if order_by:
+        reverse = order_by.startswith("-")
+        key = sort_key(order_by.lstrip("-"), reverse)
+        try:
+            if end is None:
+                matches = sorted(matches, key=key, reverse=reverse)
+            else:
+                matches = (heapq.nlargest if reverse else heapq.nsmallest)(end, matches, key=key)
+        except TypeError:
+            raise ValueError("cannot order by {}: values of different types".format(
+                order_by.lstrip("-"))) from None
+    results = []
+    for index, obj in enumerate(matches):
+        if end is not None and index >= end:
+            break
+        if index >= offset:
+            results.append(project(obj, fields) if fields else obj)
+    return results
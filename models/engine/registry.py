@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""
+Module for the registry of the model classes and of their typed attribute
+schemas.
+
+Each model registers itself with the register() decorator when its module is
+imported; the type of each attribute is the type of its class-level default,
+unless a schema is given. The registry is built once, on the first lookup, so
+that the storage engines and the console, which look classes and types up on
+every command and for every record they read, get the same dictionaries back
+instead of rebuilding them.
+"""
+
+import importlib
+from types import MappingProxyType
+
+MODULES = ("models.base_model", "models.user", "models.state", "models.city",
+           "models.amenity", "models.place", "models.review")
+"""tuple: The modules of the built-in models, imported on the first lookup."""
+
+_classes = {}
+_schemas = {}
+_views = {}
+
+
+def register(cls=None, schema=None):
+    """
+    Registers a model class, as a class decorator:
+
+        @register
+        class Place(BaseModel):
+            name = ""
+            max_guest = 0
+
+    Args:
+        cls (type): The model class.
+        schema (dict): The declared attributes of the class and their types; by
+            default, the public class attributes that are not methods, typed after
+            their default value.
+
+    Returns:
+        type: The class itself, or a decorator when only the schema is given.
+    """
+    if cls is None:
+        return lambda cls: register(cls, schema)
+    if schema is None:
+        schema = {name: type(value) for name, value in vars(cls).items()
+                  if not name.startswith("_") and not callable(value)
+                  and not isinstance(value, (classmethod, staticmethod, property))}
+    _classes[cls.__name__] = cls
+    _schemas[cls.__name__] = MappingProxyType(dict(schema))
+    _views.clear()
+    return cls
+
+
+def _load():
+    """
+    Imports the modules of the built-in models, which registers them.
+    """
+    for module in MODULES:
+        importlib.import_module(module)
+
+
+def classes():
+    """
+    Returns the registered model classes.
+
+    Returns:
+        mappingproxy: The classes, by name, read-only.
+    """
+    view = _views.get("classes")
+    if view is None:
+        _load()
+        view = _views["classes"] = MappingProxyType(dict(_classes))
+    return view
+
+
+def compact_classes():
+    """
+    Returns the compact variants of the registered model classes, see
+    models.engine.compact.
+
+    Returns:
+        mappingproxy: The compact classes, by name, read-only.
+    """
+    view = _views.get("compact")
+    if view is None:
+        from models.engine.compact import compact_class
+        schemas = attributes()
+        view = MappingProxyType({name: compact_class(cls, schemas)
+                                 for name, cls in classes().items()})
+        _views["compact"] = view
+    return view
+
+
+def attributes():
+    """
+    Returns the declared attributes of the registered model classes and their types.
+
+    Returns:
+        mappingproxy: The read-only schema of each class, by name, mapping the
+        attribute names to their types.
+    """
+    view = _views.get("attributes")
+    if view is None:
+        _load()
+        view = _views["attributes"] = MappingProxyType(dict(_schemas))
+    return view
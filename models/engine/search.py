@@ -0,0 +1,221 @@
+#!/usr/bin/python3
+"""
+Module for the full-text index over the text attributes of stored objects,
+such as the name and description of places or the text of reviews, with
+results ranked by relevance (BM25).
+"""
+
+import json
+import math
+import os
+import re
+
+FIELDS = {
+    "Place": ("name", "description"),
+    "Review": ("text",),
+    "Amenity": ("name",)
+}
+"""dict: The text attributes indexed for each class."""
+
+TOKEN = re.compile(r"\w+")
+
+K1 = 1.2
+B = 0.75
+"""float: The term frequency saturation (K1) and length normalization (B) of BM25."""
+
+
+def tokenize(text):
+    """
+    Splits a text into lowercase words.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The words, in order, repeated as often as they appear.
+    """
+    if not isinstance(text, str):
+        return []
+    return TOKEN.findall(text.lower())
+
+
+class TextIndex:
+    """
+    Inverted index mapping each word to the objects whose text attributes contain it,
+    with the number of occurrences in each (posting lists).
+
+    Attributes:
+        signature (list): Identifies the snapshot the index was last saved with, so
+            that a saved index is only loaded back along with that snapshot.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self.signature = None
+        self.clear()
+
+    def __len__(self):
+        """
+        Returns the number of indexed objects.
+        """
+        return len(self.__documents)
+
+    def __contains__(self, key):
+        """
+        Returns whether an object is indexed.
+        """
+        return key in self.__documents
+
+    def keys(self):
+        """
+        Returns the storage keys of the indexed objects.
+
+        Returns:
+            list: The keys.
+        """
+        return list(self.__documents)
+
+    def clear(self):
+        """
+        Removes every object from the index.
+        """
+        self.__postings = {}
+        self.__documents = {}
+        self.__lengths = {}
+        self.__total = 0
+
+    def update(self, key, texts):
+        """
+        Indexes the text attributes of an object, replacing what it was indexed under.
+
+        Args:
+            key (str): The storage key of the object.
+            texts (iterable): The values of its text attributes.
+        """
+        self.discard(key)
+        counts = {}
+        for text in texts:
+            for word in tokenize(text):
+                counts[word] = counts.get(word, 0) + 1
+        if counts:
+            self._add(key, counts)
+
+    def _add(self, key, counts):
+        """
+        Adds an object to the posting lists.
+
+        Args:
+            key (str): The storage key of the object.
+            counts (dict): The number of occurrences of each word in its text.
+        """
+        self.__documents[key] = counts
+        length = sum(counts.values())
+        self.__lengths[key] = length
+        self.__total += length
+        for word, count in counts.items():
+            self.__postings.setdefault(word, {})[key] = count
+
+    def discard(self, key):
+        """
+        Removes an object from the index, if it is indexed.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        counts = self.__documents.pop(key, None)
+        if counts is None:
+            return
+        self.__total -= self.__lengths.pop(key)
+        for word in counts:
+            postings = self.__postings[word]
+            del postings[key]
+            if not postings:
+                del self.__postings[word]
+
+    def search(self, text, prefix=None, limit=None):
+        """
+        Returns the objects containing any word of a text, the most relevant first.
+
+        Objects are ranked by BM25: words that are rare across the index, and that
+        appear often in a short text, weigh more.
+
+        Args:
+            text (str): The words to look for.
+            prefix (str): Only return the objects whose key starts with it, such as
+                "Place." for the places.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: Pairs of (score, storage key), highest score first.
+        """
+        words = set(tokenize(text))
+        if not words or not self.__documents:
+            return []
+        count = len(self.__documents)
+        average = self.__total / count
+        scores = {}
+        for word in words:
+            postings = self.__postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, frequency in postings.items():
+                if prefix and not key.startswith(prefix):
+                    continue
+                norm = K1 * (1 - B + B * self.__lengths[key] / average)
+                scores[key] = scores.get(key, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        ranked = sorted(((score, key) for key, score in scores.items()), key=lambda r: (-r[0], r[1]))
+        return ranked if limit is None else ranked[:limit]
+
+    def copy(self):
+        """
+        Returns a copy of the index, which can be saved while the index keeps changing.
+
+        Returns:
+            TextIndex: The copy.
+        """
+        index = TextIndex()
+        index.signature = self.signature
+        for key, counts in self.__documents.items():
+            index._add(key, counts)
+        return index
+
+    def save(self, f):
+        """
+        Writes the index to an open text file, along with its signature. FileStorage
+        writes the file with the durability of its snapshot.
+
+        Args:
+            f (file): The file.
+        """
+        json.dump({"signature": self.signature, "documents": self.__documents}, f)
+
+    @classmethod
+    def load(cls, path, signature):
+        """
+        Reads an index written by save(), if its signature matches.
+
+        Args:
+            path (str): The file path.
+            signature (list): The expected signature.
+
+        Returns:
+            TextIndex: The index, or None if the file is missing, unreadable or was
+            saved with another signature.
+        """
+        if signature is None or not os.path.isfile(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("signature") != signature:
+            return None
+        index = cls()
+        index.signature = signature
+        for key, counts in data["documents"].items():
+            index._add(key, counts)
+        return index
@@ -0,0 +1,527 @@
+#!/usr/bin/python3
+"""
+Module for the file formats FileStorage can persist objects in.
+
+A serializer encodes the dictionary representation of one object, as returned
+by to_dict(), into a fragment (a str for text formats, bytes for binary ones),
+and frames fragments into a snapshot file and into journal entries. Snapshots
+and journals are read back as fragments, which are only decoded when the
+object is needed.
+
+Usage: python3 -m models.engine.serializers <source> <format> <destination> <format>
+converts a snapshot from one format to the other.
+"""
+
+import itertools
+import json
+import struct
+import sys
+from datetime import datetime
+from json.encoder import encode_basestring_ascii as encode_key
+from models.engine import timestamps
+
+
+class JSONSerializer:
+    """
+    The JSON format of file.json: one object mapping each key to the dictionary
+    representation of its object. Journal entries are JSON lines.
+    """
+
+    name = "json"
+    extension = ".json"
+    binary = False
+
+    def encode(self, record):
+        """
+        Encodes the dictionary representation of an object.
+
+        Args:
+            record (dict): The dictionary representation. datetime values are
+                written in ISO format.
+
+        Returns:
+            str: The JSON fragment.
+        """
+        return json.dumps(record, default=datetime.isoformat)
+
+    def decode(self, fragment):
+        """
+        Decodes a fragment.
+
+        Args:
+            fragment (str): The JSON fragment.
+
+        Returns:
+            dict: The dictionary representation of the object.
+        """
+        return json.loads(fragment)
+
+    def write_snapshot(self, f, items):
+        """
+        Writes a snapshot.
+
+        Args:
+            f (file): The snapshot, opened for writing in text mode.
+            items (iterable): Pairs of (key, fragment).
+        """
+        f.write("{" + ", ".join(encode_key(k) + ": " + v for k, v in items) + "}")
+
+    def read_snapshot(self, f, chunk_size=1 << 16):
+        """
+        Parses a snapshot incrementally, reading the file in chunks.
+
+        Args:
+            f (file): The snapshot, opened in text mode.
+            chunk_size (int): The number of characters read at a time.
+
+        Yields:
+            tuple: Pairs of (key, fragment).
+        """
+        decoder = json.JSONDecoder()
+        whitespace = " \t\n\r"
+        buf = f.read(chunk_size).lstrip(whitespace)
+        if not buf:
+            return
+        if buf[0] != "{":
+            raise ValueError("the snapshot is not a JSON object")
+        pos = 1
+        eof = False
+        while True:
+            try:
+                i = pos
+                while buf[i] in whitespace:
+                    i += 1
+                if buf[i] == "}":
+                    return
+                key, i = decoder.raw_decode(buf, i)
+                while buf[i] in whitespace:
+                    i += 1
+                if buf[i] != ":":
+                    raise ValueError("expected ':' at {}".format(i))
+                i += 1
+                while buf[i] in whitespace:
+                    i += 1
+                start = i
+                value, i = decoder.raw_decode(buf, i)
+                end = i
+                while buf[i] in whitespace:
+                    i += 1
+                if buf[i] not in ",}":
+                    raise ValueError("expected ',' or '}}' at {}".format(i))
+            except (IndexError, ValueError):
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield key, buf[start:end]
+            pos = i + 1 if buf[i] == "," else i
+
+    def encode_entry(self, key, fragment):
+        """
+        Encodes a journal entry.
+
+        Args:
+            key (str): The key of the object.
+            fragment (str): The fragment of the object, or None for a tombstone.
+
+        Returns:
+            str: The journal line.
+        """
+        return '{{"key": {}, "value": {}}}\n'.format(
+            encode_key(key), "null" if fragment is None else fragment)
+
+    def read_entries(self, f):
+        """
+        Reads journal entries, stopping at a torn last entry: an unterminated or
+        unparsable line with nothing after it.
+
+        Args:
+            f (file): The journal, opened in text mode.
+
+        Yields:
+            tuple: Pairs of (key, fragment), fragment being None for a tombstone.
+
+        Raises:
+            ValueError: If an entry followed by other entries is corrupt.
+        """
+        for number, line in enumerate(iter(f.readline, ""), 1):
+            try:
+                entry = json.loads(line)
+                key, value = entry["key"], entry["value"]
+            except (ValueError, KeyError, TypeError):
+                if f.readline():
+                    raise ValueError("corrupt journal entry on line {}".format(number))
+                return
+            yield key, None if value is None else json.dumps(value)
+
+
+class BinarySerializer:
+    """
+    A compact binary format built with struct.
+
+    The snapshot starts with MAGIC and holds one frame per object: the length of
+    the key and of the fragment, then both. Journal entries use the same frames,
+    a tombstone being a frame with an empty fragment.
+
+    Fragments are tagged values: strings, integers, floats, booleans, None, lists
+    and dictionaries, plus timestamps, stored as microseconds since the epoch.
+    Lengths below 255 take one byte, small integers take one or four bytes, and
+    strings holding a UUID, such as ids and foreign keys, take 16 bytes.
+    created_at and updated_at are stored as timestamps and decoded to datetime.
+    """
+
+    name = "binary"
+    extension = ".bin"
+    binary = True
+    MAGIC = b"HBNB\x01"
+    FRAME = struct.Struct("<HI")
+    LENGTH = struct.Struct("<I")
+    INT8 = struct.Struct("<b")
+    INT32 = struct.Struct("<i")
+    INT64 = struct.Struct("<q")
+    FLOAT = struct.Struct("<d")
+    UUID_DASHES = (8, 13, 18, 23)
+
+    def _length(self, n):
+        """
+        Encodes a length: one byte below 255, otherwise 255 and four bytes.
+
+        Args:
+            n (int): The length.
+
+        Returns:
+            bytes: The encoded length.
+        """
+        if n < 255:
+            return bytes((n,))
+        return b"\xff" + self.LENGTH.pack(n)
+
+    def _read_length(self, data, pos):
+        """
+        Decodes a length.
+
+        Args:
+            data (bytes): The encoded data.
+            pos (int): The position of the length.
+
+        Returns:
+            tuple: The length and the position following it.
+        """
+        n = data[pos]
+        if n < 255:
+            return n, pos + 1
+        return self.LENGTH.unpack_from(data, pos + 1)[0], pos + 5
+
+    def encode(self, record):
+        """
+        Encodes the dictionary representation of an object.
+
+        Args:
+            record (dict): The dictionary representation.
+
+        Returns:
+            bytes: The fragment.
+        """
+        out = []
+        self._encode_dict(record, out, timestamps_keys=("created_at", "updated_at"))
+        return b"".join(out)
+
+    def _encode_dict(self, value, out, timestamps_keys=()):
+        """
+        Appends the encoding of a dictionary to out.
+
+        Args:
+            value (dict): The dictionary.
+            out (list): The encoded chunks.
+            timestamps_keys (tuple): Keys whose ISO string values are stored as timestamps.
+        """
+        out.append(b"m" + self._length(len(value)))
+        for k, v in value.items():
+            encoded = k.encode("utf-8")
+            out.append(self._length(len(encoded)) + encoded)
+            if k in timestamps_keys and isinstance(v, str):
+                v = timestamps.parse(v)
+            self._encode_value(v, out)
+
+    def _encode_value(self, value, out):
+        """
+        Appends the tagged encoding of a value to out.
+
+        Args:
+            value: The value.
+            out (list): The encoded chunks.
+        """
+        kind = type(value)
+        if kind is str:
+            if len(value) == 36 and all(value[i] == "-" for i in self.UUID_DASHES):
+                try:
+                    packed = bytes.fromhex(value.replace("-", ""))
+                except ValueError:
+                    packed = None
+                if packed is not None and value == self._uuid(packed):
+                    out.append(b"u" + packed)
+                    return
+            encoded = value.encode("utf-8")
+            out.append(b"s" + self._length(len(encoded)) + encoded)
+        elif kind is bool:
+            out.append(b"T" if value else b"F")
+        elif kind is int:
+            if -(1 << 7) <= value < (1 << 7):
+                out.append(b"b" + self.INT8.pack(value))
+            elif -(1 << 31) <= value < (1 << 31):
+                out.append(b"j" + self.INT32.pack(value))
+            elif -(1 << 63) <= value < (1 << 63):
+                out.append(b"i" + self.INT64.pack(value))
+            else:
+                encoded = str(value).encode("ascii")
+                out.append(b"I" + self._length(len(encoded)) + encoded)
+        elif kind is float:
+            out.append(b"f" + self.FLOAT.pack(value))
+        elif value is None:
+            out.append(b"N")
+        elif isinstance(value, datetime):
+            out.append(b"t" + self.INT64.pack(timestamps.to_epoch_us(value)))
+        elif isinstance(value, (list, tuple)):
+            out.append(b"l" + self._length(len(value)))
+            for item in value:
+                self._encode_value(item, out)
+        elif isinstance(value, dict):
+            self._encode_dict(value, out)
+        else:
+            raise TypeError("cannot encode {} values".format(kind.__name__))
+
+    @staticmethod
+    def _uuid(packed):
+        """
+        Formats 16 bytes as a UUID string.
+
+        Args:
+            packed (bytes): The 16 bytes.
+
+        Returns:
+            str: The UUID in its canonical lowercase form.
+        """
+        h = packed.hex()
+        return "{}-{}-{}-{}-{}".format(h[:8], h[8:12], h[12:16], h[16:20], h[20:])
+
+    def decode(self, fragment):
+        """
+        Decodes a fragment.
+
+        Args:
+            fragment (bytes): The fragment.
+
+        Returns:
+            dict: The dictionary representation of the object.
+        """
+        return self._decode_value(fragment, 0)[0]
+
+    def _decode_value(self, data, pos):
+        """
+        Decodes the tagged value starting at pos.
+
+        Args:
+            data (bytes): The encoded data.
+            pos (int): The position of the tag.
+
+        Returns:
+            tuple: The value and the position following it.
+        """
+        tag = data[pos:pos + 1]
+        pos += 1
+        if tag == b"s":
+            size, pos = self._read_length(data, pos)
+            return data[pos:pos + size].decode("utf-8"), pos + size
+        if tag == b"u":
+            return self._uuid(data[pos:pos + 16]), pos + 16
+        if tag == b"b":
+            return self.INT8.unpack_from(data, pos)[0], pos + 1
+        if tag == b"j":
+            return self.INT32.unpack_from(data, pos)[0], pos + 4
+        if tag == b"i":
+            return self.INT64.unpack_from(data, pos)[0], pos + 8
+        if tag == b"f":
+            return self.FLOAT.unpack_from(data, pos)[0], pos + 8
+        if tag == b"t":
+            return timestamps.parse(self.INT64.unpack_from(data, pos)[0]), pos + 8
+        if tag == b"m":
+            count, pos = self._read_length(data, pos)
+            value = {}
+            for _ in range(count):
+                size, pos = self._read_length(data, pos)
+                key = data[pos:pos + size].decode("utf-8")
+                value[key], pos = self._decode_value(data, pos + size)
+            return value, pos
+        if tag == b"l":
+            count, pos = self._read_length(data, pos)
+            value = []
+            for _ in range(count):
+                item, pos = self._decode_value(data, pos)
+                value.append(item)
+            return value, pos
+        if tag == b"T":
+            return True, pos
+        if tag == b"F":
+            return False, pos
+        if tag == b"N":
+            return None, pos
+        if tag == b"I":
+            size, pos = self._read_length(data, pos)
+            return int(data[pos:pos + size]), pos + size
+        raise ValueError("unknown tag {!r} at {}".format(tag, pos - 1))
+
+    def _frame(self, key, fragment):
+        """
+        Returns the frame holding a key and a fragment.
+
+        Args:
+            key (str): The key.
+            fragment (bytes): The fragment.
+
+        Returns:
+            bytes: The frame.
+        """
+        encoded = key.encode("utf-8")
+        return self.FRAME.pack(len(encoded), len(fragment)) + encoded + fragment
+
+    def _read_frames(self, f):
+        """
+        Reads frames until the end of the file or a torn last frame, one cut short
+        by the end of the file.
+
+        Args:
+            f (file): The file, opened in binary mode.
+
+        Yields:
+            tuple: Pairs of (key, fragment).
+
+        Raises:
+            ValueError: If a whole frame has a key that is not a storage key.
+        """
+        size = self.FRAME.size
+        for number in itertools.count(1):
+            header = f.read(size)
+            if len(header) < size:
+                return
+            key_size, fragment_size = self.FRAME.unpack(header)
+            body = f.read(key_size + fragment_size)
+            if len(body) < key_size + fragment_size:
+                return
+            try:
+                key = body[:key_size].decode("utf-8")
+            except UnicodeDecodeError:
+                key = ""
+            if "." not in key:
+                raise ValueError("corrupt frame {}".format(number))
+            yield key, body[key_size:]
+
+    def write_snapshot(self, f, items):
+        """
+        Writes a snapshot.
+
+        Args:
+            f (file): The snapshot, opened for writing in binary mode.
+            items (iterable): Pairs of (key, fragment).
+        """
+        f.write(self.MAGIC + b"".join(self._frame(k, v) for k, v in items))
+
+    def read_snapshot(self, f):
+        """
+        Reads a snapshot, without decoding the fragments.
+
+        Args:
+            f (file): The snapshot, opened in binary mode.
+
+        Yields:
+            tuple: Pairs of (key, fragment).
+        """
+        magic = f.read(len(self.MAGIC))
+        if not magic:
+            return
+        if magic != self.MAGIC:
+            raise ValueError("the snapshot is not in the binary format")
+        yield from self._read_frames(f)
+
+    def encode_entry(self, key, fragment):
+        """
+        Encodes a journal entry.
+
+        Args:
+            key (str): The key of the object.
+            fragment (bytes): The fragment of the object, or None for a tombstone.
+
+        Returns:
+            bytes: The frame.
+        """
+        return self._frame(key, b"" if fragment is None else fragment)
+
+    def read_entries(self, f):
+        """
+        Reads journal entries, stopping at a torn last entry. Frames have no
+        checksum, so only the corrupt entries whose key is not a storage key are
+        detected.
+
+        Args:
+            f (file): The journal, opened in binary mode.
+
+        Yields:
+            tuple: Pairs of (key, fragment), fragment being None for a tombstone.
+
+        Raises:
+            ValueError: If a whole entry is corrupt.
+        """
+        for key, fragment in self._read_frames(f):
+            yield key, fragment or None
+
+
+SERIALIZERS = {s.name: s for s in (JSONSerializer(), BinarySerializer())}
+"""dict: The available serializers, by name."""
+
+
+def get_serializer(name):
+    """
+    Returns the serializer of a format.
+
+    Args:
+        name (str): The name of the format, "json" or "binary".
+
+    Returns:
+        JSONSerializer or BinarySerializer: The serializer.
+    """
+    if name not in SERIALIZERS:
+        raise ValueError("unknown storage format: {}".format(name))
+    return SERIALIZERS[name]
+
+
+def convert(source, source_format, destination, destination_format):
+    """
+    Converts a snapshot from one format to another.
+
+    Args:
+        source (str): The file path of the snapshot to read.
+        source_format (str): The format of the snapshot to read.
+        destination (str): The file path of the snapshot to write.
+        destination_format (str): The format of the snapshot to write.
+
+    Returns:
+        int: The number of converted objects.
+    """
+    reader = get_serializer(source_format)
+    writer = get_serializer(destination_format)
+    with open(source, "rb" if reader.binary else "r",
+              encoding=None if reader.binary else "utf-8") as f:
+        items = [(k, writer.encode(reader.decode(v))) for k, v in reader.read_snapshot(f)]
+    with open(destination, "wb" if writer.binary else "w",
+              encoding=None if writer.binary else "utf-8") as f:
+        writer.write_snapshot(f, items)
+    return len(items)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print("Usage: {} <source> <format> <destination> <format>".format(sys.argv[0]))
+        sys.exit(1)
+    print(convert(*sys.argv[1:]))
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+"""
+Module for the layout of a sharded snapshot: the objects of each class are
+stored in their own files, optionally split further by a hash of their id, in
+a directory next to the snapshot path.
+"""
+
+import os
+import zlib
+
+
+class ShardLayout:
+    """
+    Maps the objects of a sharded snapshot to their shard files.
+
+    A shard is identified by a (class name, bucket) pair. With one bucket per class
+    the shard of the users is stored in "User.json"; with 8 buckets the users are
+    spread over "User.0-8.json" to "User.7-8.json" by a CRC-32 of their id, so that
+    the files of another bucket count are told apart.
+
+    Attributes:
+        directory (str): The directory holding the shard files.
+        buckets (int): The number of shards of each class.
+        extension (str): The file extension of the storage format.
+    """
+
+    def __init__(self, directory, buckets, extension):
+        """
+        Initializes a layout.
+
+        Args:
+            directory (str): The directory holding the shard files.
+            buckets (int): The number of shards of each class, at least 1.
+            extension (str): The file extension of the storage format, such as ".json".
+        """
+        self.directory = directory
+        self.buckets = buckets
+        self.extension = extension
+
+    def shard(self, key):
+        """
+        Returns the shard of an object.
+
+        Args:
+            key (str): The storage key of the object, "<class name>.<id>".
+
+        Returns:
+            tuple: The (class name, bucket) of its shard.
+        """
+        name, id = key.split(".", 1)
+        if self.buckets == 1:
+            return name, 0
+        return name, zlib.crc32(id.encode("utf-8")) % self.buckets
+
+    def path(self, shard):
+        """
+        Returns the file path of a shard.
+
+        Args:
+            shard (tuple): The (class name, bucket) of the shard.
+
+        Returns:
+            str: The file path.
+        """
+        name, bucket = shard
+        if self.buckets == 1:
+            filename = name + self.extension
+        else:
+            filename = "{}.{}-{}{}".format(name, bucket, self.buckets, self.extension)
+        return os.path.join(self.directory, filename)
+
+    def parse(self, filename):
+        """
+        Returns the shard stored in a file, if the file belongs to this layout.
+
+        Args:
+            filename (str): The file name, without the directory.
+
+        Returns:
+            tuple: The (class name, bucket) of the shard, or None.
+        """
+        if not filename.endswith(self.extension):
+            return None
+        parts = filename[:-len(self.extension)].split(".")
+        if self.buckets == 1:
+            return (parts[0], 0) if len(parts) == 1 and parts[0] else None
+        if len(parts) != 2 or not parts[0]:
+            return None
+        bucket, _, buckets = parts[1].partition("-")
+        if not bucket.isdigit() or buckets != str(self.buckets) or int(bucket) >= self.buckets:
+            return None
+        return parts[0], int(bucket)
+
+    def scan(self):
+        """
+        Lists the files of the shard directory.
+
+        Returns:
+            tuple: The shards of this layout, as {(class name, bucket): path}, and the
+            paths of the other files in the directory with the same extension, left
+            by another layout.
+        """
+        shards, others = {}, []
+        if not os.path.isdir(self.directory):
+            return shards, others
+        for filename in sorted(os.listdir(self.directory)):
+            shard = self.parse(filename)
+            if shard is not None:
+                shards[shard] = os.path.join(self.directory, filename)
+            elif filename.endswith(self.extension):
+                others.append(os.path.join(self.directory, filename))
+        return shards, others
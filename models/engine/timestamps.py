@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+"""
+Module for the conversion of the created_at and updated_at timestamps
+between datetime objects and their stored representations.
+"""
+
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+"""datetime: The origin of the epoch-microsecond representation."""
+
+MICROSECOND = timedelta(microseconds=1)
+
+
+def parse(value):
+    """
+    Converts a stored timestamp to a datetime.
+
+    Accepts the ISO 8601 strings written by datetime.isoformat(), with or without
+    microseconds, and integers counting microseconds since EPOCH, as written by
+    the binary formats. datetime objects are returned unchanged.
+
+    Args:
+        value (str or int or datetime): The stored timestamp.
+
+    Returns:
+        datetime: The timestamp.
+    """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(value, int):
+        return EPOCH + timedelta(microseconds=value)
+    return value
+
+
+def to_epoch_us(value):
+    """
+    Converts a datetime to the number of microseconds since EPOCH.
+
+    Args:
+        value (datetime): The timestamp.
+
+    Returns:
+        int: The number of microseconds.
+    """
+    return (value - EPOCH) // MICROSECOND
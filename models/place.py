@@ -6,8 +6,10 @@ The Place class inherits from the BaseModel, providing basic model functionality
 """
 
 from models.base_model import BaseModel
+from models.engine.registry import register
 
 
+@register
 class Place(BaseModel):
     """
     Represents a place.
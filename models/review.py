@@ -6,8 +6,10 @@ The Review class inherits from the BaseModel, providing basic model functionalit
 """
 
 from models.base_model import BaseModel
+from models.engine.registry import register
 
 
+@register
 class Review(BaseModel):
     """
     Represents a review.
@@ -1,14 +1,34 @@
 #!/usr/bin/python3
 """Unit tests for the HBNB command interpreter."""
 import os
+import shutil
+import tempfile
 import uuid
 import unittest
 import models
 from io import StringIO
 from unittest.mock import patch
 from models.engine.db_storage import DBStorage
+from models.engine import metrics
 from models.engine.file_storage import FileStorage
-from console import HBNBCommand
+from console import HBNBCommand, tokenize
+
+
+STORAGE_FILES = ("", ".log", ".shards", ".search")
+"""tuple: The suffixes of the files the storage keeps next to its snapshot."""
+
+
+def remove(path):
+    """
+    Removes a file or a directory, if it exists.
+
+    Args:
+        path (str): The path.
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
 
 
 class TestHBNBCommand(unittest.TestCase):
@@ -17,27 +37,33 @@ class TestHBNBCommand(unittest.TestCase):
     @classmethod
     def setUpClass(test_cls):
         """
-        Set up the class for testing by renaming the existing JSON file if it exists.
+        Set up the class for testing by renaming the existing storage files, the
+        snapshot, its journal, shards and full-text index, if they exist.
 
         This method is called before any tests in this class are run.
         """
-        try:
-            os.rename("file.json", "tmp_file")
-        except IOError:
-            pass
+        test_cls.path = FileStorage._FileStorage__file_path
+        for suffix in STORAGE_FILES:
+            try:
+                os.rename(test_cls.path + suffix, "tmp_file" + suffix)
+            except IOError:
+                pass
         test_cls.HBNB = HBNBCommand()
 
     @classmethod
     def tearDownClass(test_cls):
         """
-        Tear down the class by restoring the JSON file and closing the database session if needed.
+        Tear down the class by restoring the storage files, removing the lock file and
+        closing the database session if needed.
 
         This method is called after all tests in this class have run.
         """
-        try:
-            os.rename("tmp_file", "file.json")
-        except IOError:
-            pass
+        for suffix in STORAGE_FILES:
+            try:
+                os.rename("tmp_file" + suffix, test_cls.path + suffix)
+            except IOError:
+                pass
+        remove(test_cls.path + ".lock")
         del test_cls.HBNB
         if isinstance(models.storage, DBStorage):
             models.storage._DBStorage__session.close()
@@ -52,16 +78,14 @@ class TestHBNBCommand(unittest.TestCase):
 
     def tearDown(self):
         """
-        Clean up after tests by removing the JSON file if it exists.
+        Clean up after tests by removing the storage files if they exist.
 
         This method is called after each individual test.
         """
-        try:
-            os.remove("file.json")
-        except IOError:
-            pass
+        for suffix in STORAGE_FILES:
+            remove(self.path + suffix)
 
-    @unittest.skipIf(isinstance(models.storage, DBStorage), "Testing with FileStorage")
+    @unittest.skipIf(not isinstance(models.storage, FileStorage), "Testing with FileStorage")
     def test_create(self):
         """
         Test the 'create' command of the HBNBCommand class.
@@ -90,7 +114,7 @@ class TestHBNBCommand(unittest.TestCase):
             self.HBNB.onecmd("create Amenity")
             new_amenity = test.getvalue().strip()
 
-    @unittest.skipIf(isinstance(models.storage, DBStorage), "Testing with FileStorage")
+    @unittest.skipIf(not isinstance(models.storage, FileStorage), "Testing with FileStorage")
     def test_all(self):
         """
         Test the 'all' command of the HBNBCommand class.
@@ -119,7 +143,7 @@ class TestHBNBCommand(unittest.TestCase):
             self.HBNB.onecmd("all Amenity")
             new_amenity = test.getvalue().strip()
 
-    @unittest.skipIf(isinstance(models.storage, DBStorage), "Testing with FileStorage")
+    @unittest.skipIf(not isinstance(models.storage, FileStorage), "Testing with FileStorage")
     def test_create_kwargs(self):
         """
         Test the 'create' command with keyword arguments.
@@ -138,6 +162,194 @@ class TestHBNBCommand(unittest.TestCase):
             self.assertNotIn("'last_name': 'Snow'", user_output)
             self.assertIn("'password': '1234'", user_output)
 
+    @unittest.skipIf(not isinstance(models.storage, FileStorage), "Testing with FileStorage")
+    def test_run_batch(self):
+        """
+        Test running a script of commands in batch mode.
+
+        This test ensures that comments and blank lines are skipped, that 'quit' stops
+        the batch and that the saves of the batch are written.
+        """
+        script = StringIO("# setup\ncreate State\n\ncreate City\nquit\ncreate User\n")
+        with patch("sys.stdout", new=StringIO()) as test:
+            count, elapsed = self.HBNB.run_batch(script)
+            new_state, new_city = test.getvalue().split()
+        self.assertEqual(count, 3)
+        self.assertGreaterEqual(elapsed, 0)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIsNotNone(models.storage.get("State", new_state))
+        self.assertIsNotNone(models.storage.get("City", new_city))
+        self.assertEqual(models.storage.count("User"), 0)
+
+    @unittest.skipIf(not isinstance(models.storage, FileStorage), "Testing with FileStorage")
+    def test_all_output(self):
+        """
+        Test that 'all' prints the same output as printing the list of objects.
+        """
+        with patch("sys.stdout", new=StringIO()):
+            self.HBNB.onecmd("create State")
+            self.HBNB.onecmd("create State")
+        expected = [str(obj) for obj in models.storage.all("State").values()]
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("all State")
+            self.assertEqual(test.getvalue(), str(expected) + "\n")
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("all Review")
+            self.assertEqual(test.getvalue(), "[]\n")
+
+    def test_tokenize(self):
+        """
+        Test splitting command arguments into quoted strings, bare words and literals.
+        """
+        self.assertEqual(tokenize('"1234", "name", "Loft, \\"A\\""'),
+                         [("1234", "string"), ("name", "string"), ('Loft, "A"', "string")])
+        self.assertEqual(tokenize("Place 1234 max_guest 4"),
+                         [("Place", "word"), ("1234", "word"), ("max_guest", "word"), ("4", "word")])
+        self.assertEqual(tokenize("'1234', {'name': 'Loft', 'max_guest': 4}"),
+                         [("1234", "string"), ({"name": "Loft", "max_guest": 4}, "literal")])
+        self.assertEqual(tokenize('1234 {"open": true}'),
+                         [("1234", "word"), ({"open": True}, "literal")])
+        self.assertEqual(tokenize(""), [])
+        for text in ('"1234', "1234, {'name': }"):
+            with self.assertRaises(ValueError):
+                tokenize(text)
+
+    @unittest.skipIf(not isinstance(models.storage, FileStorage), "Testing with FileStorage")
+    def test_dot_syntax(self):
+        """
+        Test the <class name>.<command>(<arguments>) syntax, with an attribute and a
+        value or with a dictionary, and that it prints the same errors as the commands.
+        """
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("create Place")
+            uid = test.getvalue().strip()
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd('Place.update("{}", "name", "Loft, \\"A\\"")'.format(uid))
+            self.HBNB.onecmd('Place.update("{}", "max_guest", 4)'.format(uid))
+            self.HBNB.onecmd("Place.update('{}', {{'latitude': 1, 'rating': 4.5}})".format(uid))
+            self.HBNB.onecmd('update Place {} {{"number_rooms": "3"}}'.format(uid))
+            self.assertEqual(test.getvalue(), "")
+        place = models.storage.get("Place", uid)
+        self.assertEqual(place.name, 'Loft, "A"')
+        self.assertEqual((place.max_guest, place.latitude, place.number_rooms), (4, 1.0, 3))
+        self.assertEqual(place.rating, 4.5)
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd('Place.show("{}")'.format(uid))
+            self.assertEqual(test.getvalue(), str(place) + "\n")
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("Place.count()")
+            self.HBNB.onecmd('Place.update("{}", "max_guest", "four")'.format(uid))
+            self.HBNB.onecmd('Place.update("{}", {{"name": "Barn", "max_guest": "four"}})'.format(uid))
+            self.HBNB.onecmd('update Place {} {{"max_guest": "four"}}'.format(uid))
+            self.HBNB.onecmd('Place.update("{}", {{"amenity_ids": "abc"}})'.format(uid))
+            self.HBNB.onecmd('update Place {} amenity_ids abc'.format(uid))
+            self.HBNB.onecmd('Place.update("{}", "name")'.format(uid))
+            self.HBNB.onecmd('Place.update("{}", {{"name": }})'.format(uid))
+            self.HBNB.onecmd('Place.show("missing")')
+            self.HBNB.onecmd("Nope.show()")
+            self.HBNB.onecmd('Place.destroy("{}")'.format(uid))
+            self.HBNB.onecmd("Place.count()")
+            self.assertEqual(test.getvalue().splitlines(), [
+                "1", "** invalid value for max_guest **", "** invalid value for max_guest **",
+                "** invalid value for max_guest **", "** invalid value for amenity_ids **",
+                "** invalid value for amenity_ids **", "** value missing **",
+                '** invalid literal: {"name": } **', "** no instance found **",
+                "** class doesn't exist **", "0"])
+        self.assertEqual((place.name, place.max_guest, place.amenity_ids), ('Loft, "A"', 4, []))
+
+    def test_query(self):
+        """
+        Test that quoted values of the query predicates may hold spaces, with or
+        without spaces around the operator.
+        """
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("create Place")
+            uid = test.getvalue().strip()
+        self.HBNB.onecmd('update Place {} name "Big House"'.format(uid))
+        place = models.storage.get("Place", uid)
+        for line in ('query Place name=="Big House"', 'query Place name == "Big House"',
+                     'query Place name= "Big House" limit=1'):
+            with patch("sys.stdout", new=StringIO()) as test:
+                self.HBNB.onecmd(line)
+                self.assertEqual(test.getvalue(), str(place) + "\n")
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd('query Place name == "Big')
+            self.HBNB.onecmd('query Place name == "Big"')
+            self.assertEqual(test.getvalue(), '** unterminated string: Place name == "Big **\n')
+
+    def test_profile(self):
+        """
+        Test that 'profile' prints the latencies of the commands, and that 'profile reset'
+        clears them.
+        """
+        self.addCleanup(setattr, metrics.METRICS, "enabled", metrics.METRICS.enabled)
+        metrics.METRICS.enabled = True
+        with patch("sys.stdout", new=StringIO()):
+            self.HBNB.onecmd("profile reset")
+            self.HBNB.onecmd("count State")
+            self.HBNB.onecmd("State.count()")
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("profile console.")
+            lines = test.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("operation"))
+        calls = {line.split()[0]: int(line.split()[1]) for line in lines[1:] if line}
+        self.assertEqual(calls["console.count"], 2)
+        self.assertNotIn("console.default", calls)
+        self.assertNotIn("storage.count", calls)
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("profile reset")
+            self.HBNB.onecmd("profile console.count")
+            self.assertEqual(len(test.getvalue().splitlines()), 1)
+        if not metrics.METRICS.profile():
+            with patch("sys.stdout", new=StringIO()) as test:
+                self.HBNB.onecmd("profile cpu")
+                self.assertIn("HBNB_PROFILE", test.getvalue())
+
+    @unittest.skipIf(not isinstance(models.storage, FileStorage), "Testing with FileStorage")
+    def test_import_export(self):
+        """
+        Test the 'import' and 'export' commands with CSV and JSON Lines files.
+
+        This test ensures that values are converted to the attribute types, that invalid
+        records are skipped and that exported objects import back unchanged.
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        source = os.path.join(tmpdir, "places.csv")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write('name,max_guest,latitude,amenity_ids\n'
+                    'Loft,4,1.5,"[""a""]"\n'
+                    'Cabin,four,2,\n')
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("import Place {}".format(source))
+            self.assertIn("** line 3: max_guest", test.getvalue())
+            self.assertIn("1 Place imported, 1 skipped", test.getvalue())
+        place, = models.storage.all("Place").values()
+        self.assertEqual((place.max_guest, place.latitude), (4, 1.5))
+        self.assertEqual(place.amenity_ids, ["a"])
+        place.rating = 4.5
+        place.tags = {"pool": True}
+        for name in ("places.jsonl", "export.csv"):
+            exported = os.path.join(tmpdir, name)
+            with patch("sys.stdout", new=StringIO()):
+                self.HBNB.onecmd("export Place {}".format(exported))
+            FileStorage._FileStorage__objects = {}
+            with patch("sys.stdout", new=StringIO()):
+                self.HBNB.onecmd("import Place {}".format(exported))
+            copy, = models.storage.all("Place").values()
+            self.assertEqual(copy.to_dict(), place.to_dict())
+        with open(exported, encoding="utf-8") as f:
+            header = f.readline().rstrip().split(",")
+        self.assertEqual(header[:4], ["id", "created_at", "updated_at", "amenity_ids"])
+        self.assertEqual(header[-1], "__extra__")
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("import Place {}".format(os.path.join(tmpdir, "a.txt")))
+            self.assertEqual(test.getvalue(), "** unsupported file format **\n")
+        with patch("sys.stdout", new=StringIO()) as test:
+            self.HBNB.onecmd("export Place")
+            self.assertEqual(test.getvalue(), "** file name missing **\n")
+
 
 if __name__ == '__main__':
     unittest.main()
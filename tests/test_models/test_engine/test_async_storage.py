@@ -0,0 +1,204 @@
+#!/usr/bin/python3
+"""Unit tests for the AsyncStorage facade."""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from models import storage
+from models.engine.async_storage import AsyncStorage
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.engine.journal import Journal
+from models.place import Place
+from models.user import User
+
+
+@unittest.skipIf(not isinstance(storage, FileStorage), "Testing with FileStorage")
+class TestAsyncStorage(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for AsyncStorage over FileStorage."""
+
+    def setUp(self):
+        """
+        Point the storage to an empty temporary file.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "file.json")
+        storage.configure(file_path=self.path)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+
+    def tearDown(self):
+        """
+        Restore the default storage configuration.
+        """
+        storage.configure(file_path="file.json")
+        FileStorage._FileStorage__objects = {}
+        shutil.rmtree(self.tmpdir)
+
+    async def test_save_and_reload(self):
+        """
+        Test that objects saved through the facade are read back by it.
+        """
+        async with AsyncStorage() as astorage:
+            place = Place()
+            place.name = "Loft"
+            users = [User() for _ in range(5)]
+            await astorage.save()
+            FileStorage._FileStorage__objects = {}
+            await astorage.reload()
+            self.assertEqual(await astorage.count(User), 5)
+            self.assertEqual((await astorage.get(Place, place.id)).name, "Loft")
+            self.assertIsNone(await astorage.get(Place, "missing"))
+            self.assertEqual(len(await astorage.query(User, limit=2)), 2)
+            self.assertEqual({u.id async for u in astorage.all(User)}, {u.id for u in users})
+
+    async def test_all_yields_in_batches(self):
+        """
+        Test that iterating over all() returns to the event loop between batches.
+        """
+        for _ in range(10):
+            User()
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(len(seen))
+                await asyncio.sleep(0)
+
+        seen = []
+        async with AsyncStorage(batch_size=3) as astorage:
+            ticker = asyncio.ensure_future(tick())
+            async for obj in astorage.all():
+                seen.append(obj)
+            ticker.cancel()
+        self.assertEqual(len(seen), 10)
+        self.assertTrue({3, 6, 9} & set(ticks))
+
+    async def test_concurrent_saves_are_coalesced(self):
+        """
+        Test that saves requested while a write is running share a single next write,
+        which includes every change made before they were requested.
+        """
+        writes = []
+        save = storage.save
+
+        def slow_save():
+            writes.append(storage.count())
+            save()
+
+        async with AsyncStorage() as astorage:
+            with patch.object(storage, "save", side_effect=slow_save):
+                User()
+                first = asyncio.ensure_future(astorage.save())
+                await asyncio.sleep(0)
+                saves = []
+                for _ in range(10):
+                    User()
+                    saves.append(asyncio.ensure_future(astorage.save()))
+                await asyncio.gather(first, *saves)
+        self.assertLessEqual(len(writes), 2)
+        self.assertEqual(writes[-1], 11)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(User), 11)
+
+    async def test_changes_during_save(self):
+        """
+        Test that objects are created and modified on the event loop without waiting
+        for the save writing the files, and that the next save writes them.
+        """
+        started, resume = threading.Event(), threading.Event()
+
+        def slow(write):
+            def wrapper(*args, **kwargs):
+                started.set()
+                resume.wait(5)
+                return write(*args, **kwargs)
+            return wrapper
+
+        place = Place()
+        loop = asyncio.get_running_loop()
+        with patch.object(FileStorage, "_write_snapshot", slow(FileStorage._write_snapshot)), \
+                patch.object(Journal, "append", slow(Journal.append)):
+            async with AsyncStorage() as astorage:
+                saving = asyncio.ensure_future(astorage.save())
+                self.assertTrue(await loop.run_in_executor(None, started.wait, 5))
+                start = time.monotonic()
+                place.name = "changed"
+                user = User()
+                self.assertLess(time.monotonic() - start, 1)
+                self.assertFalse(resume.is_set())
+                resume.set()
+                await saving
+                await astorage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get(Place, place.id).name, "changed")
+        self.assertIsNotNone(storage.get(User, user.id))
+
+
+class TestAsyncDBStorage(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for AsyncStorage over DBStorage."""
+
+    async def test_save_and_get(self):
+        """
+        Test that the facade can use a database from its executor thread.
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        db = DBStorage(os.path.join(tmpdir, "hbnb.db"))
+        self.addCleanup(db.close)
+        db.reload()
+        with patch("models.base_model.storage", db):
+            async with AsyncStorage(db) as astorage:
+                place = Place()
+                place.name = "Loft"
+                await astorage.save()
+                db.reload()
+                self.assertEqual((await astorage.get(Place, place.id)).name, "Loft")
+                self.assertEqual([p.id async for p in astorage.all(Place)], [place.id])
+
+    async def test_changes_during_save(self):
+        """
+        Test that objects created, modified and deleted on the event loop while a save
+        is running are written by the next save.
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        db = DBStorage(os.path.join(tmpdir, "hbnb.db"))
+        self.addCleanup(db.close)
+        db.reload()
+        started, resume = threading.Event(), threading.Event()
+        row = db._row
+
+        def slow_row(obj):
+            started.set()
+            resume.wait(5)
+            return row(obj)
+
+        loop = asyncio.get_running_loop()
+        with patch("models.base_model.storage", db), patch.object(db, "_row", side_effect=slow_row):
+            async with AsyncStorage(db) as astorage:
+                places = [Place() for _ in range(3)]
+                saving = asyncio.ensure_future(astorage.save())
+                self.assertTrue(await loop.run_in_executor(None, started.wait, 5))
+                for place in places:
+                    place.name = "changed"
+                added = [Place() for _ in range(5)]
+                db.delete(places[0])
+                resume.set()
+                await saving
+                await astorage.save()
+                db.reload()
+                self.assertEqual(await astorage.count(Place), 7)
+                self.assertEqual((await astorage.get(Place, places[1].id)).name, "changed")
+                self.assertIsNone(await astorage.get(Place, places[0].id))
+                self.assertIsNotNone(await astorage.get(Place, added[-1].id))
+
+
+if __name__ == '__main__':
+    unittest.main()
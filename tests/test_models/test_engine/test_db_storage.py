@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+"""Unit tests for the DBStorage engine."""
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.engine.query import Predicate
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+
+class TestDBStorage(unittest.TestCase):
+    """Unit tests for the SQLite storage engine."""
+
+    def setUp(self):
+        """
+        Open a storage on an empty temporary database and make the models use it.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "hbnb.db")
+        self.storage = DBStorage(self.path)
+        self.storage.reload()
+        patcher = patch("models.base_model.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """
+        Close the storage and remove the database.
+        """
+        self.storage._DBStorage__session.close()
+        shutil.rmtree(self.tmpdir)
+
+    def reopen(self):
+        """
+        Close the storage and open the database again.
+
+        Returns:
+            DBStorage: The new storage.
+        """
+        self.storage.close()
+        self.storage = DBStorage(self.path)
+        self.storage.reload()
+        return self.storage
+
+    def test_selected_by_environment(self):
+        """
+        Test that HBNB_TYPE_STORAGE=db makes the models use a DBStorage.
+        """
+        env = dict(os.environ, HBNB_TYPE_STORAGE="db", HBNB_DB_PATH=self.path)
+        output = subprocess.run([sys.executable, "-c", "import models; print(type(models.storage).__name__)"],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output, "DBStorage\n")
+
+    def test_schema(self):
+        """
+        Test that each class has a table in WAL mode, with its foreign keys indexed.
+        """
+        db = sqlite3.connect(self.path)
+        self.addCleanup(db.close)
+        self.assertEqual(db.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+        columns = [row[1] for row in db.execute('PRAGMA table_info("Place")')]
+        self.assertEqual(columns[:4], ["id", "created_at", "updated_at", "city_id"])
+        self.assertEqual(columns[-1], "extra")
+        indexes = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({"ix_City_state_id", "ix_Place_city_id", "ix_Review_place_id"} <= indexes)
+
+    def test_save_and_reload(self):
+        """
+        Test that saved objects are read back with their types and extra attributes.
+        """
+        place = Place()
+        place.max_guest = 4
+        place.latitude = 1.5
+        place.amenity_ids = ["a", "b"]
+        place.pool = True
+        place.save()
+        copy = self.reopen().get(Place, place.id)
+        self.assertEqual(copy.to_dict(), place.to_dict())
+        self.assertIs(self.storage.get("Place", place.id), copy)
+        self.assertEqual(self.storage.count(), 1)
+
+    def test_update_and_delete(self):
+        """
+        Test that updates rewrite the row of the object and deletions remove it, even
+        when a reference to the deleted object is saved afterwards.
+        """
+        state, other = State(), State()
+        state.save()
+        state.name = "California"
+        state.save()
+        self.storage.delete(other)
+        self.assertIsNone(self.storage.get(State, other.id))
+        other.save()
+        storage = self.reopen()
+        self.assertEqual(storage.get(State, state.id).name, "California")
+        self.assertEqual(list(storage.all(State)), ["State." + state.id])
+
+    def test_find(self):
+        """
+        Test that find() returns the objects of a class matching every criterion.
+        """
+        state = State()
+        cities = [City(state_id=state.id, name=name, id=name, created_at="2020-01-01T00:00:00",
+                       updated_at="2020-01-01T00:00:00") for name in ("a", "b")]
+        for city in cities:
+            self.storage.new(city)
+        City().save()
+        self.assertEqual(set(self.storage.find(City, state_id=state.id)), {"City.a", "City.b"})
+        self.assertEqual(list(self.storage.find("City", state_id=state.id, name="b")), ["City.b"])
+
+    def test_query(self):
+        """
+        Test that queries compare class defaults like stored values, and paginate.
+        """
+        for name, price in (("a", 50), ("b", 150), ("c", None)):
+            place = Place()
+            place.name = name
+            if price is not None:
+                place.price_by_night = price
+            place.save()
+        cheap = self.storage.query(Place, [Predicate("price_by_night", "<", 100)],
+                                   order_by="-price_by_night")
+        self.assertEqual([place.name for place in cheap], ["a", "c"])
+        page = self.storage.query(Place, order_by="name", limit=1, offset=1, fields=["name"])
+        self.assertEqual(page, [{"name": "b"}])
+        pool = self.storage.query(Place, [Predicate("pool", "=", True)])
+        self.assertEqual(pool, [])
+
+    def test_spatial_searches(self):
+        """
+        Test the radius, nearest and box searches over the coordinates of places, which
+        leave out the places never located.
+        """
+        for name, latitude, longitude in (("sf", 37.7749, -122.4194), ("la", 34.0522, -118.2437),
+                                          ("fiji", -17.7, 179.9)):
+            place = Place()
+            place.name, place.latitude, place.longitude = name, latitude, longitude
+            place.save()
+        near = self.storage.within_radius(Place, 37.78, -122.41, 20)
+        self.assertEqual([place.name for km, place in near], ["sf"])
+        self.assertEqual([place.name for km, place in self.storage.nearest(Place, 36, -120, 2)],
+                         ["la", "sf"])
+        found = self.storage.within(Place, -20, 179, -15, -179)
+        self.assertEqual([place.name for place in found.values()], ["fiji"])
+        Place().save()
+        self.assertEqual(self.storage.within(Place, -1, -1, 1, 1), {})
+        self.assertEqual([place.name for km, place in self.storage.nearest(Place, 0, 0)], ["la"])
+        with self.assertRaises(ValueError):
+            self.storage.within(State, 0, 0, 1, 1)
+
+    def test_aggregate(self):
+        """
+        Test the aggregates of a numeric attribute grouped by a foreign key.
+        """
+        for price, city in ((50, "c1"), (150, "c1"), (None, "c2")):
+            place = Place()
+            place.city_id = city
+            if price is not None:
+                place.price_by_night = price
+            place.save()
+        stats = self.storage.aggregate(Place, "price_by_night", by="city_id")
+        self.assertEqual(stats["c1"], {"count": 2, "sum": 200, "mean": 100, "min": 50, "max": 150})
+        self.assertEqual(stats["c2"]["max"], 0)
+        self.assertEqual(self.storage.aggregate("Place"), {None: {"count": 3}})
+        with self.assertRaises(ValueError):
+            self.storage.aggregate(Place, "name")
+
+    def test_batch_commits_once(self):
+        """
+        Test that the saves of a batch are only committed when the batch exits.
+        """
+        db = sqlite3.connect(self.path)
+        self.addCleanup(db.close)
+        with self.storage.batch():
+            for _ in range(3):
+                State().save()
+            self.assertEqual(db.execute('SELECT COUNT(*) FROM "State"').fetchone(), (0,))
+        self.assertEqual(db.execute('SELECT COUNT(*) FROM "State"').fetchone(), (3,))
+
+
+    def test_search(self):
+        """
+        Test the full-text search, ranked and kept up to date as objects change.
+        """
+        cabin = Place()
+        cabin.name, cabin.description = "Lake cabin", "A quiet cabin by the lake"
+        loft = Place()
+        loft.name = "City loft"
+        review = Review()
+        review.text = "The cabin was quiet"
+        for obj in (cabin, loft, review):
+            obj.save()
+        results = self.storage.search("quiet cabin")
+        self.assertEqual({o.id for _, o in results}, {cabin.id, review.id})
+        self.assertGreaterEqual(results[0][0], results[1][0])
+        self.assertEqual(self.storage.search("cabin", "Review")[0][1].id, review.id)
+        loft.description = "Near the cabin"
+        loft.save()
+        self.storage.delete(review)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual({o.id for _, o in self.storage.search("cabin")}, {cabin.id, loft.id})
+        self.assertEqual(len(self.storage.search("cabin", limit=1)), 1)
+        self.assertEqual(self.storage.search("!!"), [])
+
+
+class TestDBStorageCompactModels(TestDBStorage):
+    """Runs the DBStorage tests with the compact models enabled in FileStorage."""
+
+    def setUp(self):
+        """
+        Enable the compact models, then open the storage.
+        """
+        self.addCleanup(FileStorage().configure, compact=FileStorage._FileStorage__compact)
+        FileStorage().configure(compact=True)
+        super().setUp()
+
+
+if __name__ == '__main__':
+    unittest.main()
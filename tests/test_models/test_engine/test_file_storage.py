@@ -0,0 +1,1272 @@
+#!/usr/bin/python3
+"""Unit tests for the FileStorage engine."""
+import os
+import shutil
+import io
+import subprocess
+import sys
+import threading
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.engine.serializers import JSONSerializer, convert
+from models.engine.query import Predicate, parse
+from models.engine import analytics
+from models.engine import metrics
+from models.engine import registry
+from models.engine.search import TextIndex
+from models.engine.locking import RWLock, fcntl
+from models.base_model import BaseModel
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.user import User
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+"""str: The root of the repository, where the scripts of the test processes run."""
+
+
+def process_env(path, **env):
+    """
+    Returns the environment of a Python process using the storage file at a path.
+    The HBNB_* variables this process was started with are left out, so that the
+    other process stores its objects the way the test configures it.
+
+    Args:
+        path (str): The file path of the snapshot.
+        **env: The HBNB_* variables to set.
+
+    Returns:
+        dict: The environment.
+    """
+    result = {k: v for k, v in os.environ.items() if not k.startswith("HBNB_")}
+    result.update(env, HBNB_FILE_PATH=path)
+    return result
+
+
+DEFAULTS = {"mode": "snapshot", "compact_threshold": 1000, "compact": False, "format": "json",
+            "durability": "flush", "commit_size": 0, "commit_interval": 0, "shared": False,
+            "shards": 0}
+"""dict: The storage configuration every test starts from, whatever the HBNB_* variables."""
+
+
+@unittest.skipIf(not isinstance(storage, FileStorage), "Testing with FileStorage")
+class StorageTestCase(unittest.TestCase):
+    """Base class pointing the storage to a temporary file for each test."""
+
+    options = {}
+
+    def setUp(self):
+        """
+        Point the storage to an empty temporary file, configured with DEFAULTS and
+        the options of the test class.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "file.json")
+        storage.configure(file_path=self.path, **dict(DEFAULTS, **self.options))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+
+    def tearDown(self):
+        """
+        Restore the default storage configuration.
+        """
+        storage.configure(file_path="file.json", **DEFAULTS)
+        FileStorage._FileStorage__objects = {}
+        shutil.rmtree(self.tmpdir)
+
+
+class TestFileStorageJournal(StorageTestCase):
+    """Unit tests for the journal mode of FileStorage."""
+
+    options = {"mode": "journal", "compact_threshold": 1000}
+
+    def test_save_appends_only_changed_records(self):
+        """
+        Test that a save appends one entry per changed object to the journal.
+        """
+        users = [User() for _ in range(3)]
+        storage.save()
+        users[0].save()
+        with open(storage.journal().path, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 4)
+        self.assertFalse(os.path.isfile(self.path))
+
+    def test_reload_replays_journal(self):
+        """
+        Test that reload applies updates and tombstones from the journal.
+        """
+        user = User()
+        place = Place()
+        storage.save()
+        user.first_name = "Betty"
+        user.save()
+        storage.delete(place)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.all()["User." + user.id].first_name, "Betty")
+        self.assertNotIn("Place." + place.id, storage.all())
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        """
+        Test that reaching the threshold rewrites the snapshot and empties the journal.
+        """
+        storage.configure(compact_threshold=3)
+        users = [User() for _ in range(3)]
+        storage.save()
+        self.assertTrue(os.path.isfile(self.path))
+        self.assertFalse(os.path.isfile(storage.journal().path))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(len(storage.all()), len(users))
+
+    def test_torn_last_entry_is_ignored(self):
+        """
+        Test that a partially written last journal line does not break reload, and
+        is only cut off by the next append.
+        """
+        user = User()
+        storage.save()
+        with open(storage.journal().path, "a", encoding="utf-8") as f:
+            f.write('{"key": "User.x", "val')
+        size = os.path.getsize(storage.journal().path)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.all()), ["User." + user.id])
+        self.assertEqual(os.path.getsize(storage.journal().path), size)
+        other = User()
+        storage.save()
+        storage.reload()
+        self.assertEqual(set(storage.all()), {"User." + user.id, "User." + other.id})
+
+    def test_corrupt_middle_entry_raises(self):
+        """
+        Test that a corrupt entry followed by valid ones raises instead of dropping
+        them, and leaves the journal untouched.
+        """
+        User(), User()
+        storage.save()
+        with open(storage.journal().path, encoding="utf-8") as f:
+            lines = f.readlines()
+        content = lines[0] + '{"key": "User.x", "val\n' + lines[1]
+        with open(storage.journal().path, "w", encoding="utf-8") as f:
+            f.write(content)
+        FileStorage._FileStorage__objects = {}
+        with self.assertRaisesRegex(ValueError, "line 2"):
+            storage.reload()
+            storage.all()
+        with open(storage.journal().path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), content)
+
+
+class TestFileStorageDirtyTracking(StorageTestCase):
+    """Unit tests for the serialization of changed objects only."""
+
+    def test_save_encodes_only_dirty_objects(self):
+        """
+        Test that a save after one update calls to_dict() on that object only.
+        """
+        places = [Place() for _ in range(5)]
+        storage.save()
+        places[2].name = "Loft"
+        with patch.object(Place, "to_dict", autospec=True,
+                          side_effect=Place.to_dict) as to_dict:
+            storage.save()
+        self.assertEqual(to_dict.call_count, 1)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.all()["Place." + places[2].id].name, "Loft")
+        self.assertEqual(len(storage.all()), 5)
+
+    def test_deleted_object_is_not_saved(self):
+        """
+        Test that a deleted object disappears from the snapshot, and that saving a
+        reference to it afterwards does not store it again.
+        """
+        user = User()
+        storage.save()
+        storage.delete(user)
+        user.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.all(), {})
+
+
+class TestFileStorageIndexes(StorageTestCase):
+    """Unit tests for the secondary indexes over foreign keys."""
+
+    def test_find_by_foreign_key(self):
+        """
+        Test that find() returns the objects referencing a given id.
+        """
+        cities = [City(), City()]
+        places = [Place() for _ in range(3)]
+        for i, place in enumerate(places):
+            place.city_id = cities[i % 2].id
+        found = storage.find(Place, city_id=cities[0].id)
+        self.assertEqual(set(found), {"Place." + places[0].id, "Place." + places[2].id})
+        self.assertEqual(storage.find("Place", city_id="nowhere"), {})
+
+    def test_index_follows_updates_and_deletes(self):
+        """
+        Test that the index stays consistent after it was built.
+        """
+        review = Review()
+        review.place_id = "a"
+        self.assertEqual(list(storage.find(Review, place_id="a").values()), [review])
+        review.place_id = "b"
+        self.assertEqual(storage.find(Review, place_id="a"), {})
+        other = Review()
+        other.place_id = "b"
+        other.user_id = "u"
+        self.assertEqual(len(storage.find(Review, place_id="b")), 2)
+        self.assertEqual(list(storage.find(Review, place_id="b", user_id="u")), ["Review." + other.id])
+        storage.delete(review)
+        self.assertEqual(list(storage.find(Review, place_id="b")), ["Review." + other.id])
+
+    def test_index_is_rebuilt_after_reload(self):
+        """
+        Test that objects loaded from the file are indexed.
+        """
+        city = City()
+        city.state_id = "s"
+        storage.save()
+        storage.find(City, state_id="s")
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.find(City, state_id="s")), ["City." + city.id])
+
+
+class TestFileStoragePartitions(StorageTestCase):
+    """Unit tests for the per-class partitions."""
+
+    def test_all_and_count_by_class(self):
+        """
+        Test that all(cls) and count(cls) only see the objects of that class.
+        """
+        users = [User() for _ in range(3)]
+        place = Place()
+        self.assertEqual(set(storage.all(User)), {"User." + u.id for u in users})
+        self.assertEqual(storage.all("Place"), {"Place." + place.id: place})
+        self.assertEqual(storage.count(User), 3)
+        self.assertEqual(storage.count("Review"), 0)
+        self.assertEqual(storage.count(), 4)
+        storage.delete(users[0])
+        self.assertEqual(storage.count(User), 2)
+        self.assertEqual(len(storage.all()), 3)
+
+    def test_get(self):
+        """
+        Test that get() returns a stored object or None.
+        """
+        user = User()
+        self.assertIs(storage.get(User, user.id), user)
+        self.assertIsNone(storage.get("Place", user.id))
+
+    def test_partitions_follow_reload(self):
+        """
+        Test that the partitions are rebuilt when the objects are reloaded.
+        """
+        User()
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(storage.count(User), 0)
+        storage.reload()
+        self.assertEqual(storage.count(User), 1)
+
+    def test_all_changed_in_place(self):
+        """
+        Test that setting and deleting keys of the mapping returned by all() stores
+        and deletes the objects, keeping the partitions consistent.
+        """
+        place, other = Place(), Place()
+        storage.save()
+        del storage.all()["Place." + place.id]
+        self.assertIsNone(storage.get(Place, place.id))
+        self.assertEqual(storage.count("Place"), 1)
+        self.assertEqual(list(storage.all("Place")), ["Place." + other.id])
+        storage.all(Place).pop("Place." + other.id)
+        self.assertEqual(storage.count(), 0)
+        storage.all()["Place." + place.id] = place
+        self.assertIs(storage.get(Place, place.id), place)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.all(Place)), ["Place." + place.id])
+
+    def test_all_is_live_view(self):
+        """
+        Test that all() returns a view reflecting the later changes, and that copy()
+        returns a dictionary the changes leave untouched.
+        """
+        place = Place()
+        objects, places, copy = storage.all(), storage.all(Place), storage.all().copy()
+        self.assertIs(type(copy), dict)
+        user = User()
+        self.assertIn("User." + user.id, objects)
+        self.assertNotIn("User." + user.id, places)
+        self.assertNotIn("User." + user.id, copy)
+        storage.delete(place)
+        self.assertEqual(len(places), 0)
+        self.assertEqual(objects, {"User." + user.id: user})
+        self.assertEqual(copy, {"Place." + place.id: place})
+
+
+class TestFileStorageLazyReload(StorageTestCase):
+    """Unit tests for the deferred, incremental reload."""
+
+    def test_objects_are_built_on_first_access(self):
+        """
+        Test that reload() instantiates only the objects that are looked up.
+        """
+        users = [User() for _ in range(3)]
+        Place()
+        storage.save()
+        storage.reload()
+        with patch.object(User, "__init__", autospec=True,
+                          side_effect=User.__init__) as init:
+            self.assertEqual(storage.count(User), 3)
+            self.assertEqual(init.call_count, 0)
+            self.assertEqual(storage.get(User, users[1].id).id, users[1].id)
+            self.assertEqual(init.call_count, 1)
+            self.assertEqual(len(storage.all(User)), 3)
+            self.assertEqual(init.call_count, 3)
+        self.assertEqual(len(storage.all()), 4)
+
+    def test_untouched_records_are_saved_back(self):
+        """
+        Test that a save after reload keeps the objects that were never instantiated.
+        """
+        users = [User() for _ in range(3)]
+        storage.save()
+        storage.reload()
+        storage.get(User, users[0].id).first_name = "Ada"
+        storage.save()
+        storage.reload()
+        self.assertEqual(storage.count(User), 3)
+        self.assertEqual(storage.get(User, users[0].id).first_name, "Ada")
+
+    def test_timestamps_without_microseconds(self):
+        """
+        Test that timestamps written by isoformat() for a whole second are read back.
+        """
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"User.1": {"id": "1", "created_at": "2020-02-18T14:21:12", '
+                    '"updated_at": 1582035672000001, "__class__": "User"}}')
+        storage.reload()
+        user = storage.get(User, "1")
+        self.assertEqual(user.created_at.isoformat(), "2020-02-18T14:21:12")
+        self.assertEqual(user.updated_at.isoformat(), "2020-02-18T14:21:12.000001")
+
+    def test_iter_snapshot_across_chunks(self):
+        """
+        Test that records split across read chunks are parsed correctly.
+        """
+        text = '{"a.1": {"x": "}, {"}, \n "b.2" :{"y": [1, 2]} }'
+        serializer = JSONSerializer()
+        pairs = list(serializer.read_snapshot(io.StringIO(text), chunk_size=3))
+        self.assertEqual(pairs, [("a.1", '{"x": "}, {"}'), ("b.2", '{"y": [1, 2]}')])
+        self.assertEqual(list(serializer.read_snapshot(io.StringIO("{}"))), [])
+
+
+class TestFileStorageCompact(StorageTestCase):
+    """Unit tests for the compact representation of the models."""
+
+    options = {"compact": True}
+
+    def test_declared_attributes_use_slots(self):
+        """
+        Test that compact instances keep declared attributes out of __dict__.
+        """
+        place = storage.classes()["Place"]()
+        place.name = "Loft"
+        place.max_guest = 4
+        self.assertIsInstance(place, Place)
+        self.assertEqual(type(place).__name__, "Place")
+        self.assertEqual(place.number_rooms, 0)
+        self.assertEqual(place.to_dict()["name"], "Loft")
+        self.assertNotIn("number_rooms", place.to_dict())
+        self.assertNotIn("_extra", place.to_dict())
+        self.assertEqual(place.__dict__, {})
+        self.assertIn("'max_guest': 4", str(place))
+        with self.assertRaises(AttributeError):
+            place.nickname
+
+    def test_extra_attributes_and_reload(self):
+        """
+        Test that undeclared attributes survive a save and a reload.
+        """
+        user = storage.classes()["User"]()
+        user.email = "a@b.c"
+        user.age = 9
+        storage.save()
+        storage.reload()
+        loaded = storage.get("User", user.id)
+        self.assertIsNot(loaded, user)
+        self.assertEqual((loaded.email, loaded.age), ("a@b.c", 9))
+        self.assertEqual(loaded.to_dict(), user.to_dict())
+
+    def test_foreign_keys_are_interned(self):
+        """
+        Test that equal foreign keys of different objects share one string.
+        """
+        Review = storage.classes()["Review"]
+        first, second = Review(), Review()
+        first.place_id = "".join(["place", "-1"])
+        second.place_id = "".join(["place", "-1"])
+        self.assertIs(first.place_id, second.place_id)
+        self.assertEqual(len(storage.find(Review, place_id="place-1")), 2)
+
+
+class TestFileStorageBinary(StorageTestCase):
+    """Unit tests for the binary file format."""
+
+    options = {"format": "binary"}
+
+    def test_round_trip(self):
+        """
+        Test that every kind of attribute value survives a save and a reload.
+        """
+        place = Place()
+        place.name = "Caf\u00e9"
+        place.max_guest = 4
+        place.latitude = 37.77
+        place.amenity_ids = ["a", "b"]
+        place.extra = {"big": 1 << 70, "flag": True, "none": None}
+        storage.save()
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(5), b"HBNB\x01")
+        storage.reload()
+        loaded = storage.get(Place, place.id)
+        self.assertIsNot(loaded, place)
+        self.assertEqual(loaded.to_dict(), place.to_dict())
+
+    def test_journal_and_conversion(self):
+        """
+        Test the binary journal and the conversion of a snapshot to JSON.
+        """
+        storage.configure(mode="journal")
+        users = [User(), User()]
+        storage.save()
+        storage.delete(users[0])
+        users[1].first_name = "Grace"
+        storage.save()
+        storage.compact()
+        json_path = os.path.join(self.tmpdir, "converted.json")
+        self.assertEqual(convert(self.path, "binary", json_path, "json"), 1)
+        storage.configure(file_path=json_path, format="json")
+        storage.reload()
+        self.assertEqual(storage.get(User, users[1].id).first_name, "Grace")
+        self.assertEqual(storage.count(), 1)
+
+    def test_corrupt_journal_frame_raises(self):
+        """
+        Test that a whole journal frame whose key is not a storage key raises.
+        """
+        storage.configure(mode="journal")
+        User(), User()
+        storage.save()
+        with open(storage.journal().path, "r+b") as f:
+            key_size = f.read(2)[0]
+            f.seek(6)
+            f.write(b"x" * key_size)
+        FileStorage._FileStorage__objects = {}
+        with self.assertRaisesRegex(ValueError, "corrupt frame 1"):
+            storage.reload()
+            storage.all()
+
+
+class TestFileStorageDurability(StorageTestCase):
+    """Unit tests for the crash-safe saves."""
+
+    def test_failed_save_keeps_previous_file(self):
+        """
+        Test that an error while writing leaves the previous snapshot intact.
+        """
+        user = User()
+        storage.save()
+        with open(self.path, encoding="utf-8") as f:
+            before = f.read()
+        User()
+        with patch.object(JSONSerializer, "write_snapshot", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                storage.save()
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ["file.json", "file.json.lock"])
+        storage.reload()
+        self.assertEqual(list(storage.all()), ["User." + user.id])
+
+    def test_every_level_saves(self):
+        """
+        Test that each durability level writes a readable snapshot and journal.
+        """
+        for durability in ("none", "flush", "fsync"):
+            for mode in ("snapshot", "journal"):
+                storage.configure(durability=durability, mode=mode)
+                user = User()
+                storage.save()
+                storage.reload()
+                self.assertIsNotNone(storage.get(User, user.id))
+        with self.assertRaises(ValueError):
+            storage.configure(durability="sometimes")
+
+
+class TestFileStorageGroupCommit(StorageTestCase):
+    """Unit tests for the batching of saves."""
+
+    def test_batch_writes_once(self):
+        """
+        Test that the saves requested inside batch() are written once at the end.
+        """
+        with patch.object(FileStorage, "compact", autospec=True,
+                          side_effect=FileStorage.compact) as compact:
+            with storage.batch():
+                with storage.batch():
+                    for _ in range(5):
+                        User().save()
+                self.assertEqual(compact.call_count, 0)
+            self.assertEqual(compact.call_count, 1)
+        storage.reload()
+        self.assertEqual(storage.count(User), 5)
+
+    def test_group_commit_by_size(self):
+        """
+        Test that group commit writes every commit_size saves, and flush() the rest.
+        """
+        storage.configure(commit_size=3)
+        with patch.object(FileStorage, "compact", autospec=True,
+                          side_effect=FileStorage.compact) as compact:
+            for _ in range(7):
+                User().save()
+            self.assertEqual(compact.call_count, 2)
+            storage.flush()
+            self.assertEqual(compact.call_count, 3)
+            storage.flush()
+            self.assertEqual(compact.call_count, 3)
+        storage.reload()
+        self.assertEqual(storage.count(User), 7)
+
+    def test_group_commit_by_interval(self):
+        """
+        Test that group commit writes once the interval has passed.
+        """
+        storage.configure(commit_interval=3600)
+        with patch("models.engine.file_storage.time.monotonic", return_value=10 ** 12):
+            User().save()
+        self.assertTrue(os.path.isfile(self.path))
+        User().save()
+        storage.reload()
+        self.assertEqual(storage.count(User), 1)
+
+    def test_group_commit_by_interval_timer(self):
+        """
+        Test that a save deferred by the interval is written without another save.
+        """
+        storage.configure(commit_interval=0.1)
+        User().save()
+        user = User()
+        user.save()
+        deadline = time.monotonic() + 5
+        while FileStorage._FileStorage__deferred and time.monotonic() < deadline:
+            time.sleep(0.01)
+        storage.reload()
+        self.assertIsNotNone(storage.get(User, user.id))
+
+    def test_group_commit_flushed_on_exit(self):
+        """
+        Test that the saves deferred by group commit are written when a program using
+        the models, and not the console, exits.
+        """
+        code = "from models.user import User; User().save()"
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True,
+                       env=process_env(self.path, HBNB_COMMIT_SIZE="100"))
+        storage.reload()
+        self.assertEqual(storage.count(User), 1)
+
+
+class TestFileStorageQuery(StorageTestCase):
+    """Unit tests for the query API of FileStorage."""
+
+    def setUp(self):
+        """
+        Store places with various prices and capacities in two cities.
+        """
+        super().setUp()
+        self.places = []
+        for name, price, guests, city in (("a", 50, 4, "c1"), ("b", 150, 6, "c1"),
+                                          ("c", 80, 2, "c2"), ("d", None, 5, "c2")):
+            place = Place()
+            place.name, place.max_guest, place.city_id = name, guests, city
+            if price is not None:
+                place.price_by_night = price
+            self.places.append(place)
+        storage.save()
+
+    def names(self, results):
+        """
+        Returns the names of the places of a result.
+        """
+        return [place.name for place in results]
+
+    def test_predicates_and_order(self):
+        """
+        Test filtering with comparison predicates and ordering in both directions.
+        """
+        options = parse(["price_by_night<100", "max_guest>=4", "order_by=name"],
+                        storage.attributes()["Place"])
+        self.assertEqual(self.names(storage.query(Place, **options)), ["a", "d"])
+        self.assertEqual(self.names(storage.query(Place, order_by="-price_by_night")),
+                         ["b", "c", "a", "d"])
+        self.assertEqual(self.names(storage.query("Place", [Predicate("name", "!=", "a")],
+                                                  order_by="max_guest")), ["c", "d", "b"])
+
+    def test_pagination_and_projection(self):
+        """
+        Test limit, offset and the projection of selected fields.
+        """
+        page = storage.query(Place, order_by="max_guest", limit=2, offset=1,
+                             fields=["name", "max_guest"])
+        self.assertEqual(page, [{"name": "a", "max_guest": 4}, {"name": "d", "max_guest": 5}])
+        self.assertEqual(storage.query(Place, offset=4), [])
+
+    def test_foreign_key_uses_index(self):
+        """
+        Test that an equality on a foreign key only instantiates the matching objects.
+        """
+        storage.reload()
+        result = storage.query(Place, [Predicate("city_id", "=", "c2"),
+                                       Predicate("max_guest", ">", 2)])
+        self.assertEqual(self.names(result), ["d"])
+        self.assertEqual(len(FileStorage._FileStorage__objects), 2)
+
+
+class TestFileStorageSpatial(StorageTestCase):
+    """Unit tests for the spatial searches of FileStorage."""
+
+    def setUp(self):
+        """
+        Store places around San Francisco and one across the antimeridian.
+        """
+        super().setUp()
+        self.places = {}
+        for name, latitude, longitude in (("sf", 37.7749, -122.4194), ("oakland", 37.8044, -122.2712),
+                                          ("la", 34.0522, -118.2437), ("fiji", -17.7, 179.9)):
+            place = Place()
+            place.name, place.latitude, place.longitude = name, latitude, longitude
+            self.places[name] = place
+        storage.save()
+
+    def names(self, results):
+        """
+        Returns the names of the places of a distance search.
+        """
+        return [place.name for km, place in results]
+
+    def test_searches(self):
+        """
+        Test the radius, nearest and box searches, including a box across the antimeridian.
+        """
+        storage.reload()
+        self.assertEqual(self.names(storage.within_radius(Place, 37.78, -122.41, 20)), ["sf", "oakland"])
+        self.assertEqual(len(FileStorage._FileStorage__objects), 2)
+        self.assertEqual(self.names(storage.nearest("Place", 36, -120, 2)), ["la", "oakland"])
+        found = storage.within(Place, 33, -123, 36, -117)
+        self.assertEqual([place.name for place in found.values()], ["la"])
+        found = storage.within(Place, -20, 179, -15, -179)
+        self.assertEqual([place.name for place in found.values()], ["fiji"])
+
+    def test_unlocated_places_left_out(self):
+        """
+        Test that the places still at the default coordinates are not found, whether
+        they were read from the file or created since.
+        """
+        Place()
+        storage.save()
+        storage.reload()
+        Place()
+        self.assertEqual(storage.within(Place, -1, -1, 1, 1), {})
+        self.assertEqual(self.names(storage.nearest(Place, 0, 0)), ["la"])
+
+    def test_index_follows_changes(self):
+        """
+        Test that moving, creating and deleting places updates the spatial index.
+        """
+        self.assertEqual(self.names(storage.nearest(Place, 34, -118)), ["la"])
+        self.places["sf"].latitude, self.places["sf"].longitude = 34.01, -118.01
+        storage.delete(self.places["la"])
+        self.assertEqual(self.names(storage.nearest(Place, 34, -118)), ["sf"])
+        home = Place()
+        home.latitude, home.longitude = 34, -118
+        self.assertEqual(self.names(storage.nearest(Place, 34, -118, 2)), ["", "sf"])
+        with self.assertRaises(ValueError):
+            storage.nearest(User, 0, 0)
+
+
+class TestFileStorageAggregate(StorageTestCase):
+    """Unit tests for the aggregates of FileStorage."""
+
+    def setUp(self):
+        """
+        Store places in two cities and reviews of two places.
+        """
+        super().setUp()
+        self.places = []
+        for price, guests, city in ((50, 4, "c1"), (150, 6, "c1"), (80, 2, "c2"), (None, 5, "c2")):
+            place = Place()
+            place.max_guest, place.city_id = guests, city
+            if price is not None:
+                place.price_by_night = price
+            self.places.append(place)
+        for place_id in ("p1", "p1", "p2"):
+            review = Review()
+            review.place_id = place_id
+        storage.save()
+
+    def check(self):
+        """
+        Test the aggregates of the stored places and reviews.
+        """
+        storage.reload()
+        stats = storage.aggregate(Place, "price_by_night", by="city_id")
+        self.assertEqual(stats["c1"], {"count": 2, "sum": 200, "mean": 100, "min": 50, "max": 150})
+        self.assertEqual(stats["c2"], {"count": 2, "sum": 80, "mean": 40, "min": 0, "max": 80})
+        self.assertEqual(storage.aggregate(Place, "max_guest")[None]["mean"], 4.25)
+        self.assertEqual(storage.aggregate("Review", by="place_id"),
+                         {"p1": {"count": 2}, "p2": {"count": 1}})
+        self.assertEqual(len(FileStorage._FileStorage__objects), 0)
+        with self.assertRaises(ValueError):
+            storage.aggregate(Place, "name")
+
+    def test_aggregate_numpy(self):
+        """
+        Test the aggregates computed with NumPy, when it is installed.
+        """
+        if analytics.numpy is None:
+            self.skipTest("NumPy is not installed")
+        self.check()
+
+    def test_aggregate_python(self):
+        """
+        Test the aggregates computed without NumPy.
+        """
+        with patch.object(analytics, "numpy", None):
+            self.check()
+
+    def test_columns_follow_changes(self):
+        """
+        Test that updating, creating and deleting places updates the aggregates.
+        """
+        self.assertEqual(storage.aggregate(Place, "price_by_night")[None]["sum"], 280)
+        self.places[0].price_by_night = 60
+        self.places[2].city_id = "c1"
+        storage.delete(self.places[1])
+        Place().price_by_night = 1000
+        stats = storage.aggregate(Place, "price_by_night", by="city_id")
+        self.assertEqual(stats["c1"]["sum"], 140)
+        self.assertEqual(stats[""]["sum"], 1000)
+        self.assertEqual(stats["c2"]["count"], 1)
+
+
+class TestFileStorageSearch(StorageTestCase):
+    """Unit tests for the full-text search of FileStorage."""
+
+    def setUp(self):
+        """
+        Store places and a review with text attributes.
+        """
+        super().setUp()
+        self.cabin = Place()
+        self.cabin.name, self.cabin.description = "Lake cabin", "A quiet cabin by the lake"
+        self.loft = Place()
+        self.loft.name, self.loft.description = "City loft", "Loft near the lake and the station"
+        self.review = Review()
+        self.review.text = "The cabin was quiet, the cabin was clean"
+        storage.save()
+
+    def keys(self, text, cls=None):
+        """
+        Return the keys of the results of a search, in order.
+        """
+        return [type(o).__name__ + "." + o.id for _, o in storage.search(text, cls)]
+
+    def test_ranking(self):
+        """
+        Test that results are ranked by relevance and filtered by class.
+        """
+        results = storage.search("quiet cabin")
+        self.assertEqual({"Place." + self.cabin.id, "Review." + self.review.id},
+                         set(self.keys("quiet cabin")))
+        self.assertTrue(all(a[0] >= b[0] for a, b in zip(results, results[1:])))
+        self.assertEqual(self.keys("LAKE", Place)[0], "Place." + self.cabin.id)
+        self.assertEqual(self.keys("lake", "Review"), [])
+        self.assertEqual(storage.search("station", limit=1)[0][1], self.loft)
+        self.assertEqual(storage.search("  "), [])
+
+    def test_index_follows_changes(self):
+        """
+        Test that creating, updating and deleting objects updates the results.
+        """
+        self.assertEqual(self.keys("station"), ["Place." + self.loft.id])
+        self.loft.description = "Loft downtown"
+        storage.delete(self.cabin)
+        review = Review()
+        review.text = "Next to the station"
+        self.assertEqual(self.keys("station"), ["Review." + review.id])
+        self.assertEqual(self.keys("cabin"), ["Review." + self.review.id])
+
+    def test_index_saved_with_snapshot(self):
+        """
+        Test that the index saved with the snapshot is loaded back instead of being
+        rebuilt, and is ignored once the snapshot changed without it.
+        """
+        storage.search("cabin")
+        self.assertFalse(os.path.isfile(self.path + ".search"))
+        User().save()
+        self.assertTrue(os.path.isfile(self.path + ".search"))
+        storage.reload()
+        with patch.object(TextIndex, "update") as update:
+            self.assertEqual(len(storage.search("cabin")), 2)
+            update.assert_not_called()
+        self.assertEqual(len(FileStorage._FileStorage__objects), 2)
+        self.assertIsNotNone(TextIndex.load(self.path + ".search", storage._signature()))
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{}")
+        storage.reload()
+        self.assertEqual(storage.search("cabin"), [])
+
+    def test_failed_index_save_keeps_previous_file(self):
+        """
+        Test that an error while writing the index leaves the previous one intact.
+        """
+        storage.search("cabin")
+        User().save()
+        with open(self.path + ".search", encoding="utf-8") as f:
+            before = f.read()
+
+        def torn(index, f):
+            f.write('{"signature": ')
+            raise OSError("disk full")
+        User()
+        with patch.object(TextIndex, "save", torn):
+            with self.assertRaises(OSError):
+                storage.save()
+        with open(self.path + ".search", encoding="utf-8") as f:
+            self.assertEqual(f.read(), before)
+        self.assertFalse([name for name in os.listdir(self.tmpdir) if name.endswith(".tmp")])
+
+
+class TestFileStorageSearchJournal(StorageTestCase):
+    """Unit tests for the full-text search of FileStorage in journal mode."""
+
+    options = {"mode": "journal", "compact_threshold": 1000}
+
+    def test_journal_changes_applied_to_saved_index(self):
+        """
+        Test that the changes read from the journal are applied to the saved index.
+        """
+        place = Place()
+        place.name = "Old barn"
+        storage.save()
+        storage.compact()
+        storage.search("barn")
+        storage.compact()
+        place.name = "New mill"
+        other = Place()
+        other.name = "Old mill"
+        storage.save()
+        storage.reload()
+        self.assertEqual(storage.search("barn"), [])
+        self.assertEqual({o.id for _, o in storage.search("mill")}, {place.id, other.id})
+
+
+WORKER = """
+import sys
+from models import storage
+from models.user import User
+for _ in range(int(sys.argv[2])):
+    User().save()
+    with storage.locked():
+        place = storage.get("Place", sys.argv[1])
+        place.number_rooms += 1
+        place.save()
+"""
+
+
+class TestFileStorageConcurrency(StorageTestCase):
+    """Unit tests for FileStorage shared by several threads and processes."""
+
+    def run_processes(self, count, *args, **env):
+        """
+        Run the same script in several Python processes at once, using the storage file.
+        """
+        env = process_env(self.path, **env)
+        processes = [subprocess.Popen([sys.executable, "-c"] + list(args), cwd=ROOT, env=env)
+                     for _ in range(count)]
+        for process in processes:
+            self.assertEqual(process.wait(timeout=60), 0)
+
+    def test_rwlock(self):
+        """
+        Test that the write side excludes readers, and that a reader cannot upgrade.
+        """
+        lock = RWLock()
+        events = []
+        with lock.write():
+            reader = threading.Thread(target=lambda: lock.read().__enter__() or events.append(1))
+            reader.start()
+            reader.join(0.1)
+            self.assertEqual(events, [])
+            with lock.read():
+                self.assertTrue(lock.held())
+        reader.join()
+        self.assertEqual(events, [1])
+        with lock.read(), lock.read():
+            with self.assertRaises(RuntimeError):
+                lock.acquire_write()
+
+    def test_threads_do_not_lose_updates(self):
+        """
+        Test many threads creating, updating and reading objects at once.
+        """
+        place = Place()
+        place.number_rooms = 0
+        storage.save()
+        errors = []
+
+        def write():
+            try:
+                for _ in range(25):
+                    User().save()
+                    with storage.locked():
+                        place.number_rooms += 1
+                        place.save()
+            except Exception as error:
+                errors.append(error)
+
+        def read():
+            try:
+                for _ in range(100):
+                    storage.count(User)
+                    storage.query(User, limit=5)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=write) for _ in range(8)]
+        threads += [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(User), 200)
+        self.assertEqual(storage.get(Place, place.id).number_rooms, 200)
+
+    @unittest.skipIf(fcntl is None, "File locking requires fcntl")
+    def test_processes_do_not_lose_updates(self):
+        """
+        Test many processes creating objects and incrementing a counter at once, in
+        both storage modes.
+        """
+        for mode in ("snapshot", "journal"):
+            with self.subTest(mode=mode):
+                storage.configure(mode=mode, compact_threshold=20)
+                storage.reload()
+                for obj in list(storage.all().values()):
+                    storage.delete(obj)
+                place = Place()
+                place.number_rooms = 0
+                storage.save()
+                storage.compact()
+                self.run_processes(4, WORKER, place.id, "20", HBNB_STORAGE_MODE=mode,
+                                   HBNB_COMPACT_THRESHOLD="20")
+                storage.reload()
+                self.assertEqual(storage.count(User), 80)
+                self.assertEqual(storage.get(Place, place.id).number_rooms, 80)
+
+    @unittest.skipIf(fcntl is None, "File locking requires fcntl")
+    def test_save_merges_changes_of_other_processes(self):
+        """
+        Test that a save keeps the objects another process saved, and updates in place
+        the objects it modified.
+        """
+        place = Place()
+        place.name = "Old name"
+        storage.save()
+        self.run_processes(1, "from models import storage\n"
+                              "place = storage.get('Place', '{}')\n"
+                              "place.name = 'New name'\n"
+                              "place.save()\n"
+                              "from models.user import User\n"
+                              "User().save()".format(place.id))
+        self.assertEqual(place.name, "Old name")
+        self.assertEqual(storage.count(User), 0)
+        user = User()
+        user.save()
+        self.assertEqual(place.name, "New name")
+        self.assertIs(storage.get(Place, place.id), place)
+        self.assertEqual(storage.count(User), 2)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(User), 2)
+        self.assertEqual(storage.get(Place, place.id).name, "New name")
+
+    @unittest.skipIf(fcntl is None, "File locking requires fcntl")
+    def test_shared_reads_pick_up_changes(self):
+        """
+        Test that with the shared option, reads see the objects other processes saved.
+        """
+        storage.configure(shared=True)
+        self.addCleanup(storage.configure, shared=False)
+        User().save()
+        self.run_processes(1, "from models.user import User\nUser().save()")
+        self.assertEqual(storage.count(User), 2)
+
+
+class TestFileStorageShards(StorageTestCase):
+    """Unit tests for the sharded snapshot."""
+
+    options = {"shards": "class"}
+
+    def shard_files(self):
+        """
+        Return the names of the files in the shard directory.
+        """
+        return sorted(os.listdir(self.path + ".shards"))
+
+    def test_one_file_per_class(self):
+        """
+        Test that each class is saved to its own file, and read back.
+        """
+        user = User()
+        Place()
+        storage.save()
+        self.assertFalse(os.path.isfile(self.path))
+        self.assertEqual(self.shard_files(), ["Place.json", "User.json"])
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(storage.get(User, user.id).id, user.id)
+
+    def test_only_changed_shards_are_written(self):
+        """
+        Test that a save only rewrites the files of the classes that changed, and
+        removes the file of a class left empty.
+        """
+        user = User()
+        place = Place()
+        storage.save()
+        users = os.path.join(self.path + ".shards", "User.json")
+        places = os.path.join(self.path + ".shards", "Place.json")
+        before = os.stat(users).st_ino
+        place.name = "Loft"
+        place.save()
+        self.assertEqual(os.stat(users).st_ino, before)
+        storage.delete(user)
+        storage.save()
+        self.assertFalse(os.path.isfile(users))
+        self.assertTrue(os.path.isfile(places))
+
+    def test_shards_are_read_on_demand(self):
+        """
+        Test that reload() only reads the shard of a class once it is looked up, and
+        only the bucket holding an object when it is looked up by id.
+        """
+        storage.configure(shards=4)
+        users = [User() for _ in range(100)]
+        Place()
+        storage.save()
+        self.assertEqual(len(self.shard_files()), 5)
+        storage.reload()
+        self.assertEqual(storage.get(User, users[0].id).id, users[0].id)
+        self.assertEqual(len(FileStorage._FileStorage__unread), 4)
+        self.assertEqual(storage.count(User), 100)
+        self.assertEqual([name for name, _ in FileStorage._FileStorage__unread], ["Place"])
+        self.assertEqual(len(storage.all()), 101)
+        self.assertEqual(FileStorage._FileStorage__unread, set())
+
+    def test_unread_shards_are_saved_back(self):
+        """
+        Test that a save after reload keeps the objects of the shards never read.
+        """
+        users = [User() for _ in range(3)]
+        Place()
+        storage.save()
+        storage.reload()
+        storage.get(User, users[0].id).first_name = "Ada"
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 4)
+        self.assertEqual(storage.get(User, users[0].id).first_name, "Ada")
+
+    def test_layout_changes_migrate_files(self):
+        """
+        Test that the files are rewritten when the storage is sharded, resharded and
+        unsharded, without losing objects.
+        """
+        storage.configure(shards=0)
+        users = [User() for _ in range(100)]
+        storage.save()
+        self.assertTrue(os.path.isfile(self.path))
+        for shards, count in ((1, 1), (3, 3), (0, 0)):
+            with self.subTest(shards=shards):
+                storage.configure(shards=shards)
+                storage.reload()
+                storage.save()
+                storage.reload()
+                self.assertEqual(storage.count(User), 100)
+                self.assertEqual(storage.get(User, users[3].id).id, users[3].id)
+                if count:
+                    self.assertFalse(os.path.isfile(self.path))
+                    self.assertEqual(len(self.shard_files()), count)
+                else:
+                    self.assertTrue(os.path.isfile(self.path))
+                    self.assertFalse(os.path.isdir(self.path + ".shards"))
+
+    def test_journal(self):
+        """
+        Test that journal entries are applied to their shard when it is read, and that
+        compaction writes them to the shard files.
+        """
+        storage.configure(mode="journal", compact_threshold=1000)
+        user = User()
+        Place()
+        storage.compact()
+        user.first_name = "Betty"
+        user.save()
+        Place().save()
+        storage.reload()
+        self.assertEqual(storage.get(User, user.id).first_name, "Betty")
+        self.assertEqual(FileStorage._FileStorage__changed, {("User", 0), ("Place", 0)})
+        self.assertEqual(storage.count(Place), 2)
+        storage.reload()
+        storage.compact()
+        self.assertFalse(os.path.isfile(storage.journal().path))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get(User, user.id).first_name, "Betty")
+        self.assertEqual(storage.count(), 3)
+
+    @unittest.skipIf(fcntl is None, "File locking requires fcntl")
+    def test_processes_do_not_lose_updates(self):
+        """
+        Test many processes creating objects and incrementing a counter at once, with
+        the snapshot split by id hash, in both storage modes.
+        """
+        storage.configure(shards=4)
+        for mode in ("snapshot", "journal"):
+            with self.subTest(mode=mode):
+                storage.configure(mode=mode, compact_threshold=20)
+                storage.reload()
+                for obj in list(storage.all().values()):
+                    storage.delete(obj)
+                place = Place()
+                place.number_rooms = 0
+                storage.save()
+                storage.compact()
+                TestFileStorageConcurrency.run_processes(
+                    self, 4, WORKER, place.id, "20", HBNB_STORAGE_MODE=mode,
+                    HBNB_COMPACT_THRESHOLD="20", HBNB_STORAGE_SHARDS="4")
+                storage.reload()
+                self.assertEqual(storage.count(User), 80)
+                self.assertEqual(storage.get(Place, place.id).number_rooms, 80)
+
+
+class TestFileStorageMetrics(StorageTestCase):
+    """Unit tests for the instrumentation of FileStorage."""
+
+    def setUp(self):
+        """
+        Point the storage to an empty temporary file and clear the metrics.
+        """
+        super().setUp()
+        metrics.METRICS.reset()
+        self.addCleanup(setattr, metrics.METRICS, "enabled", metrics.METRICS.enabled)
+        metrics.METRICS.enabled = True
+
+    def test_histogram(self):
+        """
+        Test that latencies land in power-of-two buckets of microseconds.
+        """
+        histogram = metrics.Histogram()
+        for nanoseconds in [500] * 90 + [3000] * 9 + [5000000]:
+            histogram.record(nanoseconds)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.max, 5000000)
+        self.assertEqual(histogram.percentile(0.5), 1024)
+        self.assertEqual(histogram.percentile(0.95), 4096)
+        self.assertEqual(histogram.percentile(1), 5000000)
+
+    def test_operations_and_bytes_are_counted(self):
+        """
+        Test that storage calls are timed, and that the bytes written and read are
+        counted, unless the metrics are disabled.
+        """
+        users = [User() for _ in range(3)]
+        storage.save()
+        storage.reload()
+        storage.get(User, users[0].id)
+        histograms = metrics.METRICS.histograms()
+        self.assertEqual(histograms["storage.new"].count, 3)
+        self.assertEqual(histograms["storage.get"].count, 1)
+        self.assertIn("storage.save", histograms)
+        counters = metrics.METRICS.counters()
+        self.assertEqual(counters["storage.bytes_written"], os.path.getsize(self.path))
+        self.assertEqual(counters["storage.bytes_read"], os.path.getsize(self.path))
+        self.assertEqual((counters["storage.encoded"], counters["storage.decoded"]), (3, 1))
+        self.assertTrue(any(line.startswith("storage.get ") for line in metrics.METRICS.report()))
+        metrics.METRICS.reset()
+        self.assertEqual(metrics.METRICS.histograms(), {})
+        metrics.METRICS.enabled = False
+        storage.get(User, users[1].id)
+        metrics.METRICS.record("console.show", 1000)
+        metrics.METRICS.increment("storage.bytes_read")
+        self.assertEqual(metrics.METRICS.histograms(), {})
+        self.assertEqual(metrics.METRICS.counters(), {})
+
+
+class TestFileStorageRegistry(StorageTestCase):
+    """Unit tests for the registry of the model classes."""
+
+    def test_built_once(self):
+        """
+        Test that classes() and attributes() return the same read-only dictionaries.
+        """
+        self.assertIs(storage.classes(), storage.classes())
+        self.assertIs(storage.attributes(), storage.attributes())
+        self.assertIs(storage.classes()["Place"], Place)
+        self.assertEqual(storage.attributes()["Place"]["latitude"], float)
+        with self.assertRaises(TypeError):
+            storage.attributes()["Place"]["latitude"] = int
+
+    def test_registered_model_is_stored(self):
+        """
+        Test that a model registering itself is stored and read back like the others.
+        """
+        @registry.register
+        class Boat(BaseModel):
+            name = ""
+            berths = 0
+
+        def unregister():
+            del registry._classes["Boat"], registry._schemas["Boat"]
+            registry._views.clear()
+        self.addCleanup(unregister)
+        self.assertEqual(dict(storage.attributes()["Boat"]), {"name": str, "berths": int})
+        boat = Boat()
+        boat.berths = 4
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get("Boat", boat.id).berths, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,349 @@
+#!/usr/bin/python3
+"""Unit tests for the PagedStorage engine and its ObjectCache."""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.engine.cache import ObjectCache, parse_size
+from models.engine.file_storage import FileStorage
+from models.engine.paged_storage import PagedStorage
+from models.engine.query import Predicate
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+
+def make(cls, **attributes):
+    """
+    Creates an instance and sets its attributes.
+
+    Args:
+        cls (type): The model class.
+        **attributes: The attribute names and values.
+
+    Returns:
+        BaseModel: The instance.
+    """
+    obj = cls()
+    for name, value in attributes.items():
+        setattr(obj, name, value)
+    return obj
+
+
+class TestObjectCache(unittest.TestCase):
+    """Unit tests for the bounded cache of instances."""
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used entry is evicted first, after on_evict.
+        """
+        evicted = []
+        cache = ObjectCache(2, on_evict=lambda key, obj: evicted.append(key))
+        cache.put("a", State())
+        cache.put("b", State())
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", State())
+        self.assertEqual(evicted, ["b"])
+        self.assertEqual(cache.keys(), ["a", "c"])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 1, 1))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_memory_limit(self):
+        """
+        Test that the estimated memory is bounded, but the latest entry is kept.
+        """
+        cache = ObjectCache(max_bytes=1)
+        cache.put("a", State())
+        cache.put("b", State())
+        self.assertEqual(cache.keys(), ["b"])
+        self.assertGreater(cache.size, 0)
+        cache.discard("b")
+        self.assertEqual(cache.size, 0)
+
+    def test_parse_size(self):
+        """
+        Test that sizes accept a unit suffix.
+        """
+        self.assertEqual(parse_size("64m"), 64 << 20)
+        self.assertEqual(parse_size("1.5k"), 1536)
+        self.assertEqual(parse_size(10), 10)
+        with self.assertRaises(ValueError):
+            parse_size("-1")
+
+
+class TestPagedStorage(unittest.TestCase):
+    """Unit tests for the storage engine reading its data file on demand."""
+
+    def setUp(self):
+        """
+        Open a storage on an empty temporary data file and make the models use it.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "hbnb.pages")
+        self.storage = PagedStorage(self.path)
+        self.storage.reload()
+        patcher = patch("models.base_model.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """
+        Close the storage and remove the data file.
+        """
+        self.storage.close()
+        shutil.rmtree(self.tmpdir)
+
+    def reopen(self, **options):
+        """
+        Close the storage, open the data file again and make the models use it.
+
+        Args:
+            **options: The arguments of PagedStorage.configure().
+
+        Returns:
+            PagedStorage: The new storage.
+        """
+        self.storage.close()
+        self.storage = PagedStorage(self.path)
+        self.storage.configure(**options)
+        self.storage.reload()
+        patcher = patch("models.base_model.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return self.storage
+
+    def test_selected_by_environment(self):
+        """
+        Test that HBNB_TYPE_STORAGE=paged makes the models use a PagedStorage.
+        """
+        env = dict(os.environ, HBNB_TYPE_STORAGE="paged", HBNB_PAGED_PATH=self.path,
+                   HBNB_CACHE_SIZE="10", HBNB_CACHE_MEMORY="1m")
+        code = "import models; print(type(models.storage).__name__, models.storage.cache_stats()['max_bytes'])"
+        self.storage.close()
+        output = subprocess.run([sys.executable, "-c", code],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output, "PagedStorage 1048576\n")
+
+    def test_opened_by_one_process(self):
+        """
+        Test that a data file open in a process cannot be opened by another one.
+        """
+        env = dict(os.environ, HBNB_TYPE_STORAGE="paged", HBNB_PAGED_PATH=self.path)
+        result = subprocess.run([sys.executable, "-c", "import models"],
+                                env=env, capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("is open in another process", result.stderr)
+
+    def test_save_and_reload(self):
+        """
+        Test that saved objects are read back with their types and extra attributes,
+        and that an object is the same instance while it is cached.
+        """
+        place = Place()
+        place.max_guest = 4
+        place.amenity_ids = ["a", "b"]
+        place.pool = True
+        place.save()
+        copy = self.reopen().get(Place, place.id)
+        self.assertEqual(copy.to_dict(), place.to_dict())
+        self.assertIs(self.storage.get("Place", place.id), copy)
+        self.assertEqual(self.storage.count(), 1)
+        self.assertEqual(self.storage.cache_stats()["hits"], 1)
+
+    def test_eviction_writes_back(self):
+        """
+        Test that evicting a modified instance writes it to the data file, so that
+        the change is found once it is read again.
+        """
+        states = [make(State, name=str(i)) for i in range(3)]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+        self.storage.configure(cache_size=2)
+        self.assertEqual(self.storage.cache_stats()["objects"], 2)
+        first = self.storage.get(State, states[1].id)
+        first.name = "changed"
+        for state in (states[0], states[2]):
+            self.storage.get(State, state.id)
+        stats = self.storage.cache_stats()
+        self.assertEqual(stats["write_backs"], 1)
+        self.assertEqual(stats["dirty"], 0)
+        self.assertGreaterEqual(stats["evictions"], 2)
+        self.assertEqual(self.reopen().get(State, states[1].id).name, "changed")
+        self.assertEqual(self.storage.count(State), 3)
+
+    def test_evicted_instance_changes(self):
+        """
+        Test that an instance evicted from a cache of one object, as with
+        HBNB_CACHE_SIZE=1, stays the instance of its object and that its changes
+        are saved.
+        """
+        states = [make(State, name=str(i)) for i in range(2)]
+        self.storage.save()
+        storage = self.reopen(cache_size=1)
+        first = storage.get(State, states[0].id)
+        storage.get(State, states[1].id)
+        first.name = "changed"
+        storage.get(State, states[1].id)
+        self.assertIs(storage.get(State, states[0].id), first)
+        storage.get(State, states[1].id)
+        first.name = "changed again"
+        storage.save()
+        self.assertEqual(self.reopen().get(State, states[0].id).name, "changed again")
+
+    def test_memory_limit(self):
+        """
+        Test that the cache holds about as many objects as fit in its memory limit,
+        while every object stays readable.
+        """
+        with self.storage.batch():
+            for i in range(100):
+                make(Place, name="place {}".format(i), description="x" * 100).save()
+        self.reopen(cache_memory="8k")
+        self.assertEqual(len(self.storage.all(Place)), 100)
+        stats = self.storage.cache_stats()
+        self.assertLessEqual(stats["bytes"], 8192)
+        self.assertLess(stats["objects"], 100)
+        self.assertEqual(stats["misses"], 100)
+
+    def test_update_and_delete(self):
+        """
+        Test that updates and deletions survive a reopening, even when a reference
+        to the deleted object is saved, and that replaced frames are compacted away.
+        """
+        state, other = State(), State()
+        state.save()
+        other.save()
+        state.name = "California"
+        state.save()
+        self.storage.delete(other)
+        self.assertIsNone(self.storage.get(State, other.id))
+        other.save()
+        storage = self.reopen()
+        self.assertEqual(storage.get(State, state.id).name, "California")
+        self.assertEqual(list(storage.all(State)), ["State." + state.id])
+        self.assertGreater(storage.cache_stats()["garbage_bytes"], 0)
+        size = os.path.getsize(self.path)
+        storage.compact()
+        self.assertLess(os.path.getsize(self.path), size)
+        self.assertEqual(storage.cache_stats()["garbage_bytes"], 0)
+        self.assertEqual(self.reopen().get(State, state.id).name, "California")
+
+    def test_torn_frame(self):
+        """
+        Test that a frame cut short by a crash is dropped on reload.
+        """
+        state = State()
+        state.save()
+        self.storage.close()
+        with open(self.path, "ab") as f:
+            f.write(b"\x05\x00\x40\x00\x00\x00State")
+        self.assertEqual(self.reopen().count(), 1)
+        State().save()
+        self.assertEqual(self.reopen().count(), 2)
+
+    def test_binary_format(self):
+        """
+        Test that a data file is converted to the configured format on save.
+        """
+        place = make(Place, name="Loft")
+        place.save()
+        storage = self.reopen(format="binary")
+        State().save()
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(10)[-1], 1)
+        self.assertEqual(self.reopen().get(Place, place.id).name, "Loft")
+
+    def test_find_and_query(self):
+        """
+        Test that find() and query() read back objects evicted from the cache.
+        """
+        state = State()
+        for name in ("a", "b"):
+            make(City, state_id=state.id, name=name)
+        City().save()
+        for name, price in (("a", 50), ("b", 150), ("c", None)):
+            place = make(Place, name=name)
+            if price is not None:
+                place.price_by_night = price
+            place.save()
+        self.reopen(cache_size=1)
+        cities = self.storage.find(City, state_id=state.id)
+        self.assertEqual(sorted(city.name for city in cities.values()), ["a", "b"])
+        self.assertEqual([city.name for city in self.storage.find("City", state_id=state.id, name="b").values()],
+                         ["b"])
+        self.assertEqual([place.name for place in self.storage.find(Place, price_by_night=0).values()],
+                         ["c"])
+        cheap = self.storage.query(Place, [Predicate("price_by_night", "<", 100)],
+                                   order_by="-price_by_night")
+        self.assertEqual([place.name for place in cheap], ["a", "c"])
+        page = self.storage.query(Place, order_by="name", limit=1, offset=1, fields=["name"])
+        self.assertEqual(page, [{"name": "b"}])
+
+    def test_aggregate_and_spatial_searches(self):
+        """
+        Test the aggregates and the spatial searches, kept up to date as objects change.
+        """
+        for name, city, price, latitude, longitude in (
+                ("sf", "c1", 50, 37.7749, -122.4194), ("la", "c1", 150, 34.0522, -118.2437),
+                ("fiji", "c2", None, -17.7, 179.9)):
+            place = make(Place, name=name, city_id=city, latitude=latitude, longitude=longitude)
+            if price is not None:
+                place.price_by_night = price
+            place.save()
+        stats = self.storage.aggregate(Place, "price_by_night", by="city_id")
+        self.assertEqual(stats["c1"], {"count": 2, "sum": 200, "mean": 100, "min": 50, "max": 150})
+        with self.assertRaises(ValueError):
+            self.storage.aggregate(Place, "name")
+        near = self.storage.within_radius(Place, 37.78, -122.41, 20)
+        self.assertEqual([place.name for km, place in near], ["sf"])
+        self.assertEqual([place.name for km, place in self.storage.nearest(Place, 36, -120, 2)],
+                         ["la", "sf"])
+        found = self.reopen(cache_size=1).within(Place, -20, 179, -15, -179)
+        self.assertEqual([place.name for place in found.values()], ["fiji"])
+        found["Place." + place.id].price_by_night = 10
+        self.assertEqual(self.storage.aggregate("Place", "price_by_night", by="city_id")["c2"]["sum"], 10)
+        make(Place).save()
+        self.assertEqual(self.storage.within(Place, -1, -1, 1, 1), {})
+        with self.assertRaises(ValueError):
+            self.storage.within(State, 0, 0, 1, 1)
+
+    def test_search(self):
+        """
+        Test the full-text search, ranked and kept up to date as objects change.
+        """
+        cabin = make(Place, name="Lake cabin", description="A quiet cabin by the lake")
+        loft = make(Place, name="City loft")
+        review = make(Review, text="The cabin was quiet")
+        for obj in (cabin, loft, review):
+            obj.save()
+        results = self.storage.search("quiet cabin")
+        self.assertEqual({o.id for _, o in results}, {cabin.id, review.id})
+        self.assertEqual(self.storage.search("cabin", "Review")[0][1].id, review.id)
+        loft.description = "Near the cabin"
+        loft.save()
+        self.storage.delete(review)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual({o.id for _, o in self.storage.search("cabin")}, {cabin.id, loft.id})
+
+
+
+class TestPagedStorageCompactModels(TestPagedStorage):
+    """Runs the PagedStorage tests with the compact models enabled in FileStorage."""
+
+    def setUp(self):
+        """
+        Enable the compact models, then open the storage.
+        """
+        self.addCleanup(FileStorage().configure, compact=FileStorage._FileStorage__compact)
+        FileStorage().configure(compact=True)
+        super().setUp()
+
+if __name__ == '__main__':
+    unittest.main()